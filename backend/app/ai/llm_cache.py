@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+from app.core.concurrency import run_io
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "2048"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_DISK_MB = int(os.getenv("LLM_CACHE_MAX_DISK_MB", "256"))
+
+class LLMCache:
+    """
+    Content-addressed cache for Gemini responses.
+
+    Tier 1 is an in-process LRU, tier 2 a local SQLite file so results survive
+    restarts and are shared by every worker on the host. Values are stored as
+    JSON, so callers always get a fresh copy they can mutate.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_disk_bytes: int = LLM_CACHE_MAX_DISK_MB * 1024 * 1024,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.enabled = enabled
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict() # key -> (expires_at, json)
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._db = None
+        if enabled and path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                    " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            except sqlite3.Error as e:
+                logging.warning(f"LLM disk cache unavailable ({e}); using memory tier only.")
+                self._db = None
+
+    @staticmethod
+    def make_key(namespace: str, model: str, version: str, *parts: Union[str, bytes]) -> str:
+        """
+        Hash of the prompt inputs plus the prompt/model version, so a prompt
+        change or model upgrade naturally invalidates old entries.
+        """
+        h = hashlib.sha256()
+        for piece in (namespace, model, version, *parts):
+            data = piece if isinstance(piece, bytes) else str(piece).encode("utf-8")
+            # Length prefix keeps ("ab", "c") and ("a", "bc") distinct
+            h.update(len(data).to_bytes(8, "little"))
+            h.update(data)
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return json.loads(entry[1])
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, row[1], row[0])
+                        self._counters["disk_hits"] += 1
+                        return json.loads(row[0])
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return # Not JSON-serialisable, skip caching
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._counters["writes"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), expires_at, now)
+                )
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= 100:
+                    self._evict_disk(now)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """
+        Async lookup: memory hits are answered inline, disk reads go to the IO pool.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return json.loads(entry[1])
+        return await run_io(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        if self.enabled:
+            await run_io(self.set, key, value)
+
+    # For callers: the cache only saves calls, so a failed read counts as a miss and a failed write is skipped
+    def safe_get(self, key: str) -> Optional[Any]:
+        try:
+            return self.get(key)
+        except Exception as e:
+            logging.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def safe_set(self, key: str, value: Any):
+        try:
+            self.set(key, value)
+        except Exception as e:
+            logging.warning(f"LLM cache write failed: {e}")
+
+    async def safe_aget(self, key: str) -> Optional[Any]:
+        try:
+            return await self.aget(key)
+        except Exception as e:
+            logging.warning(f"LLM cache read failed: {e}")
+            return None
+
+    async def safe_aset(self, key: str, value: Any):
+        try:
+            await self.aset(key, value)
+        except Exception as e:
+            logging.warning(f"LLM cache write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, payload: str):
+        # Caller holds the lock
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        # Caller holds the lock. Drop expired rows, then least recently used until under the size cap.
+        self._writes_since_evict = 0
+        removed = self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_disk_bytes:
+            excess = total - self.max_disk_bytes
+            rows = self._db.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC").fetchall()
+            victims = []
+            for k, size in rows:
+                if excess <= 0:
+                    break
+                victims.append((k,))
+                excess -= size
+            self._db.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            removed += len(victims)
+        self._counters["evictions"] += max(removed, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "memory_entries": len(self._memory),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+
+llm_cache = LLMCache()
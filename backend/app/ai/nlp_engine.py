@@ -2,10 +2,24 @@ import os
 import google.generativeai as genai
 import json
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Optional
+from app.ai.llm_cache import llm_cache
+from app.ai.batcher import MicroBatcher
 
 load_dotenv()
 
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Bump when a prompt changes so cached responses from the old prompt are ignored
+ANALYSIS_PROMPT_VERSION = "analysis-v1"
+EXTRACTION_PROMPT_VERSION = "extraction-v1"
+
+# Optional micro-batching of concurrent analyze_async() calls into one multi-item prompt
+NLP_BATCHING_ENABLED = os.getenv("NLP_BATCHING_ENABLED", "false").lower() == "true"
+NLP_BATCH_MAX_ITEMS = int(os.getenv("NLP_BATCH_MAX_ITEMS", "8"))
+NLP_BATCH_WINDOW_MS = int(os.getenv("NLP_BATCH_WINDOW_MS", "50"))
+
 class NLPEngine:
     def __init__(self):
         api_key = os.getenv("GEMINI_API_KEY")
@@ -14,19 +28,12 @@ class NLPEngine:
             self.model = None
         else:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.model = genai.GenerativeModel(MODEL_NAME)
 
-    def analyze(self, text: str) -> Dict[str, Any]:
-        """
-        Analyzes product text using Gemini AI to find violations.
-        """
-        if not self.model:
-            return {"error": "AI Engine not configured"}
-
-        if not text:
-            return {"missing_fields": [], "misleading_terms": []}
+        self._batcher: Optional[MicroBatcher] = None
 
-        prompt = f"""
+    def _analysis_prompt(self, text: str) -> str:
+        return f"""
         Analyze the following e-commerce product text for compliance violations.
         
         Product Text: "{text}"
@@ -47,27 +54,36 @@ class NLPEngine:
         }}
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            # Cleanup JSON string
-            content = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
-        except Exception as e:
-            print(f"AI Analysis Failed: {e}")
-            return {
-                "misleading_terms": [],
-                "error": str(e)
-            }
+    def _batch_analysis_prompt(self, texts: List[str]) -> str:
+        products = json.dumps([{"id": i, "text": t} for i, t in enumerate(texts)], ensure_ascii=False)
+        return f"""
+        Analyze EACH of the following e-commerce product texts for compliance violations.
+        Treat every product independently.
 
-    def extract_product_details(self, text: str) -> Dict[str, Any]:
-        """
-        Extracts structured product data (Price, MRP, Title) from raw text.
+        Products (JSON): {products}
+
+        For each product identify:
+        1. Misleading Claims (e.g., "100% cure", "magic", "guaranteed results").
+        2. Prohibited Content (e.g., drugs, weapons, counterfeits).
+        3. Missing mandatory disclosures (if applicable).
+        4. Suspicious pricing or fake discounts (e.g. "Price: 100, MRP: 10000").
+
+        Return a JSON array ONLY, one object per product, echoing its id:
+        [
+            {{
+                "id": integer,
+                "misleading_terms": ["term1", "term2"],
+                "suspicious_pricing": boolean,
+                "prohibited_content": boolean,
+                "risk_score": integer (0-100),
+                "reasoning": "Brief explanation of findings"
+            }}
+        ]
         """
-        if not self.model or not text:
-            return {}
 
+    def _extraction_prompt(self, text: str) -> str:
         product_text = text[:50000] # Increase limit to capture body content
-        prompt = f"""
+        return f"""
         Extract product details from this e-commerce page text.
         
         Text Snippet: "{product_text}"... (truncated)
@@ -89,10 +105,156 @@ class NLPEngine:
         }}
         """
 
+    def _analysis_key(self, text: str) -> str:
+        return llm_cache.make_key("nlp.analyze", MODEL_NAME, ANALYSIS_PROMPT_VERSION, text)
+
+    def _extraction_key(self, text: str) -> str:
+        # Only the part of the page that reaches the prompt matters
+        return llm_cache.make_key("nlp.extract", MODEL_NAME, EXTRACTION_PROMPT_VERSION, text[:50000])
+
+    def _parse_json(self, response_text: str) -> Any:
+        # Cleanup JSON string
+        content = response_text.replace("```json", "").replace("```", "").strip()
+        return json.loads(content)
+
+    def analyze(self, text: str) -> Dict[str, Any]:
+        """
+        Analyzes product text using Gemini AI to find violations.
+        """
+        if not self.model:
+            return {"error": "AI Engine not configured"}
+
+        if not text:
+            return {"missing_fields": [], "misleading_terms": []}
+
+        key = self._analysis_key(text)
+        cached = llm_cache.safe_get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.model.generate_content(self._analysis_prompt(text))
+            result = self._parse_json(response.text)
+            llm_cache.safe_set(key, result)
+            return result
+        except Exception as e:
+            print(f"AI Analysis Failed: {e}")
+            return {
+                "misleading_terms": [],
+                "error": str(e)
+            }
+
+    async def analyze_async(self, text: str) -> Dict[str, Any]:
+        """
+        Non-blocking variant of analyze() using the native async Gemini client.
+        With NLP_BATCHING_ENABLED, concurrent calls are packed into one prompt.
+        """
+        if not self.model:
+            return {"error": "AI Engine not configured"}
+
+        if not text:
+            return {"missing_fields": [], "misleading_terms": []}
+
+        key = self._analysis_key(text)
+        cached = await llm_cache.safe_aget(key)
+        if cached is not None:
+            return cached
+
+        if NLP_BATCHING_ENABLED:
+            result = await self._get_batcher().submit(text)
+        else:
+            result = await self._analyze_single_async(text)
+
+        if "error" not in result:
+            await llm_cache.safe_aset(key, result)
+        return result
+
+    async def _analyze_single_async(self, text: str) -> Dict[str, Any]:
+        try:
+            response = await self.model.generate_content_async(self._analysis_prompt(text))
+            return self._parse_json(response.text)
+        except Exception as e:
+            print(f"AI Analysis Failed: {e}")
+            return {
+                "misleading_terms": [],
+                "error": str(e)
+            }
+
+    def _get_batcher(self) -> MicroBatcher:
+        if self._batcher is None:
+            self._batcher = MicroBatcher(self._analyze_batch, max_items=NLP_BATCH_MAX_ITEMS, window_ms=NLP_BATCH_WINDOW_MS)
+        return self._batcher
+
+    def _valid_analysis(self, item: Any) -> bool:
+        return isinstance(item, dict) and isinstance(item.get("misleading_terms", []), list)
+
+    async def _analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        One Gemini call for the whole batch. Items missing from (or malformed in)
+        the returned array fall back to single-item calls.
+        """
+        if len(texts) == 1:
+            return [await self._analyze_single_async(texts[0])]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        try:
+            response = await self.model.generate_content_async(self._batch_analysis_prompt(texts))
+            parsed = self._parse_json(response.text)
+            if isinstance(parsed, list):
+                for item in parsed:
+                    if not self._valid_analysis(item):
+                        continue
+                    idx = item.pop("id", None)
+                    if isinstance(idx, int) and 0 <= idx < len(texts) and results[idx] is None:
+                        results[idx] = item
+        except Exception as e:
+            print(f"AI Batch Analysis Failed ({len(texts)} items): {e}")
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            retried = await asyncio.gather(*(self._analyze_single_async(texts[i]) for i in missing))
+            for i, r in zip(missing, retried):
+                results[i] = r
+        return results
+
+    def extract_product_details(self, text: str) -> Dict[str, Any]:
+        """
+        Extracts structured product data (Price, MRP, Title) from raw text.
+        """
+        if not self.model or not text:
+            return {}
+
+        key = self._extraction_key(text)
+        cached = llm_cache.safe_get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.model.generate_content(self._extraction_prompt(text))
+            result = self._parse_json(response.text)
+            llm_cache.safe_set(key, result)
+            return result
+        except Exception as e:
+            print(f"AI Extraction Failed: {e}")
+            return {}
+
+    async def extract_product_details_async(self, text: str) -> Dict[str, Any]:
+        """
+        Non-blocking variant of extract_product_details().
+        """
+        if not self.model or not text:
+            return {}
+
+        key = self._extraction_key(text)
+        cached = await llm_cache.safe_aget(key)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.model.generate_content(prompt)
-            content = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+            response = await self.model.generate_content_async(self._extraction_prompt(text))
+            result = self._parse_json(response.text)
+            await llm_cache.safe_aset(key, result)
+            return result
         except Exception as e:
             print(f"AI Extraction Failed: {e}")
             return {}
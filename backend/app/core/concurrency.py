@@ -0,0 +1,33 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+# Bounded executors so blocking work never runs on the event loop.
+# - IO pool: blocking network clients (cloudscraper, requests) that have no async API.
+# - CPU pool: parsing / OpenCV work. OpenCV, lxml and numpy release the GIL,
+#   so threads give real parallelism here without pickling engines into processes.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 4)))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="trustcart-io")
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="trustcart-cpu")
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs a blocking I/O call on the bounded IO pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, partial(func, *args, **kwargs))
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs CPU-bound work (HTML parsing, image decoding) on the bounded CPU pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, partial(func, *args, **kwargs))
+
+def shutdown_executors():
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,62 @@
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+_MAX_AGE = re.compile(r"(?:s-maxage|max-age)=(\d+)")
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def is_storable(headers) -> bool:
+    return "no-store" not in (headers.get("cache-control") or "").lower()
+
+def freshness_seconds(headers, default_ttl: float, heuristic: bool = False) -> float:
+    """
+    How long a response may be served without revalidation (RFC 9111, simplified):
+    Cache-Control max-age/s-maxage, then Expires, then - if `heuristic` - 10% of
+    the Last-Modified age capped at `default_ttl`, else `default_ttl`.
+    """
+    cache_control = (headers.get("cache-control") or "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        return int(match.group(1))
+    expires = _http_date(headers.get("expires"))
+    if expires is not None:
+        return max(0.0, expires - time.time())
+    if heuristic:
+        last_modified = _http_date(headers.get("last-modified"))
+        if last_modified is not None:
+            return min(default_ttl, max(0.0, (time.time() - last_modified) * 0.1))
+    return default_ttl
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    If-None-Match / If-Modified-Since for revalidating a cached entry.
+    """
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def retry_after_seconds(headers, default: float) -> float:
+    """
+    Retry-After as seconds (delta-seconds or HTTP-date form), else `default`.
+    """
+    value = (headers.get("retry-after") or "").strip()
+    if value.isdigit():
+        return float(value)
+    when = _http_date(value)
+    if when is not None:
+        return max(0.0, when - time.time())
+    return default
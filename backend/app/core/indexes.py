@@ -0,0 +1,218 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import ConnectionFailure, OperationFailure
+from app.core.database import database
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Dict[str, Any] = {}
+
+# Every index the app relies on. Created idempotently at startup (ensure_indexes)
+# and managed with manage_indexes.py. Index names are explicit so inspect/rebuild
+# can tell declared indexes from ad-hoc ones.
+INDEXES: List[IndexSpec] = [
+    # Products list: filter by risk level / category, newest first
+    IndexSpec("products", [("risk_level", ASCENDING), ("_id", DESCENDING)], "risk_level_id"),
+    # Category filter: equality on the normalised category of the rollup snapshot (rollups.category_match)
+    IndexSpec("products", [("rollup.category", ASCENDING), ("_id", DESCENDING)], "rollup_category_id"),
+    IndexSpec("products", [("created_at", DESCENDING)], "created_at"),
+    # Product search ($text); only one text index is allowed per collection
+    IndexSpec("products", [("name", TEXT), ("description", TEXT)], "products_text",
+              {"weights": {"name": 5, "description": 1}, "default_language": "none"}),
+    # Multikey indexes over the embedded violations array (dashboard + violations list)
+    IndexSpec("products", [("violations.type", ASCENDING)], "violations_type"),
+    IndexSpec("products", [("violations.severity", ASCENDING), ("violations.status", ASCENDING)], "violations_severity_status"),
+    IndexSpec("products", [("violations.status", ASCENDING)], "violations_status"),
+    # URL ingestion de-duplication
+    IndexSpec("products", [("canonical_url", ASCENDING), ("ingested_at", DESCENDING)], "canonical_url_ingested_at",
+              {"partialFilterExpression": {"canonical_url": {"$type": "string"}}}),
+
+    # Denormalised violations (app/services/violation_store.py): filter + sort on impact
+    IndexSpec("violations", [("impact_score", DESCENDING), ("_id", DESCENDING)], "impact"),
+    IndexSpec("violations", [("severity", ASCENDING), ("impact_score", DESCENDING), ("_id", DESCENDING)], "severity_impact"),
+    IndexSpec("violations", [("status", ASCENDING), ("impact_score", DESCENDING), ("_id", DESCENDING)], "status_impact"),
+    IndexSpec("violations", [("severity", ASCENDING), ("status", ASCENDING), ("impact_score", DESCENDING), ("_id", DESCENDING)], "severity_status_impact"),
+    IndexSpec("violations", [("detected_at", DESCENDING), ("_id", DESCENDING)], "detected_at"),
+    IndexSpec("violations", [("product_id", ASCENDING), ("violation_index", ASCENDING)], "product_violation"),
+    # Column sorts of the violations table (sort_by, newest _id as tie-breaker)
+    IndexSpec("violations", [("confidence", DESCENDING), ("_id", DESCENDING)], "confidence"),
+    IndexSpec("violations", [("updated_at", DESCENDING), ("_id", DESCENDING)], "updated_at"),
+    IndexSpec("violations", [("product_name", DESCENDING), ("_id", DESCENDING)], "product_name"),
+    IndexSpec("violations", [("type", DESCENDING), ("_id", DESCENDING)], "type"),
+    IndexSpec("violations", [("severity", DESCENDING), ("_id", DESCENDING)], "severity"),
+    IndexSpec("violations", [("status", DESCENDING), ("_id", DESCENDING)], "status"),
+
+    # Dashboard rollups: one range read per (category, day window)
+    IndexSpec("dashboard_rollups", [("category", ASCENDING), ("day", ASCENDING)], "category_day"),
+
+    # Job queue: lease scans + dedupe
+    IndexSpec("jobs", [("status", ASCENDING), ("run_at", ASCENDING)], "status_run_at"),
+    IndexSpec("jobs", [("status", ASCENDING), ("lease_until", ASCENDING)], "status_lease_until"),
+    IndexSpec("jobs", [("dedupe_key", ASCENDING)], "dedupe_key",
+              {"unique": True, "partialFilterExpression": {"dedupe_key": {"$type": "string"}}}),
+    IndexSpec("jobs_dead", [("dead_at", DESCENDING)], "dead_at"),
+
+    IndexSpec("image_hashes", [("phash", ASCENDING)], "phash", {"unique": True}),
+]
+
+def hot_queries() -> List[Dict[str, Any]]:
+    """
+    Queries on request paths that must be served by an index (checked with explain).
+    Where the app builds a filter in code, the probe uses the same builder, so it
+    checks the exact shape the app sends.
+    """
+    # Lazy: services import this module for ensure_indexes
+    from app.services.dashboard import dashboard_pipeline
+    from app.services.job_queue import lease_filter
+    from app.services.rollups import category_match
+    return [
+        {"name": "products by risk level, newest first", "collection": "products",
+         "find": {"risk_level": "High"}, "sort": {"_id": -1}, "limit": 20},
+        {"name": "products by category, newest first", "collection": "products",
+         "find": category_match("Electronics"), "sort": {"_id": -1}, "limit": 20},
+        {"name": "dashboard $facet, all categories", "collection": "products",
+         "pipeline": dashboard_pipeline()},
+        {"name": "dashboard $facet, one category", "collection": "products",
+         "pipeline": dashboard_pipeline("Electronics")},
+        {"name": "products newest first", "collection": "products",
+         "find": {}, "sort": {"_id": -1}, "limit": 20},
+        {"name": "products next page (keyset)", "collection": "products",
+         "find": {"risk_level": "High", "_id": {"$lt": ObjectId("ffffffffffffffffffffffff")}}, "sort": {"_id": -1}, "limit": 21},
+        {"name": "product search", "collection": "products",
+         "find": {"$text": {"$search": "handbag"}}, "sort": {"_id": -1}, "limit": 20},
+        {"name": "violations by impact", "collection": "violations",
+         "find": {}, "sort": {"impact_score": -1, "_id": -1}, "limit": 20},
+        {"name": "violations by severity", "collection": "violations",
+         "find": {"severity": "high"}, "sort": {"impact_score": -1, "_id": -1}, "limit": 20},
+        {"name": "violations by severity and status", "collection": "violations",
+         "find": {"severity": "high", "status": "Open"}, "sort": {"impact_score": -1, "_id": -1}, "limit": 20},
+        {"name": "violations by status", "collection": "violations",
+         "find": {"status": "Open"}, "sort": {"impact_score": -1, "_id": -1}, "limit": 20},
+        {"name": "violations sorted by product name", "collection": "violations",
+         "find": {}, "sort": {"product_name": -1, "_id": -1}, "limit": 20},
+        {"name": "violations of a product", "collection": "violations",
+         "find": {"product_id": ObjectId("000000000000000000000000"), "_id": {"$nin": ["000000000000000000000000:FAKE:0"]}}},
+        {"name": "dashboard rollups", "collection": "dashboard_rollups",
+         "find": {"category": "__all__", "day": {"$gte": "2026-01-01"}}},
+        {"name": "recent ingestion of a URL", "collection": "products",
+         "find": {"canonical_url": "https://amazon.in/dp/B000000000", "ingest_status": "completed"}, "sort": {"ingested_at": -1}, "limit": 1},
+        {"name": "job lease", "collection": "jobs",
+         "find": lease_filter(datetime(2000, 1, 1)), "sort": {"run_at": 1}, "limit": 1},
+        {"name": "job lease, some kinds", "collection": "jobs",
+         "find": lease_filter(datetime(2000, 1, 1), ["ingest_url"]), "sort": {"run_at": 1}, "limit": 1},
+        {"name": "image hash lookup", "collection": "image_hashes",
+         "find": {"phash": "0000000000000000"}, "limit": 1},
+    ]
+
+def declared(collections: Optional[Iterable[str]] = None) -> List[IndexSpec]:
+    wanted = set(collections) if collections else None
+    return [spec for spec in INDEXES if wanted is None or spec.collection in wanted]
+
+async def ensure_indexes(db=None, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Creates every declared index that is missing. Safe to call repeatedly;
+    an existing index with different options is reported, not replaced
+    (use `manage_indexes.py rebuild`).
+    """
+    db = db if db is not None else database
+    report: Dict[str, List[str]] = {"ok": [], "failed": []}
+    for spec in declared(collections):
+        try:
+            await db.get_collection(spec.collection).create_index(spec.keys, name=spec.name, **spec.options)
+            report["ok"].append(f"{spec.collection}.{spec.name}")
+        except OperationFailure as e:
+            logging.error(f"Index {spec.collection}.{spec.name} conflicts with an existing index: {e}")
+            report["failed"].append(f"{spec.collection}.{spec.name}")
+        except ConnectionFailure as e:
+            # No point waiting out the server-selection timeout once per index
+            logging.error(f"Index creation skipped, database unreachable: {e}")
+            report["failed"] += [f"{s.collection}.{s.name}" for s in declared(collections) if f"{s.collection}.{s.name}" not in report["ok"]]
+            break
+        except Exception as e:
+            logging.error(f"Index creation failed for {spec.collection}.{spec.name}: {e}")
+            report["failed"].append(f"{spec.collection}.{spec.name}")
+    return report
+
+async def inspect_indexes(db=None, collections: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Per collection: existing indexes, declared ones that are missing, and
+    undeclared extras (excluding _id_).
+    """
+    db = db if db is not None else database
+    names = sorted({spec.collection for spec in declared(collections)})
+    report = {}
+    for name in names:
+        existing = await db.get_collection(name).index_information()
+        wanted = {spec.name for spec in declared([name])}
+        report[name] = {
+            "existing": {idx: info.get("key") for idx, info in existing.items()},
+            "missing": sorted(wanted - set(existing)),
+            "extra": sorted(set(existing) - wanted - {"_id_"}),
+        }
+    return report
+
+async def rebuild_indexes(db=None, collections: Optional[Iterable[str]] = None, drop_extra: bool = False) -> Dict[str, List[str]]:
+    """
+    Drops and recreates the declared indexes (picks up changed options).
+    With drop_extra, undeclared indexes are dropped as well.
+    """
+    db = db if db is not None else database
+    for name, info in (await inspect_indexes(db, collections)).items():
+        collection = db.get_collection(name)
+        to_drop = [spec.name for spec in declared([name]) if spec.name in info["existing"]]
+        if drop_extra:
+            to_drop += info["extra"]
+        for index_name in to_drop:
+            await collection.drop_index(index_name)
+    return await ensure_indexes(db, collections)
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+async def explain_query(query: Dict[str, Any], db=None) -> List[str]:
+    """
+    Winning-plan stages for a hot_queries() entry (e.g. ["LIMIT", "FETCH", "IXSCAN"]).
+    """
+    db = db if db is not None else database
+    if "pipeline" in query:
+        command = {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}}
+    else:
+        command = {"find": query["collection"], "filter": query["find"]}
+        if query.get("sort"):
+            command["sort"] = query["sort"]
+        if query.get("limit"):
+            command["limit"] = query["limit"]
+    explained = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    # find: queryPlanner at the top level; aggregate: under stages[0].$cursor (or at the top if fully pushed down)
+    planners = []
+    if "queryPlanner" in explained:
+        planners.append(explained["queryPlanner"])
+    for stage in explained.get("stages", []):
+        if "$cursor" in stage:
+            planners.append(stage["$cursor"].get("queryPlanner", {}))
+    return [s for planner in planners for s in _plan_stages(planner.get("winningPlan", {}))]
+
+async def find_collection_scans(db=None) -> List[Tuple[str, List[str]]]:
+    """
+    Hot queries whose winning plan contains a COLLSCAN, as (name, stages).
+    """
+    offenders = []
+    for query in hot_queries():
+        stages = await explain_query(query, db)
+        if "COLLSCAN" in stages:
+            offenders.append((query["name"], stages))
+    return offenders
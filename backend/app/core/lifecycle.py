@@ -0,0 +1,33 @@
+# Startup/shutdown hooks shared by the API (main.py) and the standalone worker (worker.py),
+# so a job sees the same in-memory state (pHash index, price stats, price models)
+# whichever process runs it. Imports are lazy: services import core, not the other way round.
+
+async def start_services(retrain_models: bool = True):
+    from app.services.image_index import image_index
+    await image_index.load()
+
+    from app.core.indexes import ensure_indexes
+    await ensure_indexes()
+
+    from app.services.price_stats import price_stats
+    await price_stats.load()
+
+    # Price anomaly models: hot-reloaded from disk, optionally retrained in a child process.
+    # Workers only reload, so a deployment with N workers does not train N times.
+    from app.services.price_models import price_models
+    if retrain_models:
+        price_models.start()
+    else:
+        price_models.start(retrain_seconds=0)
+
+async def stop_services():
+    from app.services.image_engine import image_engine
+    from app.core.concurrency import shutdown_executors
+    from app.core.write_buffer import write_buffer
+    from app.services.price_stats import price_stats
+    from app.services.price_models import price_models
+    await write_buffer.close()
+    await price_stats.flush()
+    await price_models.stop()
+    await image_engine.aclose()
+    shutdown_executors()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+# Defaults per marketplace domain: sustained requests/sec, burst size, max parallel requests
+DEFAULT_RATE = float(os.getenv("SCRAPER_RATE_PER_SEC", "1.0"))
+DEFAULT_BURST = int(os.getenv("SCRAPER_BURST", "3"))
+DEFAULT_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY_PER_DOMAIN", "2"))
+
+def parse_domain_limits(spec: str) -> Dict[str, Tuple[float, int, int]]:
+    """
+    "amazon.in=0.5:2:1,flipkart.com=1:3:2" -> {"amazon.in": (0.5, 2, 1), ...}
+    (rate per second : burst : concurrency)
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        domain, _, values = item.partition("=")
+        rate, burst, concurrency = (values.split(":") + ["", "", ""])[:3]
+        limits[domain.strip().lower()] = (
+            float(rate or DEFAULT_RATE),
+            int(burst or DEFAULT_BURST),
+            int(concurrency or DEFAULT_CONCURRENCY),
+        )
+    return limits
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "blocked_until", "thread_slots", "async_slots")
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.thread_slots = threading.BoundedSemaphore(concurrency)
+        self.async_slots = asyncio.Semaphore(concurrency)
+
+class DomainRateLimiter:
+    """
+    Per-domain token bucket plus a concurrency cap.
+
+    Callers over the limit wait (queue) rather than fail: reserve() books the
+    next token and returns how long to sleep. limit() is for worker threads,
+    limit_async() for coroutines. The concurrency cap is tracked separately for
+    threads and for coroutines.
+    """
+
+    def __init__(self, overrides: Dict[str, Tuple[float, int, int]] = None):
+        self.overrides = overrides if overrides is not None else parse_domain_limits(os.getenv("SCRAPER_DOMAIN_LIMITS", ""))
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self.waits = {"count": 0, "total_seconds": 0.0}
+
+    def _bucket(self, domain: str) -> _Bucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            rate, burst, concurrency = self.overrides.get(domain, (DEFAULT_RATE, DEFAULT_BURST, DEFAULT_CONCURRENCY))
+            bucket = self._buckets[domain] = _Bucket(rate, burst, concurrency)
+        return bucket
+
+    def reserve(self, domain: str) -> float:
+        """
+        Takes one token (possibly from the future). Returns the seconds to wait before using it.
+        """
+        with self._lock:
+            bucket = self._bucket(domain)
+            now = time.monotonic()
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.tokens -= 1 # May go negative: that is the queue
+            delay = 0.0 if bucket.tokens >= 0 else -bucket.tokens / bucket.rate
+            delay = max(delay, bucket.blocked_until - now)
+            if delay > 0:
+                self.waits["count"] += 1
+                self.waits["total_seconds"] += delay
+            return delay
+
+    def penalize(self, domain: str, seconds: float):
+        """
+        Pause a domain after 429/503 (honours Retry-After when the caller passes it).
+        """
+        with self._lock:
+            bucket = self._bucket(domain)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+    @contextmanager
+    def limit(self, url: str):
+        domain = domain_of(url)
+        with self._lock:
+            bucket = self._bucket(domain)
+        with bucket.thread_slots:
+            delay = self.reserve(domain)
+            if delay > 0:
+                time.sleep(delay)
+            yield
+
+    @asynccontextmanager
+    async def limit_async(self, url: str):
+        domain = domain_of(url)
+        with self._lock:
+            bucket = self._bucket(domain)
+        async with bucket.async_slots:
+            delay = self.reserve(domain)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
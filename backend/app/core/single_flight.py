@@ -0,0 +1,48 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlightCache:
+    """
+    Short-TTL in-process cache where concurrent misses for the same key share
+    one computation, run as a task that every caller awaits. A cancelled
+    caller leaves it running for the others. Failures are passed to every
+    waiter and not cached.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._values: Dict[Hashable, Tuple[Any, float]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._values.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl_seconds:
+            self.stats["hits"] += 1
+            return cached[0]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            # The computation runs in its own task, so cancelling whichever caller started it
+            # does not cancel it for the others
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key)
+        if task.cancelled() or task.exception() is not None: # Failures are not cached
+            return
+        if len(self._values) >= self.max_entries and key not in self._values:
+            self._values.pop(next(iter(self._values)))
+        self._values[key] = (task.result(), time.monotonic())
+
+    def clear(self):
+        self._values.clear()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.database import database
+
+# Off by default: writes go straight to Mongo. When on, inserts/updates routed
+# through the buffer are flushed as one ordered bulk_write per collection.
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BUFFER_MAX_OPS = int(os.getenv("WRITE_BUFFER_MAX_OPS", "500"))
+WRITE_BUFFER_FLUSH_MS = int(os.getenv("WRITE_BUFFER_FLUSH_MS", "200"))
+
+class WriteBuffer:
+    """
+    Write-behind buffer for product inserts and timeline/status updates.
+
+    Ops are queued per collection and flushed when WRITE_BUFFER_MAX_OPS are
+    pending or every WRITE_BUFFER_FLUSH_MS, and on shutdown (close()). Each
+    collection's ops go out as one *ordered* bulk_write so an insert and later
+    updates of the same document keep their order; a failing op is logged and
+    skipped, the rest are retried. Callers that must read their own write
+    await flush().
+    """
+
+    def __init__(self, enabled: bool = WRITE_BEHIND_ENABLED, max_ops: int = WRITE_BUFFER_MAX_OPS, flush_ms: int = WRITE_BUFFER_FLUSH_MS):
+        self.enabled = enabled
+        self.max_ops = max_ops
+        self.flush_interval = flush_ms / 1000
+        self._pending: Dict[str, List[Any]] = defaultdict(list)
+        self._pending_count = 0
+        self._flush_lock = None
+        self._timer = None
+        self._metrics = {
+            "flushes": 0, "ops_flushed": 0, "failed_ops": 0,
+            "last_flush_size": 0, "max_flush_size": 0,
+            "last_flush_ms": 0.0, "total_flush_ms": 0.0, "max_flush_ms": 0.0,
+        }
+
+    def _get_flush_lock(self) -> asyncio.Lock:
+        # Created lazily so it binds to the running loop
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    async def insert(self, collection: str, doc: Dict[str, Any]) -> Any:
+        """
+        Queues an insert. The _id is assigned now so callers can reference it immediately.
+        """
+        doc.setdefault("_id", ObjectId())
+        if not self.enabled:
+            await database.get_collection(collection).insert_one(doc)
+            return doc["_id"]
+        await self._add(collection, InsertOne(doc))
+        return doc["_id"]
+
+    async def update(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]):
+        if not self.enabled:
+            await database.get_collection(collection).update_one(query, update)
+            return
+        await self._add(collection, UpdateOne(query, update))
+
+    async def _add(self, collection: str, op: Any):
+        self._pending[collection].append(op)
+        self._pending_count += 1
+        if self._pending_count >= self.max_ops:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Keeps going while ops arrive during a flush, so none are left without a timer
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Write buffer flush failed: {e}")
+            if not self._pending_count:
+                return
+
+    async def flush(self) -> int:
+        """
+        Writes everything pending now. Returns the number of ops written.
+        """
+        async with self._get_flush_lock():
+            if not self._pending_count:
+                return 0
+            pending, self._pending = self._pending, defaultdict(list)
+            size, self._pending_count = self._pending_count, 0
+
+            start = time.perf_counter()
+            for collection, ops in pending.items():
+                await self._write(collection, ops)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            m = self._metrics
+            m["flushes"] += 1
+            m["ops_flushed"] += size
+            m["last_flush_size"] = size
+            m["max_flush_size"] = max(m["max_flush_size"], size)
+            m["last_flush_ms"] = round(elapsed_ms, 2)
+            m["total_flush_ms"] += elapsed_ms
+            m["max_flush_ms"] = max(m["max_flush_ms"], round(elapsed_ms, 2))
+            return size
+
+    async def _write(self, collection: str, ops: List[Any]):
+        target = database.get_collection(collection)
+        while ops:
+            try:
+                await target.bulk_write(ops, ordered=True)
+                return
+            except BulkWriteError as e:
+                # Ordered: everything before the failing op was applied, nothing after it
+                errors = e.details.get("writeErrors", [])
+                failed_at = errors[0]["index"] if errors else len(ops) - 1
+                self._metrics["failed_ops"] += 1
+                logging.error(f"Write buffer dropped op on {collection}: {errors[0].get('errmsg') if errors else e}")
+                ops = ops[failed_at + 1:]
+            except Exception as e:
+                self._metrics["failed_ops"] += len(ops)
+                logging.error(f"Write buffer flush to {collection} failed, {len(ops)} ops lost: {e}")
+                return
+
+    async def close(self):
+        """
+        Final flush (app/worker shutdown).
+        """
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return self._pending_count
+
+    def metrics(self) -> Dict[str, Any]:
+        m = dict(self._metrics)
+        total_ms = m.pop("total_flush_ms")
+        m["enabled"] = self.enabled
+        m["pending"] = self._pending_count
+        m["avg_flush_size"] = round(m["ops_flushed"] / m["flushes"], 1) if m["flushes"] else 0
+        m["avg_flush_ms"] = round(total_ms / m["flushes"], 2) if m["flushes"] else 0
+        return m
+
+write_buffer = WriteBuffer()
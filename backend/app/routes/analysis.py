@@ -1,95 +1,56 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from app.models.product import ProductSchema, ViolationSchema
-from app.services.compliance_engine import compliance_engine
+from app.services.analysis_pipeline import analysis_pipeline, AnalysisInputError
 from app.core.database import database
-from typing import Dict, Any
+from app.core.write_buffer import write_buffer
+from app.services.violation_store import sync_product, sync_products
+from app.services import rollups
+from app.services.price_stats import price_stats
+from pymongo.errors import BulkWriteError
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import os
 
 router = APIRouter()
 
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "5000"))
+MAX_BATCH_CONCURRENCY = int(os.getenv("MAX_BATCH_CONCURRENCY", "16"))
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "100"))
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[Dict[str, Any]] # Each item: {"url": "..."} OR {"manual_data": {...}}
+    concurrency: Optional[int] = None
+
 import logging
 logging.basicConfig(filename='debug.log', level=logging.INFO, format='%(asctime)s %(message)s')
 
 @router.post("/", response_model=ProductSchema)
-async def analyze_product(payload: Dict[str, Any] = Body(...)):
+async def analyze_product(payload: Dict[str, Any] = Body(...), consistent: bool = False):
     """
     Analyze a product listing for compliance violations.
     Input: {"url": "..."} OR {"manual_data": {...}}
+    With write-behind enabled the insert is buffered; `consistent=true` waits
+    for it to reach Mongo before responding.
     """
-    # Mock Analysis Logic (Replace with AI Integration later)
-    url = payload.get("url")
-    manual_data = payload.get("manual_data")
-    
-    if not url and not manual_data:
-        raise HTTPException(status_code=400, detail="Please provide product URL or manual details")
-
-    from app.services.scraper_engine import scraper_engine
-    
-    # Scrape URL if provided
-    if url:
-        scraped_data = scraper_engine.scrape_url(url)
-        if not scraped_data or "error" in scraped_data:
-            error_msg = scraped_data.get("error", "Failed to scrape product data from URL")
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        product_name = scraped_data["title"]
-        product_description = scraped_data["description"]
-        product_price = scraped_data["price"]
-        product_mrp = scraped_data.get("mrp", "0")
-        product_category = scraped_data["category"]
-        product_image_url = scraped_data["image_url"]
-    
-    # Use Manual Data if provided (Fallback or Override)
-    if manual_data:
-        product_name = manual_data.get("title", product_name)
-        product_description = manual_data.get("description", product_description)
-        product_price = manual_data.get("price", product_price)
-        product_mrp = manual_data.get("mrp", product_mrp)
-        product_category = manual_data.get("category", product_category)
-        product_image_url = manual_data.get("image_url", product_image_url)
-
-    # Run Compliance Engine
-    analysis_input = {
-        "title": product_name,
-        "description": product_description,
-        "price": product_price,
-        "mrp": product_mrp,
-        "category": product_category,
-        "image_url": product_image_url
-    }
-    
-    logging.info("DEBUG: Starting Compliance Engine...")
-    analysis_result = compliance_engine.evaluate_product(analysis_input)
-    logging.info("DEBUG: Compliance Engine Finished.")
-
-    # Price Intelligence
     try:
-        from app.services.price_intelligence import price_intelligence
-        deals = price_intelligence.find_deals(product_name, product_price)
-    except Exception as e:
-        logging.error(f"Price Intelligence Error: {e}")
-        deals = []
-
-    result = ProductSchema(
-        name=product_name,
-        description=product_description,
-        price=product_price,
-        mrp=product_mrp,
-        category=product_category,
-        url=url,
-        images=[product_image_url] if product_image_url else [],
-        compliance_score=analysis_result["compliance_score"],
-        risk_level=analysis_result["risk_level"],
-        violations=analysis_result["violations"],
-        deals=deals
-    )
-
-
+        result = await analysis_pipeline.run(payload)
+    except AnalysisInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Save to MongoDB (Best Effort)
     product_dict = result.dict()
+    product_dict["rollup"] = rollups.snapshot(product_dict)
     logging.info("DEBUG: Connecting to MongoDB...")
     try:
-        await database.get_collection("products").insert_one(product_dict)
+        await write_buffer.insert("products", product_dict)
+        if consistent:
+            await write_buffer.flush()
+        await sync_product(product_dict["_id"], product_dict)
+        await rollups.apply(product_dict["rollup"])
+        await price_stats.record(product_dict.get("category"), product_dict.get("price"))
         logging.info("DEBUG: MongoDB Insert Complete.")
     except Exception as e:
         logging.error(f"DEBUG: MongoDB Insert Failed: {e}")
@@ -97,6 +58,77 @@ async def analyze_product(payload: Dict[str, Any] = Body(...)):
     
     return result
 
+async def _insert_products(docs: List[dict]):
+    # Bulk write; unordered so one bad document does not drop the rest
+    failed = set()
+    for doc in docs:
+        doc["rollup"] = rollups.snapshot(doc)
+    try:
+        await database.get_collection("products").insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        logging.error(f"DEBUG: MongoDB Bulk Insert Failed for {len(failed)} documents: {e}")
+    except Exception as e:
+        logging.error(f"DEBUG: MongoDB Bulk Insert Failed: {e}")
+        return
+    inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+    await sync_products((doc["_id"], doc) for doc in inserted)
+    await rollups.apply_many((doc["rollup"], None) for doc in inserted)
+    await price_stats.record_many(inserted)
+
+@router.post("/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Analyze many listings with bounded concurrency.
+    Streams one NDJSON line per item as soon as it finishes (completion order):
+    {"index": 3, "result": {...ProductSchema...}} or {"index": 3, "error": "..."}
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_ITEMS} items)")
+
+    concurrency = max(1, min(request.concurrency or MAX_BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY))
+    items = request.items
+
+    async def stream():
+        pending = iter(enumerate(items))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            for index, payload in pending:
+                try:
+                    result = await analysis_pipeline.run(payload)
+                    await results.put((index, result, None))
+                except AnalysisInputError as e:
+                    await results.put((index, None, str(e)))
+                except Exception as e:
+                    logging.error(f"Batch item {index} failed: {e}")
+                    await results.put((index, None, "Analysis failed"))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+        to_insert = []
+        try:
+            for _ in range(len(items)):
+                index, result, error = await results.get()
+                if error is not None:
+                    yield json.dumps({"index": index, "error": error}) + "\n"
+                    continue
+
+                to_insert.append(result.dict())
+                if len(to_insert) >= BATCH_INSERT_SIZE:
+                    await _insert_products(to_insert)
+                    to_insert = []
+                yield f'{{"index": {index}, "result": {result.json()}}}\n'
+        finally:
+            # Client disconnects cancel the remaining work
+            for w in workers:
+                w.cancel()
+            if to_insert:
+                await _insert_products(to_insert)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/report/{report_id}")
 async def get_report(report_id: str):
     return {"message": "Report fetching not implemented yet"}
@@ -1,77 +1,52 @@
 from fastapi import APIRouter, Query
-from app.core.database import database
 from typing import List, Optional
-import random
 
 router = APIRouter()
 
+@router.get("/llm-cache")
+async def get_llm_cache_stats():
+    """
+    Hit/miss counters for the Gemini response cache.
+    """
+    from app.ai.llm_cache import llm_cache
+    return llm_cache.stats()
+
+@router.get("/write-buffer")
+async def get_write_buffer_stats():
+    """
+    Flush size/latency metrics for the write-behind buffer.
+    """
+    from app.core.write_buffer import write_buffer
+    return write_buffer.metrics()
+
+@router.get("/price-stats")
+async def get_price_stats():
+    """
+    Per-category price mean/std used by the Z-score check (this process's view).
+    """
+    from app.services.price_stats import price_stats
+    return price_stats.summary()
+
+@router.get("/price-models")
+async def get_price_models():
+    """
+    When the loaded IsolationForest models were trained and on how many prices each.
+    """
+    from app.services.price_models import price_models
+    return price_models.summary()
+
 @router.get("/dashboard")
 async def get_dashboard_stats(
     category: Optional[str] = None,
     days: int = 30
 ):
-    collection = database.get_collection("products")
-    
-    # Base Filter
-    query = {}
-    if category and category != "all":
-        # Rough match because we stored arbitrary categories
-        query["description"] = {"$regex": category, "$options": "i"} 
-        # Ideally we should have stored 'category' field in root of document, 
-        # but ProductSchema doesn't have it at root in my current model (it was in manual inputs). 
-        # Wait, ProductSchema HAS NO CATEGORY FIELD ROOT! 
-        # I should probably fix that, but for now I'll skip category filter details or use loose match.
-
+    """
+    Served from the incrementally maintained rollups (app/services/rollups.py),
+    or one $facet aggregation when they are empty; cached briefly per (category, days).
+    """
+    from app.services.dashboard import get_dashboard
     try:
-        # 1. Overview Stats
-        total_products = await collection.count_documents(query)
-        
-        pipeline_avg = [
-            {"$match": query},
-            {"$group": {"_id": None, "avg_score": {"$avg": "$compliance_score"}}}
-        ]
-        avg_res = await collection.aggregate(pipeline_avg).to_list(1)
-        avg_score = avg_res[0]["avg_score"] if avg_res else 0
-
-        # 2. Violations by Type
-        pipeline_violations = [
-            {"$match": query},
-            {"$unwind": "$violations"},
-            {"$group": {"_id": "$violations.type", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 5}
-        ]
-        violation_stats = await collection.aggregate(pipeline_violations).to_list(10)
-        
-        # 3. Risk Distribution
-        pipeline_risk = [
-            {"$match": query},
-            {"$group": {"_id": "$risk_level", "count": {"$sum": 1}}}
-        ]
-        risk_stats = await collection.aggregate(pipeline_risk).to_list(5)
-
-        return {
-            "summary": {
-                "total_analyzed": total_products,
-                "avg_compliance": round(avg_score, 1),
-                "critical_issues": sum(1 for r in risk_stats if "Critical" in str(r["_id"]))
-            },
-            "violations_by_type": [
-                {"name": v["_id"], "value": v["count"]} for v in violation_stats
-            ],
-            "risk_distribution": [
-                 {"name": r["_id"], "value": r["count"]} for r in risk_stats
-            ],
-            "score_trend": [
-                {"date": "Mon", "score": random.randint(75, 95)},
-                {"date": "Tue", "score": random.randint(70, 90)},
-                {"date": "Wed", "score": random.randint(80, 95)},
-                {"date": "Thu", "score": random.randint(75, 88)},
-                {"date": "Fri", "score": random.randint(82, 98)},
-                {"date": "Sat", "score": avg_score}, 
-                {"date": "Sun", "score": avg_score + 2} 
-            ]
-        }
+        return await get_dashboard(category, days)
     except Exception as e:
         print(f"Analytics DB Error: {e}")
         return {
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import os
 from app.core.database import database
-from app.ai.nlp_engine import nlp_engine
 from app.models.product import TimelineEvent
+from app.services.job_queue import job_queue
+from app.services.ingestion_jobs import ANALYZE_TEXT_JOB, INGEST_URL_JOB
+from app.utils.urls import canonicalize_url
 
 router = APIRouter()
 
+# A URL ingested this recently is served from the existing product instead of re-scraped
+INGEST_DEDUP_HOURS = float(os.getenv("INGEST_DEDUP_HOURS", "24"))
+
 class TextIngestRequest(BaseModel):
     text: str
     source: str = "Unknown" # e.g., "Email", "Invoice"
@@ -15,40 +22,8 @@ class TextIngestRequest(BaseModel):
 class UrlIngestRequest(BaseModel):
     url: str
 
-async def analyze_and_update(product_id: str, text: str):
-    """
-    Background task to run full analysis after ingestion
-    """
-    # 1. Analyze
-    analysis_result = nlp_engine.analyze(text)
-    
-    # 2. Compute Risk Score
-    score = nlp_engine.compute_risk_score(analysis_result)
-    
-    # 3. Create Timeline Event
-    analyzed_event = TimelineEvent(
-        event="Compliance Analysis",
-        details=f"Risk Score: {score['impact_score']}, Confidence: {score['confidence']}"
-    ).dict()
-    
-    # 4. Update DB
-    collection = database.get_collection("products")
-    await collection.update_one(
-        {"_id": product_id},
-        {
-            "$set": {
-                "compliance_score": 100 - score["impact_score"],
-                "risk_level": "High" if score["impact_score"] > 50 else "Low", 
-                # Note: In a real app we'd map violations properly here
-            },
-            "$push": {
-                "timeline": analyzed_event
-            }
-        }
-    )
-
 @router.post("/text")
-async def ingest_text(request: TextIngestRequest, background_tasks: BackgroundTasks):
+async def ingest_text(request: TextIngestRequest):
     collection = database.get_collection("products")
     
     # Create initial product entry
@@ -70,24 +45,48 @@ async def ingest_text(request: TextIngestRequest, background_tasks: BackgroundTa
     
     result = await collection.insert_one(product_doc)
     
-    # Trigger background analysis
-    background_tasks.add_task(analyze_and_update, result.inserted_id, request.text)
+    # Queue the analysis; a worker (worker.py) picks it up
+    job_id, _ = await job_queue.enqueue(ANALYZE_TEXT_JOB, {"product_id": result.inserted_id, "text": request.text})
     
-    return {"id": str(result.inserted_id), "status": "Ingested, analysis queued"}
+    return {"id": str(result.inserted_id), "job_id": str(job_id), "status": "Ingested, analysis queued"}
 
 @router.post("/url")
-async def ingest_url(request: UrlIngestRequest, background_tasks: BackgroundTasks):
-    # In a real scenario, we'd fetch the URL content here.
-    # For now, we'll simulate it.
-    
+async def ingest_url(request: UrlIngestRequest):
+    """
+    Queues fetch -> extract -> analyse for a listing URL. The same listing
+    (after canonicalisation) is not scraped again while a job for it is pending
+    or if it was ingested within INGEST_DEDUP_HOURS.
+    """
+    canonical_url = canonicalize_url(request.url)
+    if not urlsplit(canonical_url).hostname:
+        raise HTTPException(status_code=400, detail="Invalid URL")
+    dedupe_key = f"{INGEST_URL_JOB}:{canonical_url}"
+
+    pending = await job_queue.find_pending(dedupe_key)
+    if pending is not None:
+        return {"id": str(pending["payload"]["product_id"]), "job_id": str(pending["_id"]), "status": "Already queued", "deduplicated": True}
+
     collection = database.get_collection("products")
-    
+    recent = await collection.find_one(
+        {
+            "canonical_url": canonical_url,
+            "ingest_status": "completed",
+            "ingested_at": {"$gte": datetime.utcnow() - timedelta(hours=INGEST_DEDUP_HOURS)}
+        },
+        {"_id": 1},
+        sort=[("ingested_at", -1)]
+    )
+    if recent is not None:
+        return {"id": str(recent["_id"]), "job_id": None, "status": "Recently analysed", "deduplicated": True}
+
     product_doc = {
         "name": "Product from URL",
         "url": request.url,
+        "canonical_url": canonical_url,
         "price": "Pending",
         "compliance_score": 100,
         "risk_level": "Processing",
+        "ingest_status": "queued",
         "violations": [],
         "timeline": [
             TimelineEvent(
@@ -99,9 +98,22 @@ async def ingest_url(request: UrlIngestRequest, background_tasks: BackgroundTask
     }
     
     result = await collection.insert_one(product_doc)
+    job_id, created = await job_queue.enqueue(
+        # The canonical form is only the dedupe key; fetch exactly what was submitted
+        INGEST_URL_JOB, {"product_id": result.inserted_id, "url": request.url, "canonical_url": canonical_url}, dedupe_key=dedupe_key
+    )
+    if not created:
+        # Lost a race with an identical request: drop our placeholder, point at theirs
+        await collection.delete_one({"_id": result.inserted_id})
+        pending = await job_queue.find_pending(dedupe_key)
+        product_id = pending["payload"]["product_id"] if pending else result.inserted_id
+        return {"id": str(product_id), "job_id": str(job_id), "status": "Already queued", "deduplicated": True}
     
-    # Simulate text extraction
-    mock_text = f"Product content from {request.url}. This is a placeholder for scraped content."
-    background_tasks.add_task(analyze_and_update, result.inserted_id, mock_text)
-    
-    return {"id": str(result.inserted_id), "status": "URL queued for scraping and analysis"}
+    return {"id": str(result.inserted_id), "job_id": str(job_id), "status": "URL queued for scraping and analysis", "deduplicated": False}
+
+@router.get("/jobs/stats")
+async def job_stats():
+    """
+    Queue depth by status (queued / leased / dead).
+    """
+    return await job_queue.stats()
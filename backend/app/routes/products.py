@@ -1,12 +1,38 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.core.database import database
+from app.core.write_buffer import write_buffer
+from app.core.responses import FastJSONResponse
 from app.models.product import ProductSchema
 from bson import ObjectId
+from app.services.exporter import EXPORT_FORMATS, ExportError, build_filters, export_filename, stream_export
+from app.services.rollups import category_match
+from app.utils.pagination import CountCache, InvalidCursor, decode_cursor, encode_cursor, query_fingerprint
+import os
+import re
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+# "text": products_text index, whole words in name or description. "prefix": names starting with
+# the search term, case-insensitive (closest to the old substring match, but not index-bounded)
+PRODUCT_SEARCH_MODE = os.getenv("PRODUCT_SEARCH_MODE", "text").lower()
+product_counts = CountCache()
+
+# Only what the list renders; counts and first image are computed in Mongo (4.4+ projection expressions)
+LIST_PROJECTION = {
+    "name": 1, "description": 1, "price": 1, "compliance_score": 1, "risk_level": 1, "created_at": 1,
+    "violations_count": {"$size": {"$ifNull": ["$violations", []]}},
+    "image_url": {"$arrayElemAt": ["$images", 0]},
+}
+
 def product_helper(product) -> dict:
+    if "violations_count" in product: # Projected list row
+        violations_count, image_url = product["violations_count"], product.get("image_url")
+    else:
+        violations_count = len(product.get("violations", []))
+        image_url = product.get("images", [""])[0] if product.get("images") else None
     return {
         "id": str(product["_id"]),
         "name": product["name"],
@@ -14,44 +40,105 @@ def product_helper(product) -> dict:
         "price": product.get("price", 0),
         "compliance_score": product.get("compliance_score", 0),
         "risk_level": product.get("risk_level", "Unknown"),
-        "violations_count": len(product.get("violations", [])),
+        "violations_count": violations_count,
         "created_at": product.get("created_at"), # Assuming this exists or we add it
         # Safely get first image or placeholder
-        "image_url": product.get("images", [""])[0] if product.get("images") else None
+        "image_url": image_url
     }
 
-@router.get("/", response_description="List all analyzed products")
+@router.get("/", response_description="List all analyzed products", response_class=FastJSONResponse)
 async def get_products(
     skip: int = 0,
     limit: int = 20,
     risk_level: Optional[str] = None,
     category: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
+    """
+    Newest first. Pass the returned `next_cursor` as `cursor` to get the next
+    page (keyset on _id, flat cost at any depth); `skip` is still honoured
+    when no cursor is given. `total` comes from a cache refreshed in the
+    background and may lag by COUNT_CACHE_TTL_SECONDS (`total_is_exact`); it
+    is left out when the first count for the filters timed out.
+    `search` matches whole words (see PRODUCT_SEARCH_MODE for prefix matching).
+    """
     collection = database.get_collection("products")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
     
     # Build Query
     query = {}
     if risk_level and risk_level != "All":
         query["risk_level"] = risk_level
+
+    if category and category != "All":
+        query.update(category_match(category)) # Same grouping as the dashboard rollups
     
     if search:
-        query["name"] = {"$regex": search, "$options": "i"}
+        if PRODUCT_SEARCH_MODE == "prefix":
+            query["name"] = {"$regex": f"^{re.escape(search)}", "$options": "i"}
+        else:
+            # Served by the products_text index: whole words, so "head" does not match "headphones"
+            query["$text"] = {"$search": search}
+
+    page_query = query
+    if cursor:
+        try:
+            after_id = decode_cursor(cursor, query)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_query = {**query, "_id": {"$lt": after_id}}
+
+    async def count(max_time_ms: Optional[int]) -> int:
+        if not query:
+            return await collection.estimated_document_count() # Collection metadata, O(1)
+        options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+        return await collection.count_documents(query, **options)
 
     try:
         # Execute
-        total_count = await collection.count_documents(query)
-        cursor = collection.find(query).skip(skip).limit(limit).sort("_id", -1) # Sort by newest
-        products = await cursor.to_list(length=limit)
+        total_count, exact = await product_counts.get(query_fingerprint(query), count)
+        find = collection.find(page_query, LIST_PROJECTION).sort("_id", -1) # Sort by newest
+        if skip and not cursor:
+            find = find.skip(skip)
+        products = await find.limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(products) > limit
+        products = products[:limit]
         
-        return {
-            "total": total_count,
+        page = {
+            "total_is_exact": exact,
             "page": (skip // limit) + 1,
-            "data": [product_helper(p) for p in products]
+            "data": [product_helper(p) for p in products],
+            "has_more": has_more,
+            "next_cursor": encode_cursor(products[-1]["_id"], query) if has_more else None
         }
+        if total_count is not None: # Omitted while the first count for these filters is still running
+            page["total"] = total_count
+        return FastJSONResponse(page)
     except Exception as e:
         print(f"DB Error: {e}")
-        return {"total": 0, "page": 1, "data": []}
+        return {"total": 0, "total_is_exact": False, "page": 1, "data": [], "has_more": False, "next_cursor": None}
+
+@router.get("/export", response_description="Stream all matching products")
+async def export_products(
+    format: str = "ndjson",
+    risk_level: Optional[str] = None,
+    category: Optional[str] = None
+):
+    """
+    Streams every matching product as ndjson, csv or parquet straight off a
+    cursor (EXPORT_BATCH_SIZE docs per round trip), so memory stays flat
+    however many rows match. Filters behave as on GET /products.
+    """
+    try:
+        chunks = stream_export("products", format, build_filters("products", risk_level=risk_level, category=category))
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("products", format)}"'}
+    )
 
 @router.get("/{id}", response_description="Get a single product report")
 async def get_product(id: str):
@@ -60,6 +147,10 @@ async def get_product(id: str):
         raise HTTPException(status_code=400, detail="Invalid ID format")
     
     product = await collection.find_one({"_id": ObjectId(id)})
+    if product is None and write_buffer.pending:
+        # Read-your-write: the product may still be in the write-behind buffer
+        await write_buffer.flush()
+        product = await collection.find_one({"_id": ObjectId(id)})
     if product:
         # Return full details including full violations list
         p = product_helper(product)
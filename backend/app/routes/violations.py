@@ -1,39 +1,45 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.core.database import database
 from typing import List, Optional
 from bson import ObjectId
+from app.core.responses import FastJSONResponse
+from app.services.exporter import EXPORT_FORMATS, ExportError, build_filters, export_filename, stream_export
+from app.services.violation_store import VIOLATIONS_COLLECTION, VIOLATION_FIELDS
 
 router = APIRouter()
 
+# Every key has a matching (<key>, _id) index on `violations` (app/core/indexes.py)
+SORT_FIELDS = {"impact_score", "confidence", "detected_at", "updated_at", "product_name", "type", "severity", "status"}
+
 @router.get("/stats")
 async def get_violation_stats():
     """
     Get aggregated statistics for the violations dashboard.
     """
     pipeline = [
-        {"$unwind": "$violations"},
         {"$group": {
             "_id": None,
             "total_violations": {"$sum": 1},
-            "avg_confidence": {"$avg": "$violations.confidence"},
-            "avg_impact": {"$avg": "$violations.impact_score"},
+            "avg_confidence": {"$avg": "$confidence"},
+            "avg_impact": {"$avg": "$impact_score"},
             "critical_count": {
-                "$sum": {"$cond": [{"$eq": ["$violations.severity", "critical"]}, 1, 0]}
+                "$sum": {"$cond": [{"$eq": ["$severity", "critical"]}, 1, 0]}
             },
             "high_count": {
-                "$sum": {"$cond": [{"$eq": ["$violations.severity", "high"]}, 1, 0]}
+                "$sum": {"$cond": [{"$eq": ["$severity", "high"]}, 1, 0]}
             },
             "medium_count": {
-                "$sum": {"$cond": [{"$eq": ["$violations.severity", "medium"]}, 1, 0]}
+                "$sum": {"$cond": [{"$eq": ["$severity", "medium"]}, 1, 0]}
             },
             "low_count": {
-                "$sum": {"$cond": [{"$eq": ["$violations.severity", "low"]}, 1, 0]}
+                "$sum": {"$cond": [{"$eq": ["$severity", "low"]}, 1, 0]}
             }
         }}
     ]
 
     try:
-        stats = await database.get_collection("products").aggregate(pipeline).to_list(1)
+        stats = await database.get_collection(VIOLATIONS_COLLECTION).aggregate(pipeline).to_list(1)
         if not stats:
             return {
                 "total_violations": 0,
@@ -52,7 +58,7 @@ async def get_violation_stats():
         print(f"Error fetching stats: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@router.get("/")
+@router.get("/", response_class=FastJSONResponse)
 async def get_violations(
     skip: int = 0,
     limit: int = 20,
@@ -62,41 +68,64 @@ async def get_violations(
 ):
     """
     Get a flattened list of violations with pagination, sorting, and filtering.
+    Served from the `violations` collection (one document per violation), so
+    filter + sort is an index range scan; product timelines are joined per page.
     """
-    pipeline = [
-        {"$unwind": {"path": "$violations", "includeArrayIndex": "violation_index"}},
-        {"$project": {
-            "_id": {"$toString": "$_id"},
-            "product_name": "$name",
-            "product_image": {"$arrayElemAt": ["$images", 0]},
-            "violation": "$violations",
-            "violation_index": "$violation_index",
-            "timeline": "$timeline",
-            "detected_at": "$created_at"
-        }}
-    ]
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(sorted(SORT_FIELDS))}")
 
-    # Filters
     match_stage = {}
     if severity:
-        match_stage["violation.severity"] = severity
+        match_stage["severity"] = severity
     if status:
-        match_stage["violation.status"] = status
-    
-    if match_stage:
-        pipeline.append({"$match": match_stage})
+        match_stage["status"] = status
 
-    # Sorting
-    sort_dir = -1  # Descending by default
-    pipeline.append({"$sort": {f"violation.{sort_by}": sort_dir}})
-
-    # Pagination
-    pipeline.append({"$skip": skip})
-    pipeline.append({"$limit": limit})
+    pipeline = [
+        {"$match": match_stage},
+        {"$sort": {sort_by: -1, "_id": -1}}, # Descending by default
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "products",
+            "localField": "product_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 0, "timeline": 1}}],
+            "as": "product"
+        }},
+        {"$project": {
+            "_id": {"$toString": "$product_id"},
+            "product_name": 1,
+            "product_image": 1,
+            "violation": {field: f"${field}" for field in VIOLATION_FIELDS},
+            "violation_index": 1,
+            "timeline": {"$ifNull": [{"$arrayElemAt": ["$product.timeline", 0]}, []]},
+            "detected_at": 1
+        }}
+    ]
 
     try:
-        results = await database.get_collection("products").aggregate(pipeline).to_list(limit)
-        return results
+        results = await database.get_collection(VIOLATIONS_COLLECTION).aggregate(pipeline).to_list(limit)
+        return FastJSONResponse(results)
     except Exception as e:
         print(f"Error fetching violations: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@router.get("/export")
+async def export_violations(
+    format: str = "ndjson",
+    severity: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """
+    Streams every matching violation (one row each, with product name and
+    category) as ndjson, csv or parquet. Filters behave as on GET /violations.
+    """
+    try:
+        chunks = stream_export("violations", format, build_filters("violations", severity=severity, status=status))
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("violations", format)}"'}
+    )
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+from app.models.product import ProductSchema, TimelineEvent
+from app.services.compliance_engine import compliance_engine
+
+# How many analyses a single worker keeps in flight before new ones wait
+MAX_INFLIGHT_ANALYSES = int(os.getenv("MAX_INFLIGHT_ANALYSES", "64"))
+
+class AnalysisInputError(ValueError):
+    """
+    Raised when a payload cannot be turned into an analysis input
+    (missing url/manual_data, scraper failure). Routes map it to HTTP 400.
+    """
+
+class AnalysisPipeline:
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_ANALYSES):
+        self.max_inflight = max_inflight
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+        return self._slots
+
+    async def build_input(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Input: {"url": "..."} OR {"manual_data": {...}}
+        Returns the compliance engine input and the source URL.
+        """
+        url = payload.get("url")
+        manual_data = payload.get("manual_data")
+
+        if not url and not manual_data:
+            raise AnalysisInputError("Please provide product URL or manual details")
+
+        product_name = product_description = product_price = None
+        product_mrp = product_category = product_image_url = None
+
+        # Scrape URL if provided
+        if url:
+            from app.services.scraper_engine import scraper_engine
+
+            scraped_data = await scraper_engine.scrape_url_async(url)
+            if not scraped_data or "error" in scraped_data:
+                error_msg = scraped_data.get("error", "Failed to scrape product data from URL")
+                raise AnalysisInputError(error_msg)
+
+            product_name = scraped_data["title"]
+            product_description = scraped_data["description"]
+            product_price = scraped_data["price"]
+            product_mrp = scraped_data.get("mrp", "0")
+            product_category = scraped_data["category"]
+            product_image_url = scraped_data["image_url"]
+
+        # Use Manual Data if provided (Fallback or Override)
+        if manual_data:
+            product_name = manual_data.get("title", product_name)
+            product_description = manual_data.get("description", product_description)
+            product_price = manual_data.get("price", product_price)
+            product_mrp = manual_data.get("mrp", product_mrp)
+            product_category = manual_data.get("category", product_category)
+            product_image_url = manual_data.get("image_url", product_image_url)
+
+        analysis_input = {
+            "title": product_name,
+            "description": product_description,
+            "price": product_price,
+            "mrp": product_mrp,
+            "category": product_category,
+            "image_url": product_image_url,
+            "url": url
+        }
+        return analysis_input, url
+
+    async def evaluate(self, analysis_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compliance checks for an already-built input, under the in-flight cap.
+        """
+        async with self._get_slots():
+            return await compliance_engine.evaluate_product_async(analysis_input)
+
+    def find_deals(self, analysis_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Price Intelligence (pure string building, cheap enough to stay inline)
+        try:
+            from app.services.price_intelligence import price_intelligence
+            return price_intelligence.find_deals(analysis_input["title"], analysis_input["price"])
+        except Exception as e:
+            logging.error(f"Price Intelligence Error: {e}")
+            return []
+
+    async def run(self, payload: Dict[str, Any]) -> ProductSchema:
+        """
+        Scrape (optional) -> compliance checks -> price intelligence.
+        Nothing here blocks the event loop; persistence is left to the caller.
+        """
+        async with self._get_slots():
+            analysis_input, url = await self.build_input(payload)
+
+            logging.info("DEBUG: Starting Compliance Engine...")
+            analysis_result = await compliance_engine.evaluate_product_async(analysis_input)
+            logging.info("DEBUG: Compliance Engine Finished.")
+
+        deals = self.find_deals(analysis_input)
+
+        timeline = []
+        if analysis_result.get("timed_out_checks"):
+            timeline.append(TimelineEvent(
+                event="Partial Analysis",
+                details=f"Timed out: {', '.join(analysis_result['timed_out_checks'])}"
+            ))
+
+        image_url = analysis_input["image_url"]
+        return ProductSchema(
+            name=analysis_input["title"],
+            description=analysis_input["description"],
+            price=analysis_input["price"],
+            mrp=analysis_input["mrp"],
+            category=analysis_input["category"],
+            url=url,
+            images=[image_url] if image_url else [],
+            compliance_score=analysis_result["compliance_score"],
+            risk_level=analysis_result["risk_level"],
+            violations=[v.to_schema() for v in analysis_result["violations"]], # Records -> pydantic only here
+            timeline=timeline,
+            deals=deals
+        )
+
+analysis_pipeline = AnalysisPipeline()
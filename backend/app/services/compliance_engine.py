@@ -1,8 +1,19 @@
-from typing import Dict, List, Any
+import asyncio
+import logging
+import os
+from typing import Dict, List, Any, Optional
 from app.models.product import ViolationSchema
 from app.services.pricing import pricing_engine
 from app.services.image_engine import image_engine
 from app.ai.nlp_engine import nlp_engine
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.image_index import image_index
+
+# Async evaluation settings: "concurrent" fans out the remote checks, "sequential" awaits them in turn
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "concurrent").lower()
+IMAGE_CHECK_TIMEOUT = float(os.getenv("IMAGE_CHECK_TIMEOUT", "20"))
+NLP_CHECK_TIMEOUT = float(os.getenv("NLP_CHECK_TIMEOUT", "20"))
+LISTING_TIME_BUDGET = float(os.getenv("LISTING_TIME_BUDGET", "30"))
 
 # Rule Catalog
 RULES_CATALOG = {
@@ -83,6 +94,13 @@ RULES_CATALOG = {
         "regulation": {"act": "IT Act, 2000", "section": "Section 67"},
         "fix": "Remove the inappropriate content immediately."
     },
+    "KNOWN_COUNTERFEIT_IMAGE": {
+        "severity": "high", 
+        "weight": 40, 
+        "description": "Image matches a photo from a previously flagged counterfeit listing",
+        "regulation": {"act": "Trade Marks Act, 1999", "section": "Section 29"},
+        "fix": "Use original photographs of the genuine product you are selling."
+    },
     "IMAGE_MISMATCH": {
         "severity": "high", 
         "weight": 40, 
@@ -92,6 +110,89 @@ RULES_CATALOG = {
     },
 }
 
+# Rules referenced without a catalog entry: no impact, but still cost score points
+UNKNOWN_RULE = {"severity": "low", "weight": 0, "penalty": 10, "description": "Unknown Violation", "regulation": None, "fix": None}
+
+class CompiledRule:
+    __slots__ = ("key", "severity", "weight", "penalty", "description", "regulation", "fix")
+
+    def __init__(self, key: str, spec: Dict[str, Any]):
+        self.key = key
+        self.severity = spec["severity"]
+        self.weight = spec["weight"]
+        self.penalty = spec.get("penalty", spec["weight"]) # Score points deducted per hit
+        self.description = spec["description"]
+        self.regulation = spec.get("regulation")
+        self.fix = spec.get("fix")
+
+class RulePlan:
+    """
+    RULES_CATALOG compiled once into rule objects, so a hit carries its rule
+    instead of looking it up again for the impact and the score.
+    """
+
+    def __init__(self, catalog: Dict[str, Dict[str, Any]]):
+        self.rules = {key: CompiledRule(key, spec) for key, spec in catalog.items()}
+
+    def __getitem__(self, key: str) -> CompiledRule:
+        rule = self.rules.get(key)
+        return rule if rule is not None else CompiledRule(key, UNKNOWN_RULE)
+
+class ViolationRecord:
+    """
+    One rule hit. Checks produce these; ViolationSchema is only built at the
+    API boundary (to_schema) and storage takes dict(), which has the same shape.
+    """
+    __slots__ = ("rule", "description", "evidence", "confidence", "impact_score")
+
+    def __init__(self, rule: CompiledRule, description: Optional[str] = None, evidence: Optional[str] = None, confidence: float = 1.0):
+        self.rule = rule
+        self.description = description or rule.description
+        self.evidence = evidence or "Rule check failed"
+        self.confidence = confidence
+        # Impact = Weight (0-50) * Confidence (0-1) * 2 -> 0-100
+        self.impact_score = int(rule.weight * confidence * 2)
+
+    @property
+    def type(self) -> str:
+        return self.rule.key
+
+    @property
+    def severity(self) -> str:
+        return self.rule.severity
+
+    def dict(self) -> Dict[str, Any]:
+        regulation = self.rule.regulation
+        return {
+            "type": self.rule.key,
+            "severity": self.rule.severity,
+            "description": self.description,
+            "evidence": self.evidence,
+            "confidence": self.confidence,
+            "impact_score": self.impact_score,
+            "status": "Open",
+            "regulation_mapping": dict(regulation) if regulation is not None else None,
+            "suggested_fix": self.rule.fix
+        }
+
+    def to_schema(self) -> ViolationSchema:
+        return ViolationSchema(**self.dict())
+
+class ViolationHits:
+    """
+    Hits in merge order with the score penalty summed as they are added.
+    """
+    __slots__ = ("records", "penalty")
+
+    def __init__(self):
+        self.records: List[ViolationRecord] = []
+        self.penalty = 0
+
+    def extend(self, records: List[ViolationRecord]):
+        for record in records:
+            self.records.append(record)
+            self.penalty += record.rule.penalty
+
 class ComplianceEngine:
     def __init__(self):
         # 1. Keyword Blacklists
@@ -101,8 +202,9 @@ class ComplianceEngine:
             "fake": ["first copy", "replica", "clone", "1:1 copy", "fake"]
         }
         
-        # 2. Brand Trademarks
+        # 2. Brand Trademarks (+ terms that turn a brand mention into a counterfeit signal)
         self.protected_brands = ["Gucci", "Rolex", "Nike", "Adidas", "Apple", "Samsung"]
+        self.replica_terms = ["copy", "replica", "clone", "duplicate", "first copy"]
 
         # 3. Mandatory Fields per Category
         self.mandatory_fields = {
@@ -111,27 +213,61 @@ class ComplianceEngine:
             "clothing": ["material", "size_chart", "mrp"]
         }
 
-    def _create_violation(self, rule_key: str, specific_desc: str = None, evidence: str = None, confidence: float = 1.0) -> ViolationSchema:
-        rule_def = RULES_CATALOG.get(rule_key, {"severity": "low", "weight": 0, "description": "Unknown Violation", "regulation": None, "fix": None})
-        
-        # Calculate Impact Score (Weight * Confidence * Multiplier)
-        # Scale: Weight (0-50) * Confidence (0-1) -> Impact (0-100)
-        # We'll normalize max weight (50) to 100 roughly.
-        impact = int(rule_def["weight"] * confidence * 2) 
-
-        return ViolationSchema(
-            type=rule_key,
-            severity=rule_def["severity"],
-            description=specific_desc or rule_def["description"],
-            evidence=evidence or "Rule check failed",
-            confidence=confidence,
-            impact_score=impact,
-            status="Open",
-            regulation_mapping=rule_def.get("regulation"),
-            suggested_fix=rule_def.get("fix")
-        )
+        # 4. Rule catalog, compiled once (call compile_rules() after editing RULES_CATALOG)
+        self.compile_rules()
+
+    def compile_rules(self):
+        self.plan = RulePlan(RULES_CATALOG)
 
-    def check_pricing_compliance(self, product_data: Dict[str, Any]) -> List[ViolationSchema]:
+    # Assigning any term list drops the compiled matcher; it is rebuilt on next use.
+    # After mutating a list in place, call invalidate_matcher().
+    @property
+    def blacklisted_keywords(self) -> Dict[str, List[str]]:
+        return self._blacklisted_keywords
+
+    @blacklisted_keywords.setter
+    def blacklisted_keywords(self, value: Dict[str, List[str]]):
+        self._blacklisted_keywords = value
+        self.invalidate_matcher()
+
+    @property
+    def protected_brands(self) -> List[str]:
+        return self._protected_brands
+
+    @protected_brands.setter
+    def protected_brands(self, value: List[str]):
+        self._protected_brands = value
+        self.invalidate_matcher()
+
+    @property
+    def replica_terms(self) -> List[str]:
+        return self._replica_terms
+
+    @replica_terms.setter
+    def replica_terms(self, value: List[str]):
+        self._replica_terms = value
+        self.invalidate_matcher()
+
+    def invalidate_matcher(self):
+        self._matcher = None
+
+    def _get_matcher(self) -> KeywordMatcher:
+        if self._matcher is None:
+            terms = []
+            for cat, keywords in self.blacklisted_keywords.items():
+                for order, keyword in enumerate(keywords):
+                    terms.append((keyword, ("keyword", cat, order)))
+            for order, brand in enumerate(self.protected_brands):
+                terms.append((brand, ("brand", brand, order)))
+            for term in self.replica_terms:
+                terms.append((term, ("replica", term, 0)))
+            self._matcher = KeywordMatcher(terms)
+        return self._matcher
+
+    def _create_violation(self, rule_key: str, specific_desc: str = None, evidence: str = None, confidence: float = 1.0) -> ViolationRecord:
+        return ViolationRecord(self.plan[rule_key], specific_desc, evidence, confidence)
+
+    def check_pricing_compliance(self, product_data: Dict[str, Any]) -> List[ViolationRecord]:
         violations = []
         # Clean currency symbols ($, ₹, Rs, Rs.) and commas
         price_str = str(product_data.get("price", "0")).replace("₹", "").replace("Rs.", "").replace("Rs", "").replace("$", "").replace(",", "").strip()
@@ -166,47 +302,112 @@ class ComplianceEngine:
         
         return violations
 
-    def check_image_compliance(self, product_data: Dict[str, Any]) -> List[ViolationSchema]:
-        violations = []
+    def _image_target(self, product_data: Dict[str, Any]) -> Optional[str]:
         image_url = product_data.get("image_url")
         images = product_data.get("images", [])
         
         # Handle new list format or legacy string
         has_image = bool(image_url) or (len(images) > 0 and bool(images[0]))
-
         if not has_image:
-            violations.append(self._create_violation("MISSING_IMAGE"))
-        else:
-             # Basic check using image_engine (mock/real)
-             # Use first image for analysis
-             target_url = image_url if image_url else images[0]
-             img_analysis = image_engine.analyze_image(
-                 target_url, 
-                 product_title=product_data.get("title", ""), 
-                 expected_category=product_data.get("category", "general")
-             )
-             
-             if img_analysis["has_watermark"]:
-                  violations.append(self._create_violation(
-                      "WATERMARK_DETECTED", 
-                      evidence=img_analysis["details"]
-                  ))
-             
-             if img_analysis.get("inappropriate_detected"):
-                  violations.append(self._create_violation(
-                      "INAPPROPRIATE_CONTENT",
-                      evidence=img_analysis["details"]
-                  ))
-
-             if img_analysis.get("cv_match") is False:
-                  violations.append(self._create_violation(
-                      "IMAGE_MISMATCH",
-                      evidence=img_analysis["details"]
-                  ))
+            return None
+        # Use first image for analysis
+        return image_url if image_url else images[0]
+
+    def _is_own_image(self, known: Dict[str, Any], product_data: Dict[str, Any]) -> bool:
+        # The index entry was flagged by this same listing (re-analysis), not by another seller
+        url = product_data.get("url")
+        if url:
+            return (known.get("counterfeit_url") or known.get("url")) == url
+        title = product_data.get("title")
+        return bool(title) and known.get("product_name") == title
+
+    def _image_violations(self, img_analysis: Dict[str, Any], product_data: Dict[str, Any]) -> List[ViolationRecord]:
+        violations = []
+        if img_analysis["has_watermark"]:
+             violations.append(self._create_violation(
+                 "WATERMARK_DETECTED", 
+                 evidence=img_analysis["details"]
+             ))
+        
+        if img_analysis.get("inappropriate_detected"):
+             violations.append(self._create_violation(
+                 "INAPPROPRIATE_CONTENT",
+                 evidence=img_analysis["details"]
+             ))
+
+        if img_analysis.get("cv_match") is False:
+             violations.append(self._create_violation(
+                 "IMAGE_MISMATCH",
+                 evidence=img_analysis["details"]
+             ))
 
+        known = img_analysis.get("known_image")
+        if known and known.get("counterfeit") and not self._is_own_image(known, product_data):
+             violations.append(self._create_violation(
+                 "KNOWN_COUNTERFEIT_IMAGE",
+                 evidence=f"Perceptual hash within {known['distance']} bits of image from '{known.get('product_name', 'unknown listing')}'",
+                 confidence=round(1 - known["distance"] / 64, 2)
+             ))
         return violations
 
-    def check_mandatory_fields(self, product_data: Dict[str, Any]) -> List[ViolationSchema]:
+    def _remember_image(self, img_analysis: Optional[Dict[str, Any]], product_data: Dict[str, Any], violations: List[ViolationRecord]) -> Optional[Dict[str, Any]]:
+        """
+        Stores this image's verdict in the perceptual-hash index so re-used photos
+        are recognised next time. Returns the record to persist, if any.
+        """
+        if not img_analysis or not img_analysis.get("phash"):
+            return None
+        verdict = {
+            "has_watermark": img_analysis["has_watermark"],
+            "inappropriate_detected": img_analysis.get("inappropriate_detected", False),
+            "local_details": img_analysis.get("local_details", ""),
+            "counterfeit": any(v.type == "BRAND_INFRINGEMENT" for v in violations),
+            "product_name": product_data.get("title"),
+            "url": product_data.get("url")
+        }
+        if img_analysis.get("cv_verified"):
+            verdict.update({
+                "title": product_data.get("title", ""),
+                "cv_match": img_analysis.get("cv_match"),
+                "cv_reason": img_analysis.get("cv_reason")
+            })
+        return image_index.remember(int(img_analysis["phash"], 16), verdict)
+
+    def _check_image(self, product_data: Dict[str, Any]):
+        """
+        Returns (violations, raw image analysis or None).
+        """
+        target_url = self._image_target(product_data)
+        if not target_url:
+            return [self._create_violation("MISSING_IMAGE")], None
+
+        # Basic check using image_engine (mock/real)
+        img_analysis = image_engine.analyze_image(
+            target_url, 
+            product_title=product_data.get("title", ""), 
+            expected_category=product_data.get("category", "general")
+        )
+        return self._image_violations(img_analysis, product_data), img_analysis
+
+    async def _check_image_async(self, product_data: Dict[str, Any]):
+        target_url = self._image_target(product_data)
+        if not target_url:
+            return [self._create_violation("MISSING_IMAGE")], None
+
+        img_analysis = await image_engine.analyze_image_async(
+            target_url,
+            product_title=product_data.get("title", ""),
+            expected_category=product_data.get("category", "general")
+        )
+        return self._image_violations(img_analysis, product_data), img_analysis
+
+    def check_image_compliance(self, product_data: Dict[str, Any]) -> List[ViolationRecord]:
+        return self._check_image(product_data)[0]
+
+    async def check_image_compliance_async(self, product_data: Dict[str, Any]) -> List[ViolationRecord]:
+        return (await self._check_image_async(product_data))[0]
+
+    def check_mandatory_fields(self, product_data: Dict[str, Any]) -> List[ViolationRecord]:
         violations = []
         category = product_data.get("category", "").lower()
         if category in self.mandatory_fields:
@@ -220,33 +421,43 @@ class ComplianceEngine:
                 ))
         return violations
 
-    def check_keywords_and_brands(self, text: str) -> List[ViolationSchema]:
+    def check_keywords_and_brands(self, text: str) -> List[ViolationRecord]:
         violations = []
-        text_lower = text.lower()
 
-        # Check Blacklists
-        for cat, keywords in self.blacklisted_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    violations.append(self._create_violation(
-                        "RESTRICTED_KEYWORD",
-                        specific_desc=f"Restricted term '{keyword}' found (Category: {cat})",
-                        evidence=f"Found '{keyword}' in text"
-                    ))
+        # Single pass over the text for blacklist, brand and replica terms
+        keyword_hits: Dict[tuple, List[int]] = {}
+        brand_hits: Dict[tuple, List[int]] = {}
+        replica_found = []
+        for hit in self._get_matcher().find_all(text):
+            kind, name, order = hit.tag
+            if kind == "keyword":
+                keyword_hits.setdefault((name, order, hit.term), []).append(hit.start)
+            elif kind == "brand":
+                brand_hits.setdefault((order, name), []).append(hit.start)
+            elif hit.term not in replica_found:
+                replica_found.append(hit.term)
+
+        # Check Blacklists (reported in catalog order, one violation per term)
+        categories = list(self.blacklisted_keywords)
+        for (cat, _, keyword), positions in sorted(keyword_hits.items(), key=lambda kv: (categories.index(kv[0][0]), kv[0][1])):
+            violations.append(self._create_violation(
+                "RESTRICTED_KEYWORD",
+                specific_desc=f"Restricted term '{keyword}' found (Category: {cat})",
+                evidence=f"Found '{keyword}' in text at position(s) {', '.join(map(str, positions))}"
+            ))
 
         # Check Counterfeits
-        for brand in self.protected_brands:
-            if brand.lower() in text_lower:
-                if any(x in text_lower for x in ["copy", "replica", "clone", "duplicate", "first copy"]):
-                     violations.append(self._create_violation(
-                        "BRAND_INFRINGEMENT",
-                        specific_desc=f"Counterfeit '{brand}' listing detected",
-                        evidence=f"Brand '{brand}' + replica keyword"
-                    ))
+        if replica_found:
+            for (_, brand), positions in sorted(brand_hits.items()):
+                violations.append(self._create_violation(
+                    "BRAND_INFRINGEMENT",
+                    specific_desc=f"Counterfeit '{brand}' listing detected",
+                    evidence=f"Brand '{brand}' at position(s) {', '.join(map(str, positions))} + replica keyword '{replica_found[0]}'"
+                ))
 
         return violations
 
-    def check_formatting_rules(self, product_data: Dict[str, Any]) -> List[ViolationSchema]:
+    def check_formatting_rules(self, product_data: Dict[str, Any]) -> List[ViolationRecord]:
         violations = []
         title = product_data.get("title", "")
         
@@ -264,22 +475,9 @@ class ComplianceEngine:
              
         return violations
 
-    def evaluate_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _nlp_violations(self, nlp_results: Dict[str, Any]) -> List[ViolationRecord]:
         violations = []
-        
-        # Combine text for analysis
-        full_text = f"{product_data.get('title', '')} {product_data.get('description', '')}"
-
-        # Run Checks
-        violations.extend(self.check_mandatory_fields(product_data))
-        violations.extend(self.check_keywords_and_brands(full_text))
-        violations.extend(self.check_pricing_compliance(product_data))
-        violations.extend(self.check_image_compliance(product_data))
-        violations.extend(self.check_formatting_rules(product_data))
 
-        # 2. AI Analysis Integration (Gemini AI)
-        nlp_results = nlp_engine.analyze(full_text)
-        
         # AI: Misleading Claims
         for term in nlp_results.get("misleading_terms", []):
              violations.append(self._create_violation(
@@ -306,15 +504,11 @@ class ComplianceEngine:
                  evidence=f"AI Reasoning: {nlp_results.get('reasoning', '')}",
                  confidence=0.90
              ))
-        
-        # 3. Calculate Score
-        score = 100
-        for v in violations:
-            # Lookup weight. If violation comes from AI with custom type, default to 10
-            rule_def = RULES_CATALOG.get(v.type, {"weight": 10}) 
-            score -= rule_def["weight"]
-        
-        score = max(0, score) # No negative scores
+        return violations
+
+    def _summarize(self, hits: ViolationHits) -> Dict[str, Any]:
+        # 3. Score (penalties were summed as the hits were merged)
+        score = max(0, 100 - hits.penalty) # No negative scores
 
         # 4. Risk Classification
         risk_level = "Safe"
@@ -327,7 +521,115 @@ class ComplianceEngine:
         return {
             "compliance_score": score,
             "risk_level": risk_level,
-            "violations": violations
+            "violations": hits.records
         }
 
+    def _merge(self, product_data: Dict[str, Any], full_text: str, image_violations: List[ViolationRecord],
+               nlp_results: Dict[str, Any]) -> ViolationHits:
+        # Fixed merge order, identical for every evaluation mode
+        hits = ViolationHits()
+        keyword_violations = self.check_keywords_and_brands(full_text)
+        if any(v.type == "BRAND_INFRINGEMENT" for v in keyword_violations):
+            # Already penalised for the counterfeit itself; a matching photo adds no new evidence
+            image_violations = [v for v in image_violations if v.type != "KNOWN_COUNTERFEIT_IMAGE"]
+        hits.extend(self.check_mandatory_fields(product_data))
+        hits.extend(keyword_violations)
+        hits.extend(self.check_pricing_compliance(product_data))
+        hits.extend(image_violations)
+        hits.extend(self.check_formatting_rules(product_data))
+        hits.extend(self._nlp_violations(nlp_results))
+        return hits
+
+    def _full_text(self, product_data: Dict[str, Any]) -> str:
+        # Combine text for analysis
+        return f"{product_data.get('title', '')} {product_data.get('description', '')}"
+
+    def evaluate_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        `violations` in the result are ViolationRecords; call to_schema() / dict() where they leave the engine.
+        """
+        full_text = self._full_text(product_data)
+        image_violations, img_analysis = self._check_image(product_data)
+
+        # 2. AI Analysis Integration (Gemini AI)
+        nlp_results = nlp_engine.analyze(full_text)
+
+        hits = self._merge(product_data, full_text, image_violations, nlp_results)
+        self._remember_image(img_analysis, product_data, hits.records)
+        return self._summarize(hits)
+
+    def evaluate_rules(self, product_data: Dict[str, Any], img_analysis: Optional[Dict[str, Any]] = None,
+                       nlp_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Re-scan with image/AI results that are already known (or absent): only
+        the local rules run, nothing remote is called and nothing is remembered.
+        """
+        if img_analysis is not None:
+            image_violations = self._image_violations(img_analysis, product_data)
+        elif not self._image_target(product_data):
+            image_violations = [self._create_violation("MISSING_IMAGE")]
+        else:
+            image_violations = []
+        return self._summarize(self._merge(product_data, self._full_text(product_data), image_violations, nlp_results or {}))
+
+    async def _persist_image(self, img_analysis, product_data: Dict[str, Any], violations: List[ViolationRecord]):
+        record = self._remember_image(img_analysis, product_data, violations)
+        if record is not None:
+            await image_index.persist(record)
+
+    async def _run_check(self, name: str, coro, timeout: float, default):
+        """
+        Awaits one remote check, falling back to `default` if it exceeds its timeout.
+        """
+        try:
+            return await asyncio.wait_for(coro, timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            logging.warning(f"Compliance check '{name}' timed out after {timeout:.1f}s")
+            return default
+
+    async def evaluate_product_async(self, product_data: Dict[str, Any], concurrent: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Non-blocking variant of evaluate_product(). The rule checks are cheap and
+        run inline; the image and Gemini checks are awaited.
+
+        In concurrent mode (default, see EVALUATION_MODE) the image and NLP checks
+        run at the same time, each bounded by its own timeout and by the
+        whole-listing budget. Results are merged in the same order as the
+        sequential mode, so scores do not depend on which check finished first.
+        """
+        if concurrent is None:
+            concurrent = EVALUATION_MODE == "concurrent"
+
+        full_text = self._full_text(product_data)
+
+        if not concurrent:
+            image_violations, img_analysis = await self._check_image_async(product_data)
+            nlp_results = await nlp_engine.analyze_async(full_text)
+
+            hits = self._merge(product_data, full_text, image_violations, nlp_results)
+            await self._persist_image(img_analysis, product_data, hits.records)
+            return self._summarize(hits)
+
+        # Both remote checks start now, so the budget caps each of them directly
+        image_timeout = min(IMAGE_CHECK_TIMEOUT, LISTING_TIME_BUDGET)
+        nlp_timeout = min(NLP_CHECK_TIMEOUT, LISTING_TIME_BUDGET)
+        timed_out = []
+
+        image_task = self._run_check("image", self._check_image_async(product_data), image_timeout, None)
+        nlp_task = self._run_check("nlp", nlp_engine.analyze_async(full_text), nlp_timeout, None)
+        image_outcome, nlp_results = await asyncio.gather(image_task, nlp_task)
+
+        image_violations, img_analysis = image_outcome or ([], None)
+        if image_outcome is None:
+            timed_out.append("image")
+        if nlp_results is None:
+            timed_out.append("nlp")
+            nlp_results = {}
+
+        hits = self._merge(product_data, full_text, image_violations, nlp_results)
+        await self._persist_image(img_analysis, product_data, hits.records)
+        result = self._summarize(hits)
+        result["timed_out_checks"] = timed_out
+        return result
+
 compliance_engine = ComplianceEngine()
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from app.core.database import database
+from app.core.single_flight import SingleFlightCache
+from app.services import rollups
+
+# "rollups": incremental rollups, falling back to the aggregation while they are empty
+# (not rebuilt yet). "aggregate": always the single $facet aggregation over products.
+DASHBOARD_SOURCE = os.getenv("DASHBOARD_SOURCE", "rollups").lower()
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+
+dashboard_cache = SingleFlightCache(DASHBOARD_CACHE_TTL_SECONDS)
+
+def dashboard_pipeline(category: Optional[str] = None, days: int = 30) -> List[Dict[str, Any]]:
+    """
+    $facet over a shared $match: summary, top violation types, risk split and daily trend.
+    """
+    query: Dict[str, Any] = {"risk_level": {"$ne": "Processing"}}
+    if category and category != "all":
+        query.update(rollups.category_match(category))
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=max(1, days) - 1)
+
+    return [
+        {"$match": query},
+        {"$facet": {
+            "summary": [
+                {"$group": {"_id": None, "total": {"$sum": 1}, "avg_score": {"$avg": "$compliance_score"}}}
+            ],
+            "violations_by_type": [
+                {"$unwind": "$violations"},
+                {"$group": {"_id": "$violations.type", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 5}
+            ],
+            "risk_distribution": [
+                {"$group": {"_id": "$risk_level", "count": {"$sum": 1}}}
+            ],
+            "score_trend": [
+                {"$match": {"created_at": {"$gte": start}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "score": {"$avg": "$compliance_score"}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
+    ]
+
+async def aggregate_dashboard(category: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+    """
+    The whole dashboard from products in one round trip ($facet over a shared $match).
+    """
+    pipeline = dashboard_pipeline(category, days)
+    result = (await database.get_collection("products").aggregate(pipeline).to_list(1))[0]
+
+    summary = result["summary"][0] if result["summary"] else {"total": 0, "avg_score": 0}
+    risk_stats = result["risk_distribution"]
+    return {
+        "summary": {
+            "total_analyzed": summary["total"],
+            "avg_compliance": round(summary["avg_score"] or 0, 1),
+            "critical_issues": sum(r["count"] for r in risk_stats if "Critical" in str(r["_id"]))
+        },
+        "violations_by_type": [
+            {"name": v["_id"], "value": v["count"]} for v in result["violations_by_type"]
+        ],
+        "risk_distribution": [
+            {"name": r["_id"], "value": r["count"]} for r in risk_stats
+        ],
+        "score_trend": [
+            {"date": t["_id"], "score": round(t["score"] or 0, 1)} for t in result["score_trend"]
+        ]
+    }
+
+async def _compute(category: Optional[str], days: int) -> Dict[str, Any]:
+    if DASHBOARD_SOURCE == "rollups":
+        stats = await rollups.dashboard(category, days)
+        if stats["summary"]["total_analyzed"]:
+            return stats
+    return await aggregate_dashboard(category, days)
+
+async def get_dashboard(category: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+    """
+    Cached per (category, days) for DASHBOARD_CACHE_TTL_SECONDS; concurrent
+    requests for the same key share one computation.
+    """
+    key = (rollups.normalize_category(category) if category and category != "all" else "all", days)
+    return await dashboard_cache.get(key, lambda: _compute(category, days))
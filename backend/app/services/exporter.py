@@ -0,0 +1,218 @@
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import orjson
+from bson import ObjectId
+from app.core.concurrency import run_cpu
+from app.core.database import database
+from app.services.rollups import category_match
+from app.services.violation_store import VIOLATIONS_COLLECTION
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Documents per cursor round trip and rows per Parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_CHUNK_BYTES = 256 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+class ExportError(ValueError):
+    """
+    Unknown dataset/format, or Parquet requested without pyarrow. Routes map it to HTTP 400.
+    """
+
+# Column name -> (projection expression, parquet type name)
+PRODUCT_COLUMNS = {
+    "id": ("$_id", "string"),
+    "name": ("$name", "string"),
+    "url": ("$url", "string"),
+    "category": ("$category", "string"),
+    "price": ("$price", "string"),
+    "mrp": ("$mrp", "string"),
+    "compliance_score": ("$compliance_score", "int64"),
+    "risk_level": ("$risk_level", "string"),
+    "violations_count": ({"$size": {"$ifNull": ["$violations", []]}}, "int64"),
+    "created_at": ("$created_at", "timestamp"),
+}
+VIOLATION_COLUMNS = {
+    "id": ("$_id", "string"),
+    "product_id": ("$product_id", "string"),
+    "product_name": ("$product_name", "string"),
+    "category": ("$category", "string"),
+    "type": ("$type", "string"),
+    "severity": ("$severity", "string"),
+    "status": ("$status", "string"),
+    "confidence": ("$confidence", "float64"),
+    "impact_score": ("$impact_score", "int64"),
+    "description": ("$description", "string"),
+    "evidence": ("$evidence", "string"),
+    "detected_at": ("$detected_at", "timestamp"),
+}
+
+DATASETS = {
+    "products": ("products", PRODUCT_COLUMNS),
+    "violations": (VIOLATIONS_COLLECTION, VIOLATION_COLUMNS),
+}
+
+def build_filters(dataset: str, risk_level: Optional[str] = None, category: Optional[str] = None,
+                  severity: Optional[str] = None, status: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Same filter semantics as GET /products (risk_level, category) and GET /violations (severity, status).
+    """
+    query: Dict[str, Any] = {}
+    if dataset == "products":
+        if risk_level and risk_level != "All":
+            query["risk_level"] = risk_level
+        if category and category != "All":
+            query.update(category_match(category))
+    else:
+        if severity:
+            query["severity"] = severity
+        if status:
+            query["status"] = status
+    return query
+
+async def iter_rows(dataset: str, query: Dict[str, Any], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Flat rows straight off a cursor (projected server-side, `batch_size` docs per round trip).
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'")
+    collection, columns = DATASETS[dataset]
+    projection = {"_id": 0, **{name: expr for name, (expr, _) in columns.items()}}
+    cursor = database.get_collection(collection).aggregate(
+        [{"$match": query}, {"$project": projection}], batchSize=batch_size
+    )
+    async for row in cursor:
+        for name in ("id", "product_id"):
+            if isinstance(row.get(name), ObjectId):
+                row[name] = str(row[name])
+        yield row
+
+def _text(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def ndjson_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for row in rows:
+        buffer += orjson.dumps(row, default=str)
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+async def csv_chunks(rows: AsyncIterator[Dict[str, Any]], columns: List[str]) -> AsyncIterator[bytes]:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for row in rows:
+        writer.writerow({k: _text(v) for k, v in row.items()})
+        if out.tell() >= EXPORT_CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file for ParquetWriter; the route drains what was written after each row group.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+def _arrow_schema(columns: Dict[str, tuple]):
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "timestamp": pa.timestamp("ms")}
+    return pa.schema([(name, types[kind]) for name, (_, kind) in columns.items()])
+
+def _arrow_value(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == "string":
+        return value if isinstance(value, str) else str(value)
+    if kind == "int64":
+        return int(value) if isinstance(value, (int, float)) else None
+    if kind == "float64":
+        return float(value) if isinstance(value, (int, float)) else None
+    return value if isinstance(value, datetime) else None
+
+def _write_batch(writer, schema, batch: Dict[str, list], names: List[str]):
+    writer.write_batch(pa.record_batch([batch[n] for n in names], schema=schema))
+
+async def parquet_chunks(rows: AsyncIterator[Dict[str, Any]], columns: Dict[str, tuple], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    if not PYARROW_AVAILABLE:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    names = list(columns)
+    batch: Dict[str, list] = {name: [] for name in columns}
+    count = 0
+    try:
+        async for row in rows:
+            for name, (_, kind) in columns.items():
+                batch[name].append(_arrow_value(row.get(name), kind))
+            count += 1
+            if count >= batch_size:
+                # Arrow conversion + zstd compression of a row group is CPU work: keep it off the loop
+                await run_cpu(_write_batch, writer, schema, batch, names)
+                batch = {name: [] for name in columns}
+                count = 0
+                yield sink.drain()
+        if count:
+            await run_cpu(_write_batch, writer, schema, batch, names)
+    finally:
+        await run_cpu(writer.close) # Footer
+    yield sink.drain()
+
+def stream_export(dataset: str, fmt: str, query: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    Byte chunks of the export; memory stays bounded by one cursor batch + one chunk.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not PYARROW_AVAILABLE:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    _, columns = DATASETS[dataset]
+    rows = iter_rows(dataset, query)
+    if fmt == "ndjson":
+        return ndjson_chunks(rows)
+    if fmt == "csv":
+        return csv_chunks(rows, list(columns))
+    return parquet_chunks(rows, columns)
+
+def export_filename(dataset: str, fmt: str) -> str:
+    return f"{dataset}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{EXPORT_FORMATS[fmt][1]}"
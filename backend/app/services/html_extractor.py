@@ -0,0 +1,219 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import lxml.html
+from lxml import etree
+
+# Precompiled once; shared with ScraperEngine's text helpers
+PRICE_RE = re.compile(r"(?:₹|Rs\.?)\s?[\d,]+(?:\.\d{2})?")
+MRP_LABELLED_RE = re.compile(r"(?:M\.?R\.?P\.?|List Price|Original Price|Price)[\s:.\-]*?(?:₹|Rs\.?|INR)?\s*?(\d[\d,]+\.?\d*)", re.IGNORECASE)
+MRP_PLAIN_RE = re.compile(r"(?:₹|Rs\.?|INR)\s?([\d,]+(?:\.\d{2})?)", re.IGNORECASE)
+PRICE_CONTAINER_CLASS_RE = re.compile(r"price|offer|deal", re.IGNORECASE)
+
+# Same heuristics (and priority order) as ScraperEngine._find_price/_find_mrp/_find_image
+PRICE_PATTERNS = ["price", "Price", "a-price-whole", "product-price", "selling-price", "offer-price", "_30jeq3"]
+MRP_CLASS_PATTERNS = [re.compile(c, re.IGNORECASE) for c in ["a-text-strike", "_3I9_wc", "strike-through", "strikethrough"]]
+MRP_LABEL_PATTERNS = [re.compile(label, re.IGNORECASE) for label in ["M.R.P", "MRP", "List Price"]]
+FLIPKART_IMAGE_CLASS = "_396cs4"
+META_PROPERTIES = ("og:title", "og:description", "og:image")
+
+_PRICE_PATTERN_SET = set(PRICE_PATTERNS)
+_INVISIBLE_TAGS = {"script", "style", "noscript", "template"}
+
+def find_price_in_text(text: Optional[str]) -> Optional[str]:
+    if not text: return None
+    match = PRICE_RE.search(text)
+    return match.group(0) if match else None
+
+def find_mrp_in_text(text: Optional[str], require_label: bool = True) -> Optional[str]:
+    if not text: return None
+    match = (MRP_LABELLED_RE if require_label else MRP_PLAIN_RE).search(text)
+    if match:
+        val = match.group(1).replace(",", "")
+        try:
+            if float(val) > 10: return f"₹{match.group(1)}"
+        except ValueError:
+            pass
+    return None
+
+def _compact_text(el) -> str:
+    # Equivalent of BeautifulSoup's get_text(strip=True)
+    return "".join(s.strip() for s in el.itertext())
+
+class _PageScan:
+    """
+    Everything the heuristics need, gathered in one walk over the tree.
+    """
+    __slots__ = ("meta", "title", "price_by_id", "price_by_class", "price_containers",
+                 "mrp_by_class", "mrp_labels", "landing_image", "flipkart_image",
+                 "first_http_image", "text_parts")
+
+    def __init__(self):
+        self.meta: Dict[str, str] = {}
+        self.title: Optional[str] = None
+        self.price_by_id: Dict[str, Any] = {}
+        self.price_by_class: Dict[str, Any] = {}
+        self.price_containers: List[Any] = []
+        self.mrp_by_class: List[Any] = [None] * len(MRP_CLASS_PATTERNS)
+        self.mrp_labels: List[Optional[Tuple[Any, bool]]] = [None] * len(MRP_LABEL_PATTERNS)
+        self.landing_image = None
+        self.flipkart_image = None
+        self.first_http_image: Optional[str] = None
+        self.text_parts: List[str] = []
+
+    def _label_text(self, text: str, owner, is_tail: bool):
+        for i, pattern in enumerate(MRP_LABEL_PATTERNS):
+            if self.mrp_labels[i] is None and pattern.search(text):
+                self.mrp_labels[i] = (owner, is_tail)
+
+    def visit(self, el):
+        tag = el.tag
+        if not isinstance(tag, str): # Comments / processing instructions
+            self._tail(el)
+            return
+        tag = tag.lower()
+        attrib = el.attrib
+
+        if tag == "meta":
+            prop = attrib.get("property")
+            if prop in META_PROPERTIES and prop not in self.meta:
+                self.meta[prop] = attrib.get("content")
+        elif tag == "title" and self.title is None:
+            self.title = el.text
+        elif tag == "img":
+            classes = attrib.get("class", "").split()
+            if self.flipkart_image is None and FLIPKART_IMAGE_CLASS in classes:
+                self.flipkart_image = el
+            if self.first_http_image is None:
+                src = attrib.get("src", "")
+                if src.startswith("http") and "icon" not in src and "logo" not in src:
+                    self.first_http_image = src
+
+        el_id = attrib.get("id")
+        if el_id:
+            if el_id in _PRICE_PATTERN_SET and el_id not in self.price_by_id:
+                self.price_by_id[el_id] = el
+            if el_id == "landingImage" and self.landing_image is None:
+                self.landing_image = el
+
+        class_attr = attrib.get("class")
+        if class_attr:
+            tokens = class_attr.split()
+            for token in tokens:
+                if token in _PRICE_PATTERN_SET and token not in self.price_by_class:
+                    self.price_by_class[token] = el
+            if tag in ("span", "div") and any(PRICE_CONTAINER_CLASS_RE.search(t) for t in tokens):
+                self.price_containers.append(el)
+            for i, pattern in enumerate(MRP_CLASS_PATTERNS):
+                if self.mrp_by_class[i] is None and any(pattern.search(t) for t in tokens):
+                    self.mrp_by_class[i] = el
+
+        if tag not in _INVISIBLE_TAGS and el.text:
+            text = el.text.strip()
+            if text:
+                self.text_parts.append(text)
+                self._label_text(text, el, False)
+        self._tail(el)
+
+    def _tail(self, el):
+        if el.tail:
+            text = el.tail.strip()
+            if text:
+                self.text_parts.append(text)
+                parent = el.getparent()
+                if parent is not None:
+                    self._label_text(text, parent, True)
+
+class HtmlExtractor:
+    """
+    Single-parse, single-traversal replacement for the BeautifulSoup path in
+    ScraperEngine. Applies the same heuristics in the same priority order.
+    """
+
+    def parse(self, content: bytes):
+        try:
+            return lxml.html.document_fromstring(content)
+        except (etree.ParserError, ValueError):
+            return None
+
+    def scan(self, root) -> _PageScan:
+        page = _PageScan()
+        for el in root.iter():
+            page.visit(el)
+        return page
+
+    def _price(self, page: _PageScan) -> str:
+        for p in PRICE_PATTERNS:
+            for found in (page.price_by_id.get(p), page.price_by_class.get(p)):
+                if found is not None:
+                    return _compact_text(found)
+        for container in page.price_containers:
+            match = PRICE_RE.search(container.text_content())
+            if match:
+                return match.group(0)
+        return "0"
+
+    def _mrp(self, page: _PageScan) -> Optional[str]:
+        for el in page.mrp_by_class:
+            if el is not None:
+                mrp = find_mrp_in_text(el.text_content(), require_label=False)
+                if mrp: return mrp
+
+        for found in page.mrp_labels:
+            if found is None:
+                continue
+            parent, _ = found
+            mrp = find_mrp_in_text(parent.text_content(), require_label=True)
+            if mrp: return mrp
+            # Next sibling of the label's parent: its tail text, else the next element
+            if parent.tail is not None:
+                sibling_text = parent.tail
+            else:
+                sibling = parent.getnext()
+                sibling_text = sibling.text_content() if sibling is not None else None
+            if sibling_text:
+                mrp = find_mrp_in_text(sibling_text, require_label=False)
+                if mrp: return mrp
+        return None
+
+    def _image(self, page: _PageScan) -> Optional[str]:
+        if page.landing_image is not None:
+            return page.landing_image.get("data-old-hires") or page.landing_image.get("src")
+        if page.flipkart_image is not None:
+            return page.flipkart_image.get("src")
+        return page.first_http_image
+
+    def extract(self, content: bytes) -> Tuple[Dict[str, Any], str]:
+        """
+        Returns (fields, visible_text) in the same shape as ScraperEngine._parse_page.
+        """
+        root = self.parse(content)
+        if root is None:
+            return {"title": None, "description": "", "image_url": None, "price": "0", "mrp": "0"}, ""
+        page = self.scan(root)
+        visible_text = " ".join(page.text_parts)
+
+        title = page.meta.get("og:title") or page.title
+        description = page.meta.get("og:description") or ""
+        image_url = page.meta.get("og:image") or self._image(page)
+
+        price = self._price(page)
+        if price == "0":
+            price = find_price_in_text((title or "") + " " + (description or "")) or "0"
+        if price == "0":
+            price = find_price_in_text(visible_text) or "0"
+
+        mrp = self._mrp(page) or find_mrp_in_text(visible_text)
+        if not mrp:
+            # Raw markup catches MRPs that only live in JSON blobs / attributes
+            mrp = find_mrp_in_text(content.decode("utf-8", errors="ignore") if isinstance(content, bytes) else content)
+
+        fields = {
+            "title": title,
+            "description": description,
+            "image_url": image_url,
+            "price": price,
+            "mrp": mrp or "0"
+        }
+        return fields, visible_text
+
+html_extractor = HtmlExtractor()
@@ -1,43 +1,152 @@
 import cv2
 import numpy as np
-import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import google.generativeai as genai
 import os
 import json
 from PIL import Image
 from io import BytesIO
 import logging
+import hashlib
+import time
+from app.core.concurrency import run_cpu
+from app.services.image_fetcher import image_fetcher
+from app.ai.llm_cache import llm_cache
+from app.services.image_index import image_index, phash
+
+VISION_MODEL_NAME = 'gemini-2.5-flash'
+MATCH_PROMPT_VERSION = "image-match-v1"
+
+# "fast": decode once at a bounded resolution and share colour conversions across checks.
+# "full": legacy path, full-resolution decode with per-check conversions.
+IMAGE_ANALYSIS_MODE = os.getenv("IMAGE_ANALYSIS_MODE", "fast").lower()
+IMAGE_WORKING_MAX_SIDE = int(os.getenv("IMAGE_WORKING_MAX_SIDE", "1024"))
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "768"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+# Reduced decodes let libjpeg skip DCT work instead of decoding full size and shrinking
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+class ImageFrame:
+    """
+    Working-resolution buffers shared by every check for one image.
+    """
+    __slots__ = ("bgr", "gray", "hsv", "vision_jpeg", "metrics")
+
+    def __init__(self, bgr: np.ndarray, gray: np.ndarray, hsv: np.ndarray, vision_jpeg: Optional[bytes], metrics: Dict[str, Any]):
+        self.bgr = bgr
+        self.gray = gray
+        self.hsv = hsv
+        self.vision_jpeg = vision_jpeg
+        self.metrics = metrics
+
+def _fit(image: np.ndarray, max_side: int) -> np.ndarray:
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
 
 class ImageEngine:
     def __init__(self):
         api_key = os.getenv("GEMINI_API_KEY")
         if api_key:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.model = genai.GenerativeModel(VISION_MODEL_NAME)
         else:
             logging.warning("GEMINI_API_KEY not set. CV features disabled.")
             self.model = None
 
+    def _decode(self, content: bytes) -> Optional[np.ndarray]:
+        # Convert bytes to numpy array
+        image_arr = np.asarray(bytearray(content), dtype=np.uint8)
+        return cv2.imdecode(image_arr, cv2.IMREAD_COLOR)
+
     def download_image(self, url: str) -> Optional[np.ndarray]:
+        # Pooled + disk-cached fetch (see image_fetcher)
+        content = image_fetcher.fetch(url)
+        if content is None:
+            return None
         try:
-            resp = requests.get(url, timeout=5)
-            if resp.status_code == 200:
-                # Convert bytes to numpy array
-                image_arr = np.asarray(bytearray(resp.content), dtype=np.uint8)
-                image = cv2.imdecode(image_arr, cv2.IMREAD_COLOR)
-                return image
+            return self._decode(content)
+        except Exception as e:
+            print(f"Image decode error: {e}")
             return None
+
+    async def download_image_async(self, url: str) -> Optional[np.ndarray]:
+        """
+        Native async download; decoding runs on the CPU pool.
+        """
+        content = await image_fetcher.fetch_async(url)
+        if content is None:
+            return None
+        try:
+            return await run_cpu(self._decode, content)
         except Exception as e:
-            print(f"Image download error: {e}")
+            print(f"Image decode error: {e}")
             return None
 
-    def detect_watermark(self, image: np.ndarray) -> Dict[str, Any]:
+    async def aclose(self):
+        await image_fetcher.aclose()
+
+    def prepare_frame(self, content: bytes) -> Optional[ImageFrame]:
+        """
+        Decodes straight to a bounded working resolution and computes the shared
+        colour-space conversions and the compact JPEG for the vision model once.
+        """
+        cpu_start = time.thread_time()
+
+        original_size = (0, 0)
+        try:
+            original_size = Image.open(BytesIO(content)).size # Header only, no pixel decode
+        except Exception:
+            pass
+        longest = max(original_size)
+
+        flag, decode_scale = cv2.IMREAD_COLOR, 1
+        for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+            if longest and longest // factor >= IMAGE_WORKING_MAX_SIDE:
+                flag, decode_scale = reduced_flag, factor
+                break
+
+        bgr = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), flag)
+        if bgr is None:
+            return None
+        bgr = _fit(bgr, IMAGE_WORKING_MAX_SIDE)
+
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+
+        vision_jpeg = None
+        ok, encoded = cv2.imencode(".jpg", _fit(bgr, VISION_MAX_SIDE), [cv2.IMWRITE_JPEG_QUALITY, VISION_JPEG_QUALITY])
+        if ok:
+            vision_jpeg = encoded.tobytes()
+
+        metrics = {
+            "original_size": list(original_size),
+            "working_size": [bgr.shape[1], bgr.shape[0]],
+            "decode_scale": decode_scale,
+            "vision_jpeg_bytes": len(vision_jpeg) if vision_jpeg else 0,
+            # Computed from array sizes, not measured: BGR + gray + HSV + Canny edges + skin mask + JPEG
+            "estimated_buffer_bytes": bgr.nbytes + hsv.nbytes + gray.nbytes * 3 + (len(vision_jpeg) if vision_jpeg else 0),
+            "cpu_ms": 0.0
+        }
+        frame = ImageFrame(bgr, gray, hsv, vision_jpeg, metrics)
+        metrics["cpu_ms"] = round((time.thread_time() - cpu_start) * 1000, 2)
+        return frame
+
+    def detect_watermark(self, image: np.ndarray, gray: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Basic Watermark/Text Detection using Edge Density.
         Watermarks often create high-frequency edges in text regions.
+        Pass a precomputed `gray` to skip the conversion.
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
         # 1. Edge Detection
         edges = cv2.Canny(gray, 100, 200)
@@ -57,14 +166,15 @@ class ImageEngine:
             "details": f"High edge density ({edge_density:.2f}) detected, potential text overlay/watermark." if has_watermark else "Clean image"
         }
 
-    def check_inappropriate_content(self, image: np.ndarray) -> Dict[str, Any]:
+    def check_inappropriate_content(self, image: np.ndarray, hsv: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Simple heuristic for skin tone detection (HSV).
         High percentage of skin pixels *might* indicate inappropriate content.
         This is a basic proxy for a NSFW classifier.
         """
         try:
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            if hsv is None:
+                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
             # Define skin color range in HSV
             # Lower: (0, 48, 80), Upper: (20, 255, 255) maps roughly to skin tones
             lower = np.array([0, 48, 80], dtype="uint8")
@@ -99,19 +209,8 @@ class ImageEngine:
             "predicted": "unknown"
         }
 
-    def verify_product_match_ai(self, image: np.ndarray, product_title: str) -> Dict[str, Any]:
-        """
-        Uses Gemini Vision to verify if the image semantically matches the product title.
-        """
-        if not self.model or not product_title:
-            return {"match": True, "confidence": 0.0, "reason": "AI not available or no title"}
-
-        try:
-            # Convert OpenCV (BGR) to PIL (RGB)
-            pixel_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(pixel_rgb)
-
-            prompt = f"""
+    def _match_prompt(self, product_title: str) -> str:
+        return f"""
             Analyze this product image.
             Product Title: "{product_title}"
 
@@ -128,24 +227,80 @@ class ImageEngine:
                 "reason": "Short explanation"
             }}
             """
-            
-            response = self.model.generate_content([prompt, pil_image])
-            # Clean response
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            data = json.loads(text)
-            
-            return {
-                "match": data.get("is_match", True),
-                "confidence": data.get("confidence", 0.0),
-                "reason": data.get("reason", "AI Verification")
-            }
 
+    def _to_pil(self, image: np.ndarray) -> Image.Image:
+        # Convert OpenCV (BGR) to PIL (RGB)
+        pixel_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(pixel_rgb)
+
+    def _match_key(self, image: np.ndarray, product_title: str) -> str:
+        # Pixel digest + shape, so the same picture from another URL still hits
+        digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=20).hexdigest()
+        return llm_cache.make_key("image.match", VISION_MODEL_NAME, MATCH_PROMPT_VERSION, f"{image.shape}:{digest}", product_title)
+
+    def _parse_match(self, response_text: str) -> Dict[str, Any]:
+        # Clean response
+        text = response_text.replace("```json", "").replace("```", "").strip()
+        data = json.loads(text)
+        
+        return {
+            "match": data.get("is_match", True),
+            "confidence": data.get("confidence", 0.0),
+            "reason": data.get("reason", "AI Verification")
+        }
+
+    def _vision_part(self, image: np.ndarray, vision_jpeg: Optional[bytes]):
+        # Prefer the compact JPEG from prepare_frame() over a full-size PIL image
+        if vision_jpeg:
+            return {"mime_type": "image/jpeg", "data": vision_jpeg}
+        return self._to_pil(image)
+
+    def verify_product_match_ai(self, image: np.ndarray, product_title: str, vision_jpeg: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Uses Gemini Vision to verify if the image semantically matches the product title.
+        """
+        if not self.model or not product_title:
+            return {"match": True, "confidence": 0.0, "reason": "AI not available or no title"}
+
+        key = self._match_key(image, product_title)
+        cached = llm_cache.safe_get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            image_part = self._vision_part(image, vision_jpeg)
+            response = self.model.generate_content([self._match_prompt(product_title), image_part])
+            result = self._parse_match(response.text)
+        except Exception as e:
+            logging.error(f"CV Analysis Error: {e}")
+            return {"match": True, "confidence": 0.0, "reason": "CV Error"}
+        llm_cache.safe_set(key, result)
+        return result
+
+    async def verify_product_match_ai_async(self, image: np.ndarray, product_title: str, vision_jpeg: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Non-blocking variant of verify_product_match_ai().
+        """
+        if not self.model or not product_title:
+            return {"match": True, "confidence": 0.0, "reason": "AI not available or no title"}
+
+        key = await run_cpu(self._match_key, image, product_title)
+        cached = await llm_cache.safe_aget(key)
+        if cached is not None:
+            return cached
+
+        try:
+            image_part = await run_cpu(self._vision_part, image, vision_jpeg)
+            response = await self.model.generate_content_async([self._match_prompt(product_title), image_part])
+            result = self._parse_match(response.text)
         except Exception as e:
             logging.error(f"CV Analysis Error: {e}")
             return {"match": True, "confidence": 0.0, "reason": "CV Error"}
+        await llm_cache.safe_aset(key, result)
+        return result
 
-    def analyze_image(self, url: str, product_title: str = "", expected_category: str = "general") -> Dict[str, Any]:
-        result = {
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
             "url_valid": False,
             "has_watermark": False,
             "inappropriate_detected": False,
@@ -153,39 +308,140 @@ class ImageEngine:
             "cv_match": True,
             "details": ""
         }
-        
-        image = self.download_image(url)
-        if image is None:
-            result["details"] = "Failed to download image"
-            return result
 
-        result["url_valid"] = True
-        
+    def _run_local_checks(self, image: np.ndarray, result: Dict[str, Any], frame: Optional[ImageFrame] = None) -> Dict[str, Any]:
         # 1. Watermark
-        wm_res = self.detect_watermark(image)
+        wm_res = self.detect_watermark(image, gray=frame.gray if frame else None)
         if wm_res["has_watermark"]:
             result["has_watermark"] = True
             result["details"] += f" {wm_res['details']}"
             
         # 2. Inappropriate Content
-        nsfw_res = self.check_inappropriate_content(image)
+        nsfw_res = self.check_inappropriate_content(image, hsv=frame.hsv if frame else None)
         if nsfw_res["inappropriate"]:
             result["inappropriate_detected"] = True
             result["details"] += f" {nsfw_res['details']}"
+        return result
 
-        # 3. AI Product Match Verification
-        if product_title and self.model:
-            cv_res = self.verify_product_match_ai(image, product_title)
-            if not cv_res["match"]:
-                result["cv_match"] = False
-                result["details"] += f" [CV Mismatch: {cv_res['reason']}]"
+    def _decode_and_check(self, content: bytes, result: Dict[str, Any]) -> Optional[Tuple[np.ndarray, Optional[bytes]]]:
+        """
+        CPU stage of analyze_image: decode + perceptual hash + local OpenCV checks.
+        Returns (image for the AI check, compact JPEG or None), or None if undecodable.
+        Per-image CPU time and an estimate of the buffer footprint are reported in result["metrics"].
+        """
+        cpu_start = time.thread_time()
+        try:
+            if IMAGE_ANALYSIS_MODE == "fast":
+                frame = self.prepare_frame(content)
+                if frame is None:
+                    return None
+                image, gray, vision_jpeg, metrics = frame.bgr, frame.gray, frame.vision_jpeg, frame.metrics
+            else:
+                frame = None
+                image = self._decode(content)
+                if image is None:
+                    return None
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                vision_jpeg = None
+                pixels = image.shape[0] * image.shape[1]
+                metrics = {
+                    "original_size": [image.shape[1], image.shape[0]],
+                    "working_size": [image.shape[1], image.shape[0]],
+                    "decode_scale": 1,
+                    # Computed from array sizes, not measured: BGR + HSV + RGB copy for the vision model, plus gray + edges + skin mask
+                    "estimated_buffer_bytes": image.nbytes * 3 + pixels * 3,
+                }
+
+            # Seen this photo before? Reuse its local verdict instead of re-running OpenCV
+            image_hash = phash(gray)
+            result["phash"] = format(image_hash, "016x")
+            match = image_index.nearest(image_hash)
+            if match:
+                distance, prior = match
+                result["known_image"] = {**prior, "distance": distance}
+
+            if match and "has_watermark" in prior:
+                result["has_watermark"] = bool(prior["has_watermark"])
+                result["inappropriate_detected"] = bool(prior.get("inappropriate_detected"))
+                result["details"] += prior.get("local_details", "")
+            else:
+                self._run_local_checks(image, result, frame=frame)
+            result["local_details"] = result["details"]
+        except Exception as e:
+            print(f"Image decode error: {e}")
+            return None
+
+        metrics["cpu_ms"] = round((time.thread_time() - cpu_start) * 1000, 2)
+        result["metrics"] = metrics
+        return image, vision_jpeg
+
+    def _prior_match(self, result: Dict[str, Any], product_title: str) -> Optional[Dict[str, Any]]:
+        # A near-identical image already verified against the same title
+        prior = result.get("known_image")
+        if prior and prior.get("title") == product_title and prior.get("cv_match") is not None:
+            return {"match": prior["cv_match"], "reason": prior.get("cv_reason") or "Previously verified image"}
+        return None
+
+    def _apply_ai_match(self, cv_res: Dict[str, Any], result: Dict[str, Any]):
+        result["cv_reason"] = cv_res.get("reason")
+        # Fallback answers must not be remembered as a real verdict
+        result["cv_verified"] = cv_res.get("reason") not in ("CV Error", "AI not available or no title")
+        if not cv_res["match"]:
+            result["cv_match"] = False
+            result["details"] += f" [CV Mismatch: {cv_res['reason']}]"
 
-        # 3. Category (Stub)
+    def _apply_category(self, image: np.ndarray, expected_category: str, result: Dict[str, Any]):
+        # Category (Stub)
         cat_res = self.verify_category(image, expected_category)
         if not cat_res["match"]:
             result["category_match"] = False
             result["details"] += " Image category mismatch."
+
+    def analyze_image(self, url: str, product_title: str = "", expected_category: str = "general") -> Dict[str, Any]:
+        result = self._empty_result()
+        
+        # Pooled + disk-cached fetch (see image_fetcher)
+        content = image_fetcher.fetch(url)
+        loaded = self._decode_and_check(content, result) if content is not None else None
+        if loaded is None:
+            result["details"] = "Failed to download image"
+            return result
+
+        image, vision_jpeg = loaded
+        result["url_valid"] = True
+
+        # 3. AI Product Match Verification
+        if product_title and self.model:
+            cv_res = self._prior_match(result, product_title) or self.verify_product_match_ai(image, product_title, vision_jpeg)
+            self._apply_ai_match(cv_res, result)
+
+        # 4. Category (Stub)
+        self._apply_category(image, expected_category, result)
             
         return result
 
+    async def analyze_image_async(self, url: str, product_title: str = "", expected_category: str = "general") -> Dict[str, Any]:
+        """
+        Same checks as analyze_image(), with the download/Gemini call awaited
+        natively and the OpenCV work moved to the CPU pool.
+        """
+        result = self._empty_result()
+
+        content = await image_fetcher.fetch_async(url)
+        loaded = await run_cpu(self._decode_and_check, content, result) if content is not None else None
+        if loaded is None:
+            result["details"] = "Failed to download image"
+            return result
+
+        image, vision_jpeg = loaded
+        result["url_valid"] = True
+
+        if product_title and self.model:
+            cv_res = self._prior_match(result, product_title) or await self.verify_product_match_ai_async(image, product_title, vision_jpeg)
+            self._apply_ai_match(cv_res, result)
+
+        self._apply_category(image, expected_category, result)
+
+        return result
+
 image_engine = ImageEngine()
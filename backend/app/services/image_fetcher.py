@@ -0,0 +1,283 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from app.core.concurrency import run_io
+from app.core.http_cache import conditional_headers, freshness_seconds, is_storable
+
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(15 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "5"))
+IMAGE_POOL_PER_HOST = int(os.getenv("IMAGE_POOL_PER_HOST", "10"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(".cache", "images"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+# Freshness used when the CDN sends no Cache-Control/Expires
+IMAGE_CACHE_DEFAULT_TTL = int(os.getenv("IMAGE_CACHE_DEFAULT_TTL", str(24 * 3600)))
+
+class ImageTooLarge(Exception):
+    pass
+
+class ImageFetcher:
+    """
+    Pooled HTTP client for product images with a local on-disk cache.
+
+    Blobs are stored once per content hash; an SQLite index maps each URL to its
+    blob plus the validators (ETag / Last-Modified) and freshness deadline.
+    Fresh entries are served without touching the network, stale ones are
+    revalidated with a conditional GET. The cache is trimmed LRU-first once the
+    blobs exceed IMAGE_CACHE_MAX_MB.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = IMAGE_CACHE_DIR,
+        max_bytes: int = IMAGE_MAX_BYTES,
+        max_cache_bytes: int = IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.max_cache_bytes = max_cache_bytes
+
+        # Sync pool: keep-alive connections reused per host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=IMAGE_POOL_PER_HOST)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+        self._counters = {"cache_fresh_hits": 0, "revalidated": 0, "downloads": 0, "rejected_too_large": 0}
+
+        self.cache_dir = cache_dir
+        self._db = None
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS images ("
+                    " url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, size INTEGER NOT NULL,"
+                    " etag TEXT, last_modified TEXT, fresh_until REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_images_accessed ON images (accessed_at)")
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_images_hash ON images (content_hash)")
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"Image cache unavailable ({e}); fetching without cache.")
+                self._db = None
+
+    # --- Cache index -------------------------------------------------
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], content_hash)
+
+    def _lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, etag, last_modified, fresh_until FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "etag": row[1], "last_modified": row[2], "fresh_until": row[3]}
+
+    def _read_blob(self, content_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(content_hash), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _touch(self, url: str, fresh_until: Optional[float] = None):
+        with self._lock:
+            if fresh_until is None:
+                self._db.execute("UPDATE images SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            else:
+                self._db.execute("UPDATE images SET accessed_at = ?, fresh_until = ? WHERE url = ?", (time.time(), fresh_until, url))
+
+    def _store(self, url: str, content: bytes, headers) -> None:
+        if self._db is None or not is_storable(headers):
+            return
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(content_hash)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(content)
+                os.replace(tmp, path) # Atomic, readers never see partial blobs
+        except OSError as e:
+            logging.warning(f"Image cache write failed: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images (url, content_hash, size, etag, last_modified, fresh_until, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, len(content), headers.get("etag"), headers.get("last-modified"),
+                 now + self._freshness(headers), now)
+            )
+            self._stores_since_evict += 1
+            if self._stores_since_evict >= 32:
+                self._evict()
+
+    def _freshness(self, headers) -> float:
+        return freshness_seconds(headers, IMAGE_CACHE_DEFAULT_TTL)
+
+    def _evict(self):
+        # Caller holds the lock. Sizes are counted per distinct blob.
+        self._stores_since_evict = 0
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT content_hash, MAX(size) AS size FROM images GROUP BY content_hash)"
+        ).fetchone()[0]
+        if total <= self.max_cache_bytes:
+            return
+        rows = self._db.execute("SELECT url, content_hash, size FROM images ORDER BY accessed_at ASC").fetchall()
+        for url, content_hash, size in rows:
+            if total <= self.max_cache_bytes:
+                break
+            self._db.execute("DELETE FROM images WHERE url = ?", (url,))
+            still_used = self._db.execute("SELECT 1 FROM images WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._blob_path(content_hash))
+                except OSError:
+                    pass
+                total -= size
+
+    def _cached(self, url: str) -> Tuple[Optional[Dict[str, Any]], Optional[bytes], bool]:
+        """
+        Returns (index entry, cached bytes, is_fresh). Fresh hits are counted and touched here.
+        """
+        entry = self._lookup(url)
+        if entry is None:
+            return None, None, False
+        content = self._read_blob(entry["content_hash"])
+        if content is None:
+            return None, None, False # Blob was evicted/removed, refetch in full
+        if entry["fresh_until"] > time.time():
+            self._touch(url)
+            with self._lock:
+                self._counters["cache_fresh_hits"] += 1
+            return entry, content, True
+        return entry, content, False
+
+    def _on_not_modified(self, url: str, stale: bytes, headers) -> bytes:
+        self._touch(url, fresh_until=time.time() + self._freshness(headers))
+        with self._lock:
+            self._counters["revalidated"] += 1
+        return stale
+
+    def _check_length(self, headers):
+        length = headers.get("content-length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ImageTooLarge(f"Image is {length} bytes (max {self.max_bytes})")
+
+    def _count_download(self):
+        with self._lock:
+            self._counters["downloads"] += 1
+
+    def _count_rejected(self):
+        with self._lock:
+            self._counters["rejected_too_large"] += 1
+
+    # --- Fetching ----------------------------------------------------
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        entry, stale, fresh = self._cached(url)
+        if fresh:
+            return stale
+
+        try:
+            with self.session.get(url, timeout=IMAGE_FETCH_TIMEOUT, stream=True,
+                                  headers=conditional_headers(entry if stale else None)) as resp:
+                if resp.status_code == 304 and stale is not None:
+                    return self._on_not_modified(url, stale, resp.headers)
+                if resp.status_code != 200:
+                    return None
+                self._check_length(resp.headers)
+
+                chunks, received = [], 0
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise ImageTooLarge(f"Image exceeds {self.max_bytes} bytes")
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+                headers = resp.headers
+        except ImageTooLarge as e:
+            self._count_rejected()
+            print(f"Image download error: {e}")
+            return None
+        except Exception as e:
+            print(f"Image download error: {e}")
+            return None
+
+        self._count_download()
+        self._store(url, content, headers)
+        return content
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=IMAGE_FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=IMAGE_POOL_PER_HOST * 4),
+            )
+        return self._async_client
+
+    async def fetch_async(self, url: str) -> Optional[bytes]:
+        """
+        Async fetch over the shared httpx pool; cache reads/writes go to the IO pool.
+        """
+        entry, stale, fresh = await run_io(self._cached, url)
+        if fresh:
+            return stale
+
+        try:
+            client = self._get_async_client()
+            async with client.stream("GET", url, headers=conditional_headers(entry if stale else None)) as resp:
+                if resp.status_code == 304 and stale is not None:
+                    return await run_io(self._on_not_modified, url, stale, resp.headers)
+                if resp.status_code != 200:
+                    return None
+                self._check_length(resp.headers)
+
+                chunks, received = [], 0
+                async for chunk in resp.aiter_bytes(64 * 1024):
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise ImageTooLarge(f"Image exceeds {self.max_bytes} bytes")
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+                headers = resp.headers
+        except ImageTooLarge as e:
+            self._count_rejected()
+            print(f"Image download error: {e}")
+            return None
+        except Exception as e:
+            print(f"Image download error: {e}")
+            return None
+
+        self._count_download()
+        await run_io(self._store, url, content, headers)
+        return content
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters)
+
+image_fetcher = ImageFetcher()
@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+# Max Hamming distance (out of 64 bits) for two images to count as the same photo
+IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6"))
+IMAGE_HASH_COLLECTION = "image_hashes"
+
+def phash(gray: np.ndarray) -> int:
+    """
+    64-bit DCT perceptual hash of a grayscale image.
+    Robust to re-encoding, resizing and small colour/brightness edits.
+    """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    median = np.median(low[1:]) # Skip the DC term, it only tracks brightness
+    bits = 0
+    for value in low:
+        bits = (bits << 1) | int(value > median)
+    return bits
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _flag_owner(record: Dict[str, Any]) -> Optional[str]:
+    # Entries stored before counterfeit_url existed were flagged by their last listing
+    return record.get("counterfeit_url") or record.get("url")
+
+def _merge_counterfeit(stored: Dict[str, Any], record: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    """
+    (counterfeit, counterfeit_url) after a new verdict for the same photo. The flag
+    stays set for other listings, but the listing that raised it can clear it.
+    """
+    url = record.get("url")
+    if record.get("counterfeit"):
+        return True, url
+    if stored.get("counterfeit") and not (url and _flag_owner(stored) == url):
+        return True, _flag_owner(stored)
+    return False, None
+
+class _BKNode:
+    __slots__ = ("phash", "record", "children")
+
+    def __init__(self, phash: int, record: Dict[str, Any]):
+        self.phash = phash
+        self.record = record
+        self.children: Dict[int, "_BKNode"] = {}
+
+class ImageHashIndex:
+    """
+    BK-tree over perceptual hashes of every analysed image, persisted to the
+    `image_hashes` collection next to `products`.
+
+    Each record keeps the last local verdict (watermark / inappropriate / AI
+    match for a title) and a sticky `counterfeit` flag set when a listing
+    using that photo was flagged for brand infringement.
+    """
+
+    def __init__(self, max_distance: int = IMAGE_HASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._root: Optional[_BKNode] = None
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def _insert(self, phash_value: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        # Caller holds the lock
+        if self._root is None:
+            self._root = _BKNode(phash_value, record)
+            self.size += 1
+            return record
+        node = self._root
+        while True:
+            d = hamming(phash_value, node.phash)
+            if d == 0:
+                merged = {**node.record, **record}
+                merged["counterfeit"], merged["counterfeit_url"] = _merge_counterfeit(node.record, record)
+                node.record = merged
+                return merged
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _BKNode(phash_value, record)
+                self.size += 1
+                return record
+            node = child
+
+    def nearest(self, phash_value: int) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Closest indexed image within max_distance, as (distance, record).
+        Counterfeit-flagged matches win over closer clean ones.
+        """
+        with self._lock:
+            if self._root is None:
+                return None
+            best: Optional[Tuple[int, Dict[str, Any]]] = None
+            best_rank = None
+            stack: List[_BKNode] = [self._root]
+            while stack:
+                node = stack.pop()
+                d = hamming(phash_value, node.phash)
+                if d <= self.max_distance:
+                    rank = (not node.record.get("counterfeit"), d)
+                    if best_rank is None or rank < best_rank:
+                        best, best_rank = (d, node.record), rank
+                # Triangle inequality: only children at distance d±max can hold matches
+                for edge, child in node.children.items():
+                    if d - self.max_distance <= edge <= d + self.max_distance:
+                        stack.append(child)
+            return best
+
+    def remember(self, phash_value: int, verdict: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Adds/updates the in-memory entry and returns the merged record.
+        """
+        record = {**verdict, "phash": format(phash_value, "016x"), "updated_at": datetime.utcnow()}
+        record["counterfeit_url"] = record.get("url") if record.get("counterfeit") else None
+        with self._lock:
+            return self._insert(phash_value, record)
+
+    async def persist(self, record: Dict[str, Any]):
+        from app.core.database import database
+        doc = {k: {"$literal": v} for k, v in record.items() if k not in ("counterfeit", "counterfeit_url", "phash", "seen_count")}
+        url = record.get("url")
+        owner = {"$ifNull": ["$counterfeit_url", "$url"]}
+        if record.get("counterfeit"):
+            counterfeit, counterfeit_url = True, url
+        elif url:
+            # Same rule as _merge_counterfeit, evaluated against the stored document
+            cleared_by_owner = {"$eq": [owner, url]}
+            counterfeit = {"$cond": [cleared_by_owner, False, {"$ifNull": ["$counterfeit", False]}]}
+            counterfeit_url = {"$cond": [cleared_by_owner, None, "$counterfeit_url"]}
+        else:
+            counterfeit, counterfeit_url = {"$ifNull": ["$counterfeit", False]}, "$counterfeit_url"
+        try:
+            # Pipeline update: every expression sees the document as it was before this write
+            await database.get_collection(IMAGE_HASH_COLLECTION).update_one(
+                {"phash": record["phash"]},
+                [{"$set": {
+                    **doc,
+                    "counterfeit": counterfeit,
+                    "counterfeit_url": counterfeit_url,
+                    "seen_count": {"$add": [{"$ifNull": ["$seen_count", 0]}, 1]}
+                }}],
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Image hash persist failed: {e}")
+
+    async def load(self):
+        """
+        Rebuilds the tree from Mongo (called at startup).
+        """
+        from app.core.database import database
+        try:
+            cursor = database.get_collection(IMAGE_HASH_COLLECTION).find({}, {"_id": 0})
+            loaded = 0
+            async for doc in cursor:
+                with self._lock:
+                    self._insert(int(doc["phash"], 16), doc)
+                loaded += 1
+            logging.info(f"Image hash index loaded {loaded} entries")
+        except Exception as e:
+            logging.error(f"Image hash index load failed: {e}")
+
+image_index = ImageHashIndex()
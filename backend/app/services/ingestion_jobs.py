@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.core.database import database
+from app.ai.nlp_engine import nlp_engine
+from app.models.product import TimelineEvent
+from app.core.write_buffer import write_buffer
+from app.services.violation_store import sync_product
+from app.services import rollups
+from app.services.price_stats import price_stats
+from pymongo import ReturnDocument
+
+ANALYZE_TEXT_JOB = "analyze_text"
+INGEST_URL_JOB = "ingest_url"
+
+async def analyze_and_update(product_id: Any, text: str):
+    """
+    Runs the full analysis for an ingested product and updates its record
+    """
+    # 1. Analyze
+    analysis_result = await nlp_engine.analyze_async(text)
+
+    # 2. Compute Risk Score
+    score = nlp_engine.compute_risk_score(analysis_result)
+
+    # 3. Create Timeline Event
+    analyzed_event = TimelineEvent(
+        event="Compliance Analysis",
+        details=f"Risk Score: {score['impact_score']}, Confidence: {score['confidence']}"
+    ).dict()
+
+    # 4. Update DB
+    fields = {
+        "compliance_score": 100 - score["impact_score"],
+        "risk_level": "High" if score["impact_score"] > 50 else "Low",
+        # Note: In a real app we'd map violations properly here
+    }
+    snap = rollups.snapshot(fields)
+    update = {
+        "$set": {**fields, "rollup": snap},
+        "$push": {
+            "timeline": analyzed_event
+        }
+    }
+    collection = database.get_collection("products")
+    if write_buffer.enabled:
+        # Batched write; the previous rollup is read instead (one job per product at a time)
+        previous = await collection.find_one({"_id": product_id}, {"rollup": 1})
+        await write_buffer.update("products", {"_id": product_id}, update)
+    else:
+        previous = await collection.find_one_and_update(
+            {"_id": product_id},
+            update,
+            projection={"rollup": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    # 5. Dashboard rollups (take back the previous score if this is a re-score)
+    if previous is not None:
+        await rollups.apply(snap, previous.get("rollup"))
+
+async def _analyze_text_job(payload: Dict[str, Any]):
+    await analyze_and_update(payload["product_id"], payload["text"])
+
+async def _update_stage(product_id: Any, fields: Dict[str, Any], event: Optional[str] = None,
+                        details: Optional[str] = None, previous_fields: Optional[Dict[str, int]] = None):
+    """
+    $set + optional timeline event. With previous_fields, returns those fields as they were before the update.
+    """
+    update: Dict[str, Any] = {"$set": {**fields, "updated_at": datetime.utcnow()}}
+    if event:
+        update["$push"] = {"timeline": TimelineEvent(event=event, details=details).dict()}
+    if previous_fields is None:
+        await write_buffer.update("products", {"_id": product_id}, update)
+        return None
+    # Needs the prior state: earlier buffered stages for this product must land first
+    await write_buffer.flush()
+    return await database.get_collection("products").find_one_and_update(
+        {"_id": product_id}, update, projection=previous_fields, return_document=ReturnDocument.BEFORE
+    )
+
+async def ingest_url(product_id: Any, url: str):
+    """
+    Fetch -> extract -> analyse for an ingested URL. The product document is
+    updated in place after each stage so the UI can follow progress.
+    Any failure is recorded on the product and re-raised so the queue retries.
+    """
+    from app.services.analysis_pipeline import analysis_pipeline
+
+    try:
+        # 1. Fetch + extract (cached, rate-limited scrape and AI field extraction)
+        await _update_stage(product_id, {"ingest_status": "fetching"})
+        analysis_input, _ = await analysis_pipeline.build_input({"url": url})
+        image_url = analysis_input["image_url"]
+        await _update_stage(product_id, {
+            "ingest_status": "analyzing",
+            "name": analysis_input["title"] or "Product from URL",
+            "description": analysis_input["description"],
+            "price": analysis_input["price"],
+            "mrp": analysis_input["mrp"],
+            "category": analysis_input["category"],
+            "images": [image_url] if image_url else []
+        }, "Page Scraped", f"Extracted listing from {url}")
+
+        # 2. Analyse
+        analysis_result = await analysis_pipeline.evaluate(analysis_input)
+        deals = analysis_pipeline.find_deals(analysis_input)
+        details = f"Compliance Score: {analysis_result['compliance_score']}"
+        if analysis_result.get("timed_out_checks"):
+            details += f" (timed out: {', '.join(analysis_result['timed_out_checks'])})"
+        violations = [v.dict() for v in analysis_result["violations"]]
+        fields = {
+            "ingest_status": "completed",
+            "ingest_error": None,
+            "ingested_at": datetime.utcnow(),
+            "category": analysis_input["category"],
+            "compliance_score": analysis_result["compliance_score"],
+            "risk_level": analysis_result["risk_level"],
+            "violations": violations,
+            "deals": deals
+        }
+        fields["rollup"] = rollups.snapshot(fields, fields["ingested_at"])
+        previous = await _update_stage(product_id, fields, "Compliance Analysis", details, previous_fields={"rollup": 1})
+        await sync_product(product_id, {
+            "name": analysis_input["title"],
+            "images": [image_url] if image_url else [],
+            "category": analysis_input["category"],
+            "violations": violations
+        })
+        if previous is not None:
+            await rollups.apply(fields["rollup"], previous.get("rollup"))
+        await price_stats.record(analysis_input["category"], analysis_input["price"])
+    except Exception as e:
+        await _update_stage(product_id, {"ingest_status": "error", "ingest_error": str(e)})
+        raise
+
+async def _ingest_url_job(payload: Dict[str, Any]):
+    await ingest_url(payload["product_id"], payload["url"])
+
+# Job kind -> handler, consumed by the worker pool (worker.py)
+JOB_HANDLERS = {
+    ANALYZE_TEXT_JOB: _analyze_text_job,
+    INGEST_URL_JOB: _ingest_url_job,
+}
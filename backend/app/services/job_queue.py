@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.database import database
+
+JOBS_COLLECTION = "jobs"
+DEAD_LETTER_COLLECTION = "jobs_dead"
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "5"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "900"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1.0"))
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+def lease_filter(now: datetime, kinds: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Due jobs plus jobs whose lease expired (also probed by the index check in app/core/indexes.py).
+    """
+    query: Dict[str, Any] = {"$or": [
+        {"status": "queued", "run_at": {"$lte": now}},
+        {"status": "leased", "lease_until": {"$lt": now}}
+    ]}
+    if kinds:
+        query["kind"] = {"$in": list(kinds)}
+    return query
+
+class JobQueue:
+    """
+    Mongo-backed job queue with lease/ack semantics.
+
+    A worker leases the oldest due job (atomically, via find_one_and_update) and
+    owns it until `lease_until`; a job whose lease expires (worker crashed or
+    hung) becomes leasable again. Each lease gets a fresh token, so a late ack
+    from a worker that lost its lease is ignored. Failures are retried with
+    exponential backoff; after `max_attempts` the job moves to `jobs_dead`.
+    """
+
+    def __init__(self, collection: str = JOBS_COLLECTION, dead_letter: str = DEAD_LETTER_COLLECTION):
+        self.collection_name = collection
+        self.dead_letter_name = dead_letter
+
+    @property
+    def jobs(self):
+        return database.get_collection(self.collection_name)
+
+    @property
+    def dead(self):
+        return database.get_collection(self.dead_letter_name)
+
+    async def ensure_indexes(self):
+        # Declared with the rest in app/core/indexes.py (incl. the unique dedupe_key index)
+        from app.core.indexes import ensure_indexes
+        await ensure_indexes(collections=[self.collection_name, self.dead_letter_name])
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS,
+                      delay_seconds: float = 0, dedupe_key: Optional[str] = None) -> Tuple[Any, bool]:
+        """
+        Returns (job_id, created). With a dedupe_key, an already queued/leased job
+        with the same key is returned instead of adding a second one.
+        """
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now + timedelta(seconds=delay_seconds),
+            "lease_until": None,
+            "lease_token": None,
+            "worker": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        if dedupe_key is not None:
+            job["dedupe_key"] = dedupe_key
+        try:
+            result = await self.jobs.insert_one(job)
+            return result.inserted_id, True
+        except DuplicateKeyError:
+            existing = await self.find_pending(dedupe_key)
+            if existing is None: # Finished between the insert and the lookup
+                return await self.enqueue(kind, payload, max_attempts, delay_seconds, dedupe_key)
+            return existing["_id"], False
+
+    async def find_pending(self, dedupe_key: str) -> Optional[Dict[str, Any]]:
+        """
+        The queued or leased job for a dedupe key, if any.
+        """
+        return await self.jobs.find_one({"dedupe_key": dedupe_key})
+
+    async def lease(self, worker: str, kinds: Optional[Iterable[str]] = None, lease_seconds: int = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """
+        Claims the next due job (or one whose lease expired). Returns None if the queue is empty.
+        """
+        while True:
+            now = datetime.utcnow()
+            job = await self.jobs.find_one_and_update(
+                lease_filter(now, kinds),
+                {
+                    "$set": {
+                        "status": "leased",
+                        "lease_until": now + timedelta(seconds=lease_seconds),
+                        "lease_token": uuid.uuid4().hex,
+                        "worker": worker,
+                        "updated_at": now
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("run_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return None
+            if job["attempts"] <= job["max_attempts"]:
+                return job
+            # Leased too often without an ack (worker keeps dying on it)
+            await self._dead_letter(job, job.get("last_error") or "Lease expired too many times")
+
+    async def extend(self, job: Dict[str, Any], lease_seconds: int = JOB_LEASE_SECONDS) -> bool:
+        """
+        Heartbeat for long jobs. Returns False if the lease was lost.
+        """
+        result = await self.jobs.update_one(
+            {"_id": job["_id"], "lease_token": job["lease_token"]},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+        )
+        return result.modified_count == 1
+
+    async def ack(self, job: Dict[str, Any]) -> bool:
+        result = await self.jobs.delete_one({"_id": job["_id"], "lease_token": job["lease_token"]})
+        return result.deleted_count == 1
+
+    def backoff_seconds(self, attempts: int) -> float:
+        delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.2) # Jitter so failed batches don't retry in lockstep
+
+    async def fail(self, job: Dict[str, Any], error: str):
+        if job["attempts"] >= job["max_attempts"]:
+            await self._dead_letter(job, error)
+            return
+        now = datetime.utcnow()
+        await self.jobs.update_one(
+            {"_id": job["_id"], "lease_token": job["lease_token"]},
+            {"$set": {
+                "status": "queued",
+                "run_at": now + timedelta(seconds=self.backoff_seconds(job["attempts"])),
+                "lease_until": None,
+                "lease_token": None,
+                "worker": None,
+                "last_error": error,
+                "updated_at": now
+            }}
+        )
+
+    async def _dead_letter(self, job: Dict[str, Any], error: str) -> bool:
+        # Same lease guard as ack/fail: a worker whose lease expired must not bury a job
+        # another worker has re-leased and is running
+        result = await self.jobs.delete_one({"_id": job["_id"], "lease_token": job["lease_token"]})
+        if result.deleted_count != 1:
+            logging.warning(f"Job {job['_id']} ({job['kind']}) not dead-lettered: lease lost")
+            return False
+        doc = {**job, "status": "dead", "last_error": error, "dead_at": datetime.utcnow()}
+        await self.dead.replace_one({"_id": job["_id"]}, doc, upsert=True)
+        logging.error(f"Job {job['_id']} ({job['kind']}) dead-lettered after {job['attempts']} attempts: {error}")
+        return True
+
+    async def requeue_dead(self, job_id: Any) -> bool:
+        """
+        Moves a dead-lettered job back to the queue with a fresh attempt budget.
+        """
+        job = await self.dead.find_one({"_id": job_id})
+        if job is None:
+            return False
+        job.pop("dead_at", None)
+        job.update({"status": "queued", "attempts": 0, "run_at": datetime.utcnow(), "lease_until": None, "lease_token": None, "worker": None})
+        await self.jobs.replace_one({"_id": job_id}, job, upsert=True)
+        await self.dead.delete_one({"_id": job_id})
+        return True
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = {"queued": 0, "leased": 0}
+        async for row in self.jobs.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        counts["dead"] = await self.dead.count_documents({})
+        return counts
+
+class WorkerPool:
+    """
+    Drains the queue with `concurrency` concurrent consumers. Each consumer
+    leases one job at a time, keeps the lease alive while the handler runs and
+    acks on success / fails (retry or dead-letter) on error.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Handler], concurrency: int = WORKER_CONCURRENCY, poll_seconds: float = WORKER_POLL_SECONDS):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._tasks = []
+        self.processed = {"ok": 0, "failed": 0}
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await self.queue.extend(job):
+                logging.warning(f"Lost lease on job {job['_id']}")
+                return
+
+    async def _run_one(self, job: Dict[str, Any]):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self.queue.fail(job, f"No handler for job kind '{job['kind']}'")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await handler(job["payload"])
+        except Exception as e:
+            self.processed["failed"] += 1
+            logging.error(f"Job {job['_id']} ({job['kind']}) attempt {job['attempts']} failed: {e}")
+            await self.queue.fail(job, str(e))
+        else:
+            self.processed["ok"] += 1
+            await self.queue.ack(job)
+        finally:
+            heartbeat.cancel()
+
+    async def _consume(self, slot: int):
+        worker = f"{self.name}/{slot}"
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(worker, kinds=self.handlers.keys())
+            except Exception as e:
+                logging.error(f"Job lease failed: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_one(job)
+
+    def start(self):
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._consume(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        """
+        Stops leasing new jobs and waits for in-flight ones to finish.
+        """
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self):
+        self.start()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+job_queue = JobQueue()
@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+class KeywordHit(NamedTuple):
+    term: str
+    tag: Any
+    start: int
+    end: int # exclusive
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed term dictionary.
+
+    Every term carries one or more tags (e.g. ("blacklist", "fake") or
+    ("brand", "Nike")). find_all() reports every whole-word occurrence of every
+    term in a single left-to-right pass, so cost grows with the text length,
+    not with the number of terms. Matching is case-insensitive.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, Any]]):
+        # Node 0 is the root. Each node: goto transitions, failure link, outputs.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, Any]]] = [[]]
+        self.size = 0
+
+        for term, tag in terms:
+            term = term.lower().strip()
+            if term:
+                self._insert(term, tag)
+                self.size += 1
+        self._build_failure_links()
+
+    def _insert(self, term: str, tag: Any):
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((term, tag))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Inherit matches that end at the failure node (suffix terms)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """
+        Positions refer to the lower-cased text.
+        """
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        node = 0
+        n = len(text)
+
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+
+            end = i + 1
+            # Every output at this node ends with `ch`, so the trailing boundary check is shared
+            if end < n and _is_word_char(ch) and _is_word_char(text[end]):
+                continue
+            for term, tag in out[node]:
+                start = end - len(term)
+                if start > 0 and _is_word_char(term[0]) and _is_word_char(text[start - 1]):
+                    continue
+                hits.append(KeywordHit(term, tag, start, end))
+        return hits
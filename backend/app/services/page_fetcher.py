@@ -0,0 +1,177 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.core.concurrency import run_io
+from app.core.http_cache import conditional_headers, freshness_seconds, is_storable, retry_after_seconds
+from app.core.rate_limit import DomainRateLimiter, domain_of
+
+SCRAPER_FETCH_TIMEOUT = float(os.getenv("SCRAPER_FETCH_TIMEOUT", "15"))
+SCRAPER_CACHE_ENABLED = os.getenv("SCRAPER_CACHE_ENABLED", "true").lower() == "true"
+SCRAPER_CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", os.path.join(".cache", "pages.sqlite3"))
+SCRAPER_CACHE_MAX_MB = int(os.getenv("SCRAPER_CACHE_MAX_MB", "256"))
+# Freshness used when the marketplace sends no Cache-Control/Expires (most product pages)
+SCRAPER_CACHE_DEFAULT_TTL = int(os.getenv("SCRAPER_CACHE_DEFAULT_TTL", "300"))
+# Cooldown applied to a domain that answers 429/503 without a Retry-After
+SCRAPER_THROTTLE_COOLDOWN = float(os.getenv("SCRAPER_THROTTLE_COOLDOWN", "30"))
+
+class PageResponse(NamedTuple):
+    status_code: int
+    content: bytes
+    from_cache: bool
+
+class PageCache:
+    """
+    SQLite-backed HTTP cache for scraped pages. Bodies are stored zlib-compressed
+    together with their validators and freshness deadline; trimmed LRU-first
+    once the stored bodies exceed SCRAPER_CACHE_MAX_MB.
+    """
+
+    def __init__(self, path: str = SCRAPER_CACHE_PATH, max_bytes: int = SCRAPER_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+        self._db = None
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, status INTEGER NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL,"
+                " etag TEXT, last_modified TEXT, fresh_until REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)")
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Page cache unavailable ({e}); scraping without cache.")
+            self._db = None
+
+    def get(self, url: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Returns (entry with decompressed `content`, is_fresh). Fresh hits are touched here.
+        """
+        if self._db is None:
+            return None, False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, body, etag, last_modified, fresh_until FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            fresh = row[4] > time.time()
+            if fresh:
+                self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        try:
+            content = zlib.decompress(row[1])
+        except zlib.error:
+            return None, False
+        return {"status": row[0], "content": content, "etag": row[2], "last_modified": row[3]}, fresh
+
+    def set(self, url: str, status: int, content: bytes, headers):
+        if self._db is None or not is_storable(headers):
+            return
+        body = zlib.compress(content, 1)
+        now = time.time()
+        fresh_until = now + freshness_seconds(headers, SCRAPER_CACHE_DEFAULT_TTL, heuristic=True)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, status, body, size, etag, last_modified, fresh_until, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, body, len(body), headers.get("etag"), headers.get("last-modified"), fresh_until, now)
+            )
+            self._stores_since_evict += 1
+            if self._stores_since_evict >= 32:
+                self._evict()
+
+    def refresh(self, url: str, headers):
+        """
+        304 Not Modified: keep the stored body, extend its freshness.
+        """
+        if self._db is None:
+            return
+        now = time.time()
+        fresh_until = now + freshness_seconds(headers, SCRAPER_CACHE_DEFAULT_TTL, heuristic=True)
+        with self._lock:
+            self._db.execute("UPDATE pages SET fresh_until = ?, accessed_at = ? WHERE url = ?", (fresh_until, now, url))
+
+    def _evict(self):
+        # Caller holds the lock
+        self._stores_since_evict = 0
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+
+class PageFetcher:
+    """
+    Fetch layer in front of the scraper session: serves fresh pages from the
+    local cache, revalidates stale ones with a conditional GET and sends every
+    network request through the per-domain limiter (callers over the limit wait
+    their turn). Domains answering 429/503 are paused for Retry-After.
+    """
+
+    def __init__(self, session, cache: Optional[PageCache] = None, limiter: Optional[DomainRateLimiter] = None):
+        self.session = session
+        self.cache = cache if cache is not None else (PageCache() if SCRAPER_CACHE_ENABLED else None)
+        self.limiter = limiter or DomainRateLimiter()
+        self._lock = threading.Lock()
+        self._counters = {"cache_fresh_hits": 0, "revalidated": 0, "downloads": 0, "throttled": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _cached(self, url: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        if self.cache is None:
+            return None, False
+        return self.cache.get(url)
+
+    def _handle(self, url: str, entry: Optional[Dict[str, Any]], response) -> PageResponse:
+        # Runs off the event loop (cache writes hit SQLite)
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            if self.cache is not None:
+                self.cache.refresh(url, response.headers)
+            return PageResponse(entry["status"], entry["content"], True)
+
+        if response.status_code in (429, 503):
+            self._count("throttled")
+            self.limiter.penalize(domain_of(url), retry_after_seconds(response.headers, SCRAPER_THROTTLE_COOLDOWN))
+        elif response.status_code == 200:
+            self._count("downloads")
+            if self.cache is not None:
+                self.cache.set(url, response.status_code, response.content, response.headers)
+        return PageResponse(response.status_code, response.content, False)
+
+    def fetch(self, url: str) -> PageResponse:
+        entry, fresh = self._cached(url)
+        if fresh:
+            self._count("cache_fresh_hits")
+            return PageResponse(entry["status"], entry["content"], True)
+
+        with self.limiter.limit(url):
+            response = self.session.get(url, timeout=SCRAPER_FETCH_TIMEOUT, headers=conditional_headers(entry))
+        return self._handle(url, entry, response)
+
+    async def fetch_async(self, url: str) -> PageResponse:
+        entry, fresh = await run_io(self._cached, url)
+        if fresh:
+            self._count("cache_fresh_hits")
+            return PageResponse(entry["status"], entry["content"], True)
+
+        async with self.limiter.limit_async(url):
+            response = await run_io(self.session.get, url, timeout=SCRAPER_FETCH_TIMEOUT, headers=conditional_headers(entry))
+        return await run_io(self._handle, url, entry, response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["limiter_waits"] = dict(self.limiter.waits)
+        return stats
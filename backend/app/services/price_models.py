@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from app.core.concurrency import run_io
+from app.core.database import database
+from app.services.price_stats import parse_price
+from app.services.rollups import normalize_category, ALL_CATEGORIES
+try:
+    from sklearn.ensemble import IsolationForest
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+PRICE_MODEL_PATH = os.getenv("PRICE_MODEL_PATH", os.path.join(".cache", "price_models.pkl"))
+# Categories with fewer priced products share the all-categories model
+PRICE_MODEL_MIN_SAMPLES = int(os.getenv("PRICE_MODEL_MIN_SAMPLES", "50"))
+# Newest products per category used for training
+PRICE_MODEL_MAX_SAMPLES = int(os.getenv("PRICE_MODEL_MAX_SAMPLES", "20000"))
+PRICE_MODEL_CONTAMINATION = float(os.getenv("PRICE_MODEL_CONTAMINATION", "0.05"))
+# API process: retrain in a child process every N seconds (0 = leave it to train_price_models.py)
+PRICE_MODEL_RETRAIN_SECONDS = int(os.getenv("PRICE_MODEL_RETRAIN_SECONDS", "0"))
+# How often running processes check the model file for a newer version
+PRICE_MODEL_RELOAD_SECONDS = int(os.getenv("PRICE_MODEL_RELOAD_SECONDS", "60"))
+
+def feature_matrix(prices, mrps=None) -> np.ndarray:
+    """
+    [log price, discount % off MRP] per row. A missing/invalid MRP counts as no discount.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if mrps is None:
+        discount = np.zeros_like(prices)
+    else:
+        mrps = np.asarray(mrps, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            discount = np.where(mrps > 0, (mrps - prices) / mrps * 100, 0.0)
+        discount = np.nan_to_num(discount)
+    return np.column_stack([np.log1p(np.maximum(prices, 0)), discount])
+
+def train_models(data: Dict[str, Tuple[Sequence[float], Sequence[float]]],
+                 min_samples: int = PRICE_MODEL_MIN_SAMPLES,
+                 contamination: float = PRICE_MODEL_CONTAMINATION) -> Dict[str, Any]:
+    """
+    category -> (prices, mrps) into a model bundle: one IsolationForest per category
+    with enough samples plus one over everything. Pure CPU; runs in a child process.
+    """
+    models, samples = {}, {}
+    all_X = []
+    for category, (prices, mrps) in data.items():
+        X = feature_matrix(prices, mrps)
+        all_X.append(X)
+        if len(X) >= min_samples:
+            models[category] = IsolationForest(contamination=contamination, random_state=42).fit(X)
+            samples[category] = len(X)
+    if all_X:
+        X = np.vstack(all_X)
+        if len(X) > PRICE_MODEL_MAX_SAMPLES:
+            X = X[np.random.default_rng(42).choice(len(X), PRICE_MODEL_MAX_SAMPLES, replace=False)]
+        if len(X) >= min_samples:
+            models[ALL_CATEGORIES] = IsolationForest(contamination=contamination, random_state=42).fit(X)
+            samples[ALL_CATEGORIES] = len(X)
+    return {"trained_at": datetime.utcnow(), "models": models, "samples": samples}
+
+def save_bundle(bundle: Dict[str, Any], path: str = PRICE_MODEL_PATH):
+    # Write-then-rename, so readers never see a half-written file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+async def load_training_data(max_per_category: int = PRICE_MODEL_MAX_SAMPLES) -> Dict[str, Tuple[list, list]]:
+    """
+    Newest priced products per category: category -> (prices, mrps).
+    """
+    data: Dict[str, Tuple[list, list]] = {}
+    cursor = database.get_collection("products").find(
+        {"risk_level": {"$ne": "Processing"}}, {"category": 1, "price": 1, "mrp": 1}
+    ).sort("_id", -1).batch_size(2000)
+    async for product in cursor:
+        price = parse_price(product.get("price"))
+        if price is None:
+            continue
+        prices, mrps = data.setdefault(normalize_category(product.get("category")), ([], []))
+        if len(prices) < max_per_category:
+            prices.append(price)
+            mrps.append(parse_price(product.get("mrp")) or 0.0)
+    return data
+
+class PriceModelRegistry:
+    """
+    The current per-category IsolationForest bundle.
+
+    Models are trained off the request path (train_price_models.py, or a child
+    process when PRICE_MODEL_RETRAIN_SECONDS is set), written atomically to
+    PRICE_MODEL_PATH and picked up by every running process within
+    PRICE_MODEL_RELOAD_SECONDS. The swap is a single reference assignment, so
+    a scoring call sees either the old bundle or the new one, never a mix.
+    """
+
+    def __init__(self, path: str = PRICE_MODEL_PATH):
+        self.path = path
+        self.bundle: Dict[str, Any] = {"trained_at": None, "models": {}, "samples": {}}
+        self._mtime: Optional[float] = None
+        self._tasks = []
+
+    def get(self, category: Optional[str], bundle: Optional[Dict[str, Any]] = None):
+        """
+        The category's model, else the all-categories one; None before the first training.
+        """
+        models = (bundle or self.bundle)["models"]
+        model = models.get(normalize_category(category))
+        return model if model is not None else models.get(ALL_CATEGORIES)
+
+    def install(self, bundle: Dict[str, Any]):
+        self.bundle = bundle
+
+    def reload(self) -> bool:
+        """
+        Swaps in the model file if it changed since the last load. Returns True on swap.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                bundle = pickle.load(f)
+        except Exception as e:
+            logging.error(f"Could not load price models from {self.path}: {e}")
+            return False
+        self._mtime = mtime
+        self.install(bundle)
+        logging.info(f"Loaded price models for {len(bundle['models'])} categories (trained {bundle['trained_at']})")
+        return True
+
+    async def retrain(self) -> Dict[str, int]:
+        """
+        Pulls training data, fits in a child process, saves and installs the new bundle.
+        """
+        if not SKLEARN_AVAILABLE:
+            raise RuntimeError("Price models need scikit-learn")
+        start = time.perf_counter()
+        data = await load_training_data()
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            bundle = await asyncio.get_running_loop().run_in_executor(pool, train_models, data)
+        await run_io(save_bundle, bundle, self.path)
+        await run_io(self.reload)
+        logging.info(f"Trained price models in {time.perf_counter() - start:.1f}s: {bundle['samples']}")
+        return bundle["samples"]
+
+    async def _retrain_every(self, seconds: int):
+        while True:
+            try:
+                await self.retrain()
+            except Exception as e:
+                logging.error(f"Price model training failed: {e}")
+            await asyncio.sleep(seconds)
+
+    async def _reload_every(self, seconds: int):
+        while True:
+            await asyncio.sleep(seconds)
+            await run_io(self.reload)
+
+    def start(self, retrain_seconds: int = PRICE_MODEL_RETRAIN_SECONDS, reload_seconds: int = PRICE_MODEL_RELOAD_SECONDS):
+        self.reload()
+        self._tasks.append(asyncio.create_task(self._reload_every(reload_seconds)))
+        if retrain_seconds > 0 and SKLEARN_AVAILABLE:
+            self._tasks.append(asyncio.create_task(self._retrain_every(retrain_seconds)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def summary(self) -> Dict[str, Any]:
+        bundle = self.bundle
+        return {"trained_at": bundle["trained_at"], "samples": dict(bundle["samples"])}
+
+price_models = PriceModelRegistry()
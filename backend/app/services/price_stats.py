@@ -0,0 +1,211 @@
+import logging
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, Optional
+from pymongo import UpdateOne
+from app.core.database import database
+from app.services.rollups import normalize_category, ALL_CATEGORIES
+
+PRICE_STATS_COLLECTION = "category_price_stats"
+# Pending observations are merged into Mongo once this many have accumulated (and on shutdown)
+PRICE_STATS_FLUSH_EVERY = int(os.getenv("PRICE_STATS_FLUSH_EVERY", "50"))
+# Below this many prices a category's stats are not trusted for Z-scores
+PRICE_STATS_MIN_SAMPLES = int(os.getenv("PRICE_STATS_MIN_SAMPLES", "30"))
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+def parse_price(value: Any) -> Optional[float]:
+    """
+    "₹11,500" / "Rs. 499.00" / 499 -> float; None when missing or not a positive number.
+    """
+    if isinstance(value, (int, float)):
+        price = float(value)
+    else:
+        match = _NUMBER_RE.search(str(value or ""))
+        if not match:
+            return None
+        price = float(match.group(0).replace(",", ""))
+    return price if price > 0 and math.isfinite(price) else None
+
+class RunningStats:
+    """
+    Welford accumulator (count, mean, sum of squared deviations) for one category.
+    """
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 min: Optional[float] = None, max: Optional[float] = None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def merge(self, other: "RunningStats"):
+        # Chan et al. parallel combination; same result as adding other's values one by one
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "RunningStats":
+        return cls(doc.get("count", 0), doc.get("mean", 0.0), doc.get("m2", 0.0), doc.get("min"), doc.get("max"))
+
+def _merge_pipeline(delta: RunningStats) -> list:
+    """
+    Update pipeline applying RunningStats.merge to the stored document atomically,
+    so API and worker processes can merge concurrently.
+    """
+    n0 = {"$ifNull": ["$count", 0]}
+    mean0 = {"$ifNull": ["$mean", 0.0]}
+    diff = {"$subtract": [delta.mean, "$_mean0"]}
+    count = {"$add": ["$_count0", delta.count]}
+    return [
+        {"$set": {"_count0": n0, "_mean0": mean0}},
+        {"$set": {
+            "count": count,
+            "mean": {"$add": ["$_mean0", {"$divide": [{"$multiply": [diff, delta.count]}, count]}]},
+            "m2": {"$add": [
+                {"$ifNull": ["$m2", 0.0]}, delta.m2,
+                {"$divide": [{"$multiply": [diff, diff, "$_count0", delta.count]}, count]}
+            ]},
+            "min": {"$min": ["$min", delta.min]},
+            "max": {"$max": ["$max", delta.max]},
+            "updated_at": "$$NOW"
+        }},
+        {"$unset": ["_count0", "_mean0"]}
+    ]
+
+class CategoryPriceStats:
+    """
+    Per-category price mean/variance maintained online from analysed products.
+
+    record() folds a price into the in-memory stats right away (the Z-score
+    check sees it immediately) and into a pending delta that is merged into
+    `category_price_stats` every PRICE_STATS_FLUSH_EVERY prices, after which
+    the stats are reloaded so every process converges; no collection scans.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, RunningStats] = {}
+        self._pending: Dict[str, RunningStats] = {}
+        self._pending_count = 0
+
+    def get(self, category: Optional[str]) -> Optional[RunningStats]:
+        """
+        Stats for the category, else across all categories; None until PRICE_STATS_MIN_SAMPLES are seen.
+        """
+        for key in (normalize_category(category), ALL_CATEGORIES):
+            stats = self._stats.get(key)
+            if stats is not None and stats.count >= PRICE_STATS_MIN_SAMPLES and stats.std > 0:
+                return stats
+        return None
+
+    def _observe(self, category: Optional[str], price: Any) -> bool:
+        value = parse_price(price)
+        if value is None:
+            return False
+        for key in (normalize_category(category), ALL_CATEGORIES):
+            self._stats.setdefault(key, RunningStats()).add(value)
+            self._pending.setdefault(key, RunningStats()).add(value)
+        self._pending_count += 1
+        return True
+
+    async def record(self, category: Optional[str], price: Any):
+        if self._observe(category, price) and self._pending_count >= PRICE_STATS_FLUSH_EVERY:
+            await self.flush()
+
+    async def record_many(self, products: Iterable[Dict[str, Any]]):
+        for product in products:
+            self._observe(product.get("category"), product.get("price"))
+        if self._pending_count >= PRICE_STATS_FLUSH_EVERY:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Merges pending deltas into Mongo. On failure they are kept for the next flush.
+        """
+        if not self._pending_count:
+            return 0
+        pending, self._pending = self._pending, {}
+        count, self._pending_count = self._pending_count, 0
+        ops = [UpdateOne({"_id": key}, _merge_pipeline(delta), upsert=True) for key, delta in pending.items()]
+        try:
+            await database.get_collection(PRICE_STATS_COLLECTION).bulk_write(ops, ordered=False)
+        except Exception as e:
+            logging.error(f"Price stats flush failed, will retry: {e}")
+            for key, delta in pending.items():
+                self._pending.setdefault(key, RunningStats()).merge(delta)
+            self._pending_count += count
+            return 0
+        await self.load() # Pick up what other processes merged meanwhile
+        return count
+
+    async def load(self):
+        """
+        Replaces the in-memory stats with the persisted ones (plus anything not yet flushed).
+        """
+        try:
+            docs = await database.get_collection(PRICE_STATS_COLLECTION).find().to_list(None)
+        except Exception as e:
+            logging.error(f"Could not load category price stats: {e}")
+            return
+        stats = {doc["_id"]: RunningStats.from_doc(doc) for doc in docs}
+        for key, delta in self._pending.items():
+            stats.setdefault(key, RunningStats()).merge(delta)
+        self._stats = stats
+        logging.info(f"Loaded price stats for {len(stats)} categories")
+
+    async def rebuild(self, batch_size: int = 1000) -> int:
+        """
+        Recomputes the stats from every analysed product (first run / repair). Returns prices counted.
+        """
+        totals: Dict[str, RunningStats] = {}
+        counted = 0
+        cursor = database.get_collection("products").find(
+            {"risk_level": {"$ne": "Processing"}}, {"category": 1, "price": 1}
+        ).batch_size(batch_size)
+        async for product in cursor:
+            value = parse_price(product.get("price"))
+            if value is None:
+                continue
+            for key in (normalize_category(product.get("category")), ALL_CATEGORIES):
+                totals.setdefault(key, RunningStats()).add(value)
+            counted += 1
+        collection = database.get_collection(PRICE_STATS_COLLECTION)
+        await collection.delete_many({})
+        if totals:
+            await collection.insert_many([
+                {"_id": key, "count": s.count, "mean": s.mean, "m2": s.m2, "min": s.min, "max": s.max}
+                for key, s in totals.items()
+            ])
+        self._pending, self._pending_count = {}, 0
+        self._stats = totals
+        return counted
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            key: {"count": s.count, "mean": round(s.mean, 2), "std": round(s.std, 2), "min": s.min, "max": s.max}
+            for key, s in sorted(self._stats.items())
+        }
+
+price_stats = CategoryPriceStats()
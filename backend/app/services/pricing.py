@@ -1,14 +1,11 @@
 import numpy as np
-from typing import Dict, Any, List
-try:
-    from sklearn.ensemble import IsolationForest
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+from typing import Dict, Any, List, Optional, Sequence
+from app.services.price_stats import price_stats
+from app.services.price_models import price_models, feature_matrix
 
 class PricingEngine:
     def __init__(self):
-        # Mock Category Data (Mean Price, Std Dev) for Z-score
+        # Cold-start fallback (Mean Price, Std Dev) until a category has PRICE_STATS_MIN_SAMPLES prices
         self.category_stats = {
             "electronics": {"mean": 500, "std": 200},
             "clothing": {"mean": 50, "std": 20},
@@ -16,20 +13,22 @@ class PricingEngine:
             "luxury": {"mean": 2000, "std": 1000},
             "general": {"mean": 100, "std": 50}
         }
-        
-        # Train a mock Isolation Forest for "electronics" (Concept)
-        if SKLEARN_AVAILABLE:
-            self.iso_forest = IsolationForest(contamination=0.1, random_state=42)
-            # Mock pricing data points
-            X = np.array([[100], [200], [500], [550], [480], [600], [3000], [50], [520], [490]])
-            self.iso_forest.fit(X)
 
     def calculate_discount(self, price: float, mrp: float) -> float:
         if mrp <= 0: return 0.0
         return ((mrp - price) / mrp) * 100
 
+    def stats_for(self, category: str) -> Dict[str, float]:
+        """
+        Mean/std learned from analysed products (app/services/price_stats.py), else the fallback table.
+        """
+        learned = price_stats.get(category)
+        if learned is not None:
+            return {"mean": learned.mean, "std": learned.std}
+        return self.category_stats.get(category.lower(), self.category_stats["general"])
+
     def z_score_analysis(self, price: float, category: str) -> Dict[str, Any]:
-        stats = self.category_stats.get(category.lower(), self.category_stats["general"])
+        stats = self.stats_for(category)
         mean = stats["mean"]
         std = stats["std"]
         
@@ -44,49 +43,99 @@ class PricingEngine:
             "mean_price": mean
         }
 
-    def isolation_forest_analysis(self, price: float) -> Dict[str, Any]:
-        if not SKLEARN_AVAILABLE:
+    def isolation_forest_analysis(self, price: float, category: str = "general", mrp: Optional[float] = None) -> Dict[str, Any]:
+        # Per-category model trained from stored products (app/services/price_models.py)
+        model = price_models.get(category)
+        if model is None:
             return {"score": 0.0, "is_anomaly": False, "method": "Unavailable"}
-            
-        # Predict: -1 for outlier, 1 for inlier
-        # Score_samples: lower is more anomalous
-        prediction = self.iso_forest.predict([[price]])[0]
-        score = self.iso_forest.decision_function([[price]])[0]
-        
-        # Normalize score rough approx to 0-1 risk
-        anomaly_score = 1.0 if prediction == -1 else 0.0
-        if prediction == -1:
-            anomaly_score = min(1.0, abs(score) * 2) # boost confidence
+        return self._iso_stats(float(self.isolation_forest_scores(model, [price], [mrp or 0.0])[0]))
+
+    def isolation_forest_scores(self, model, prices, mrps=None) -> np.ndarray:
+        """
+        decision_function for a whole batch in one score_samples call (negative = outlier,
+        which is exactly where predict() returns -1).
+        """
+        return model.score_samples(feature_matrix(prices, mrps)) - model.offset_
 
+    def _iso_stats(self, score: float) -> Dict[str, Any]:
+        is_anomaly = score < 0
+        # Normalize score rough approx to 0-1 risk
+        anomaly_score = min(1.0, abs(score) * 2) if is_anomaly else 0.0 # boost confidence
         return {
             "score": round(anomaly_score, 2),
-            "is_anomaly": prediction == -1,
+            "is_anomaly": is_anomaly,
             "method": "IsolationForest"
         }
 
-    def analyze_price(self, price: float, category: str = "general") -> List[Dict[str, Any]]:
+    def _z_anomaly(self, z_score: float, category: str) -> Dict[str, Any]:
+        severity = "high" if abs(z_score) > 3 else "medium"
+        return {
+            "confidence": severity,
+            "details": f"Price is a statistical outlier (Z-Score: {z_score}) for {category}.",
+            "method": "Z-Score"
+        }
+
+    def _iso_anomaly(self, iso_stats: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "confidence": "high",
+            "details": f"Isolation Forest detected anomaly (Score: {iso_stats['score']}).",
+            "method": "IsolationForest"
+        }
+
+    def analyze_price(self, price: float, category: str = "general", mrp: Optional[float] = None) -> List[Dict[str, Any]]:
         anomalies = []
         
         # 1. Z-Score Check
         z_stats = self.z_score_analysis(price, category)
         if z_stats["is_anomaly"]:
-            severity = "high" if abs(z_stats["z_score"]) > 3 else "medium"
-            anomalies.append({
-                "confidence": severity,
-                "details": f"Price is a statistical outlier (Z-Score: {z_stats['z_score']}) for {category}.",
-                "method": "Z-Score"
-            })
-
-        # 2. Isolation Forest Check (Demo for electronics or fallback)
-        if SKLEARN_AVAILABLE and category.lower() == "electronics":
-            iso_stats = self.isolation_forest_analysis(price)
-            if iso_stats["is_anomaly"]:
-                 anomalies.append({
-                    "confidence": "high",
-                    "details": f"Isolation Forest detected anomaly (Score: {iso_stats['score']}).",
-                    "method": "IsolationForest"
-                })
+            anomalies.append(self._z_anomaly(z_stats["z_score"], category))
+
+        # 2. Isolation Forest Check (category model, or the all-categories one)
+        iso_stats = self.isolation_forest_analysis(price, category, mrp)
+        if iso_stats["is_anomaly"]:
+            anomalies.append(self._iso_anomaly(iso_stats))
         
         return anomalies
 
+    def analyze_prices_batch(self, prices: Sequence[float], categories: Sequence[str],
+                             mrps: Optional[Sequence[float]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        analyze_price over parallel arrays: Z-scores are computed with NumPy per
+        category group and each model scores all of its prices in one call.
+        Returns one anomaly list per item, identical to the scalar path.
+        """
+        prices = np.asarray(prices, dtype=float)
+        if len(prices) != len(categories) or (mrps is not None and len(mrps) != len(prices)):
+            raise ValueError("prices, categories and mrps must have the same length")
+        mrps = np.zeros_like(prices) if mrps is None else np.nan_to_num(np.asarray(mrps, dtype=float))
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(len(prices))]
+        if not len(prices):
+            return results
+
+        # Group by lower-cased category; stats are looked up once per group
+        keys, inverse = np.unique(np.char.lower(np.asarray(categories, dtype=str)), return_inverse=True)
+        stats = [self.stats_for(key) for key in keys]
+        means = np.array([s["mean"] for s in stats], dtype=float)[inverse]
+        stds = np.array([s["std"] for s in stats], dtype=float)[inverse]
+
+        # 1. Z-Score Check
+        z_scores = (prices - means) / stds
+        for i in np.flatnonzero(np.abs(z_scores) > 2.5):
+            results[i].append(self._z_anomaly(round(float(z_scores[i]), 2), categories[i]))
+
+        # 2. Isolation Forest Check, one call per model (categories without one share the global model)
+        bundle = price_models.bundle # One bundle for the whole batch, even if a retrain lands meanwhile
+        groups: Dict[int, tuple] = {}
+        for code, key in enumerate(keys):
+            model = price_models.get(key, bundle)
+            if model is not None:
+                groups.setdefault(id(model), (model, []))[1].append(code)
+        for model, codes in groups.values():
+            rows = np.flatnonzero(np.isin(inverse, codes))
+            scores = self.isolation_forest_scores(model, prices[rows], mrps[rows])
+            for i, score in zip(rows[scores < 0], scores[scores < 0]):
+                results[i].append(self._iso_anomaly(self._iso_stats(float(score))))
+
+        return results
+
 pricing_engine = PricingEngine()
@@ -0,0 +1,136 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.core.database import database
+
+ROLLUPS_COLLECTION = "dashboard_rollups"
+ALL_CATEGORIES = "__all__"
+ALL_TIME = "all" # Sorts after any "YYYY-MM-DD", so one range query returns the window plus the totals
+
+def normalize_category(category: Optional[str]) -> str:
+    return (category or "").strip().lower() or "uncategorized"
+
+def category_match(category: Optional[str]) -> Dict[str, Any]:
+    """
+    Products filter for a category, grouped as normalize_category groups it: an equality
+    on the `rollup` snapshot stamped on every analysed product (rebuild() stamps older ones).
+    """
+    return {"rollup.category": normalize_category(category)}
+
+def _key(value: Any) -> str:
+    # Rollup counters are document fields: no dots or leading $
+    return str(value or "Unknown").replace(".", "_").replace("$", "_")
+
+def snapshot(product: Dict[str, Any], analysed_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    What one analysed product contributes to the rollups. Stored on the product
+    as `rollup` so a re-score can take the old contribution back out.
+    """
+    violations = product.get("violations") or []
+    return {
+        "day": (analysed_at or datetime.utcnow()).strftime("%Y-%m-%d"),
+        "category": normalize_category(product.get("category")),
+        "score": product.get("compliance_score") or 0,
+        "risk_level": product.get("risk_level") or "Unknown",
+        "violation_types": [v.type if hasattr(v, "type") else v.get("type") for v in violations],
+    }
+
+def _increments(snap: Dict[str, Any], sign: int, into: Dict[Tuple[str, str], Counter]):
+    inc = Counter({"products": sign, "score_sum": sign * snap["score"], f"risk.{_key(snap['risk_level'])}": sign})
+    for violation_type in snap["violation_types"]:
+        inc[f"violation_types.{_key(violation_type)}"] += sign
+    for day in (snap["day"], ALL_TIME):
+        for category in (snap["category"], ALL_CATEGORIES):
+            into[(category, day)].update(inc)
+
+async def apply_many(changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    """
+    (new_snapshot, old_snapshot) pairs -> one bulk $inc per touched rollup document.
+    old is subtracted (re-score), new is added; either may be None.
+    """
+    merged: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+    for new, old in changes:
+        if old:
+            _increments(old, -1, merged)
+        if new:
+            _increments(new, 1, merged)
+    ops = []
+    for (category, day), inc in merged.items():
+        # score_sum is always kept so a day where every product scored 0 still has the field
+        inc = {field: value for field, value in inc.items() if value or field == "score_sum"}
+        if not any(inc.values()):
+            continue
+        ops.append(UpdateOne(
+            {"_id": f"{category}|{day}"},
+            {"$inc": inc, "$setOnInsert": {"category": category, "day": day}},
+            upsert=True
+        ))
+    if not ops:
+        return
+    try:
+        await database.get_collection(ROLLUPS_COLLECTION).bulk_write(ops, ordered=False)
+    except Exception as e:
+        logging.error(f"Rollup update failed: {e}")
+
+async def apply(new: Optional[Dict[str, Any]] = None, old: Optional[Dict[str, Any]] = None):
+    await apply_many([(new, old)])
+
+def _top(counts: Dict[str, int], n: Optional[int] = None) -> List[Dict[str, Any]]:
+    items = sorted(((k, v) for k, v in (counts or {}).items() if v > 0), key=lambda kv: -kv[1])
+    return [{"name": k, "value": v} for k, v in items[:n]]
+
+async def dashboard(category: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+    """
+    Dashboard payload from the rollups: one indexed query over at most days + 1 documents.
+    """
+    key = ALL_CATEGORIES if not category or category == "all" else normalize_category(category)
+    start = (datetime.utcnow().date() - timedelta(days=max(1, days) - 1)).isoformat()
+    docs = await database.get_collection(ROLLUPS_COLLECTION).find(
+        {"category": key, "day": {"$gte": start}}
+    ).to_list(None)
+
+    totals = next((d for d in docs if d["day"] == ALL_TIME), {})
+    products = totals.get("products", 0)
+    risk = totals.get("risk", {})
+    trend = sorted((d for d in docs if d["day"] != ALL_TIME and d.get("products", 0) > 0), key=lambda d: d["day"])
+    return {
+        "summary": {
+            "total_analyzed": products,
+            "avg_compliance": round(totals.get("score_sum", 0) / products, 1) if products else 0,
+            "critical_issues": sum(v for k, v in risk.items() if "Critical" in k)
+        },
+        "violations_by_type": _top(totals.get("violation_types"), 5),
+        "risk_distribution": _top(risk),
+        "score_trend": [
+            {"date": d["day"], "score": round(d.get("score_sum", 0) / d["products"], 1)} for d in trend
+        ]
+    }
+
+async def rebuild(batch_size: int = 500) -> int:
+    """
+    Recomputes every rollup from products and re-stamps their `rollup`
+    snapshots (first run / repair). Returns products counted.
+    """
+    products = database.get_collection("products")
+    await database.get_collection(ROLLUPS_COLLECTION).delete_many({})
+    cursor = products.find(
+        {"risk_level": {"$ne": "Processing"}},
+        {"category": 1, "compliance_score": 1, "risk_level": 1, "violations.type": 1, "ingested_at": 1, "created_at": 1}
+    )
+    counted, snaps, stamps = 0, [], []
+    async for product in cursor:
+        snap = snapshot(product, product.get("ingested_at") or product.get("created_at"))
+        snaps.append((snap, None))
+        stamps.append(UpdateOne({"_id": product["_id"]}, {"$set": {"rollup": snap}}))
+        if len(stamps) >= batch_size:
+            await apply_many(snaps)
+            await products.bulk_write(stamps, ordered=False)
+            counted += len(stamps)
+            snaps, stamps = [], []
+    if stamps:
+        await apply_many(snaps)
+        await products.bulk_write(stamps, ordered=False)
+        counted += len(stamps)
+    return counted
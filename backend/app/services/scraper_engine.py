@@ -1,10 +1,16 @@
 import random
-import re
 import cloudscraper
 import requests
 from bs4 import BeautifulSoup
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from app.ai.nlp_engine import nlp_engine
+from app.core.concurrency import run_cpu
+from app.services.page_fetcher import PageFetcher
+from app.services.html_extractor import html_extractor, find_price_in_text, find_mrp_in_text, PRICE_RE, PRICE_CONTAINER_CLASS_RE, MRP_CLASS_PATTERNS, MRP_LABEL_PATTERNS
+import os
+
+# "fast": single lxml parse + single traversal (html_extractor). "soup": legacy BeautifulSoup path.
+SCRAPER_EXTRACTOR = os.getenv("SCRAPER_EXTRACTOR", "fast").lower()
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -21,6 +27,8 @@ class ScraperEngine:
                 'desktop': True
             }
         )
+        # Page cache + per-domain rate limiting in front of the cloudscraper session
+        self.fetcher = PageFetcher(self.scraper)
 
     def scrape_url(self, url: str) -> Dict[str, Any]:
         """
@@ -28,88 +36,133 @@ class ScraperEngine:
         Supports generic sites by looking for common meta tags and selectors.
         """
         try:
-            response = self.scraper.get(url, timeout=15)
+            response = self.fetcher.fetch(url)
             if response.status_code != 200:
                 print(f"Scraper Error: Status {response.status_code}")
                 return {"error": f"Failed to fetch URL. Status Code: {response.status_code}"}
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract Meta Tags (OpenGraph) - Works generically for most sites
-            title = self._get_meta_content(soup, "og:title") or soup.title.string
-            description = self._get_meta_content(soup, "og:description") or ""
-            image_url = self._get_meta_content(soup, "og:image")
-            
-            # Fallback for Image
-            if not image_url:
-                image_url = self._find_image(soup)
-            
-            # Attempt to find Price (Tricky generically)
-            price = self._find_price(soup)
-            
-            # Fallback: Check metadata text if price is still 0
-            if price == "0":
-                text_to_search = (title or "") + " " + (description or "")
-                price_match = self._find_price_in_text(text_to_search)
-                if price_match:
-                    price = price_match
-            
-            # Fallback level 2: Scan ENTIRE text for price pattern (if valid price not found yet)
-            if price == "0":
-                 full_text = soup.get_text(separator=" ", strip=True)
-                 price_match = self._find_price_in_text(full_text) # Scan FULL text
-                 if price_match:
-                     price = price_match
-            
-            # Attempt to find MRP (Fallback)
-            mrp = "0"
-            if mrp == "0":
-                mrp_match = self._find_mrp(soup)
-                if mrp_match:
-                    mrp = mrp_match
-                else:
-                    # 1. Check text
-                    full_text = soup.get_text(separator=" ", strip=True)
-                    mrp_regex_match = self._find_mrp_in_text(full_text)
-                    if mrp_regex_match:
-                        mrp = mrp_regex_match
-                    else:
-                         # 2. Check Raw HTML (for JSON or attributes)
-                         mrp_html_match = self._find_mrp_in_text(str(soup))
-                         if mrp_html_match:
-                             mrp = mrp_html_match
-
-            # AI Extraction to handle missing/complex data
-            for script in soup(["script", "style"]):
-                script.extract()
+            fields, page_text = self._parse_page(response.content)
                 
             # AI Extraction to handle missing/complex data
-            ai_data = nlp_engine.extract_product_details(soup.get_text())
-            
-            if ai_data:
-                # Prioritize AI extracted data if valid
-                if ai_data.get("price"):
-                    price = f"{ai_data.get('currency', '')}{ai_data.get('price')}"
-                if ai_data.get("title"):
-                    title = ai_data.get("title")
-                if ai_data.get("description"):
-                    description = ai_data.get("description")
-                
-            return {
-                "title": title.strip() if title else "Unknown Product",
-                "description": description.strip() if description else "",
-                "image_url": image_url,
-                "price": price,
-                "image_url": image_url,
-                "price": price,
-                "mrp": f"{ai_data.get('currency', '')}{ai_data.get('mrp')}" if ai_data.get("mrp") else mrp,
-                "category": "category" 
-            }
+            ai_data = nlp_engine.extract_product_details(page_text)
+            return self._merge_ai_data(fields, ai_data)
 
         except Exception as e:
             print(f"Scraping Failed: {e}")
             return {"error": str(e)}
 
+    async def scrape_url_async(self, url: str) -> Dict[str, Any]:
+        """
+        Non-blocking variant of scrape_url(): the (cached, rate-limited) fetch runs
+        on the IO pool, parsing on the CPU pool and the Gemini extraction is awaited natively.
+        """
+        try:
+            response = await self.fetcher.fetch_async(url)
+            if response.status_code != 200:
+                print(f"Scraper Error: Status {response.status_code}")
+                return {"error": f"Failed to fetch URL. Status Code: {response.status_code}"}
+
+            fields, page_text = await run_cpu(self._parse_page, response.content)
+
+            ai_data = await nlp_engine.extract_product_details_async(page_text)
+            return self._merge_ai_data(fields, ai_data)
+
+        except Exception as e:
+            print(f"Scraping Failed: {e}")
+            return {"error": str(e)}
+
+    def _parse_page(self, content: bytes) -> Tuple[Dict[str, Any], str]:
+        """
+        Runs the heuristic extraction over the raw page.
+        Returns the extracted fields and the visible text used for AI extraction.
+        """
+        if SCRAPER_EXTRACTOR == "soup":
+            return self._parse_page_soup(content)
+        return html_extractor.extract(content)
+
+    def _parse_page_soup(self, content: bytes) -> Tuple[Dict[str, Any], str]:
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extract Meta Tags (OpenGraph) - Works generically for most sites
+        title = self._get_meta_content(soup, "og:title") or soup.title.string
+        description = self._get_meta_content(soup, "og:description") or ""
+        image_url = self._get_meta_content(soup, "og:image")
+        
+        # Fallback for Image
+        if not image_url:
+            image_url = self._find_image(soup)
+        
+        # Attempt to find Price (Tricky generically)
+        price = self._find_price(soup)
+        
+        # Fallback: Check metadata text if price is still 0
+        if price == "0":
+            text_to_search = (title or "") + " " + (description or "")
+            price_match = self._find_price_in_text(text_to_search)
+            if price_match:
+                price = price_match
+        
+        # Fallback level 2: Scan ENTIRE text for price pattern (if valid price not found yet)
+        if price == "0":
+             full_text = soup.get_text(separator=" ", strip=True)
+             price_match = self._find_price_in_text(full_text) # Scan FULL text
+             if price_match:
+                 price = price_match
+        
+        # Attempt to find MRP (Fallback)
+        mrp = "0"
+        if mrp == "0":
+            mrp_match = self._find_mrp(soup)
+            if mrp_match:
+                mrp = mrp_match
+            else:
+                # 1. Check text
+                full_text = soup.get_text(separator=" ", strip=True)
+                mrp_regex_match = self._find_mrp_in_text(full_text)
+                if mrp_regex_match:
+                    mrp = mrp_regex_match
+                else:
+                     # 2. Check Raw HTML (for JSON or attributes)
+                     mrp_html_match = self._find_mrp_in_text(str(soup))
+                     if mrp_html_match:
+                         mrp = mrp_html_match
+
+        # Strip scripts before handing the text to the AI extractor
+        for script in soup(["script", "style"]):
+            script.extract()
+
+        fields = {
+            "title": title,
+            "description": description,
+            "image_url": image_url,
+            "price": price,
+            "mrp": mrp
+        }
+        return fields, soup.get_text()
+
+    def _merge_ai_data(self, fields: Dict[str, Any], ai_data: Dict[str, Any]) -> Dict[str, Any]:
+        title = fields["title"]
+        description = fields["description"]
+        price = fields["price"]
+
+        if ai_data:
+            # Prioritize AI extracted data if valid
+            if ai_data.get("price"):
+                price = f"{ai_data.get('currency', '')}{ai_data.get('price')}"
+            if ai_data.get("title"):
+                title = ai_data.get("title")
+            if ai_data.get("description"):
+                description = ai_data.get("description")
+            
+        return {
+            "title": title.strip() if title else "Unknown Product",
+            "description": description.strip() if description else "",
+            "image_url": fields["image_url"],
+            "price": price,
+            "mrp": f"{ai_data.get('currency', '')}{ai_data.get('mrp')}" if ai_data.get("mrp") else fields["mrp"],
+            "category": "category" 
+        }
+
     def _get_meta_content(self, soup, property_name):
         tag = soup.find("meta", property=property_name)
         return tag["content"] if tag else None
@@ -130,51 +183,27 @@ class ScraperEngine:
             if elem: return elem.get_text(strip=True)
             
         # Fallback: Regex search in likely containers (or whole text if desperate)
-        # Look for ₹ or Rs. followed by digits
-        price_regex = re.compile(r"(?:₹|Rs\.?)\s?[\d,]+(?:\.\d{2})?")
-        
         # Search in common price containers first
-        for container in soup.find_all(['span', 'div'], class_=re.compile(r'price|offer|deal', re.I)):
-            match = price_regex.search(container.get_text())
+        for container in soup.find_all(['span', 'div'], class_=PRICE_CONTAINER_CLASS_RE):
+            match = PRICE_RE.search(container.get_text())
             if match:
                 return match.group(0)
                 
         return "0"
 
     def _find_price_in_text(self, text):
-        if not text: return None
         # Look for ₹ or Rs. followed by digits
-        price_regex = re.compile(r"(?:₹|Rs\.?)\s?[\d,]+(?:\.\d{2})?")
-        match = price_regex.search(text)
-        return match.group(0) if match else None
+        return find_price_in_text(text)
 
     def _find_mrp_in_text(self, text, require_label=True):
-        if not text: return None
-        
-        if require_label:
-            # Stricter Pattern: Only allow space, colon, dot, currency chars between Label and Number
-            # Avoids matching "MRP tags and 1500..." 
-            # Pattern: (MRP|List Price...) [ :.-]* (₹|Rs)? \s* (number)
-            mrp_regex = re.compile(r"(?:M\.?R\.?P\.?|List Price|Original Price|Price)[\s:.\-]*?(?:₹|Rs\.?|INR)?\s*?(\d[\d,]+\.?\d*)", re.IGNORECASE)
-            match = mrp_regex.search(text)
-            if match:
-                val = match.group(1).replace(",", "")
-                if float(val) > 10: return f"₹{match.group(1)}"
-        else:
-            # Just look for price pattern (for specific elements like strike-through)
-            price_regex = re.compile(r"(?:₹|Rs\.?|INR)\s?([\d,]+(?:\.\d{2})?)", re.IGNORECASE)
-            match = price_regex.search(text)
-            if match:
-                 val = match.group(1).replace(",", "")
-                 if float(val) > 10: return f"₹{match.group(1)}"
-            
-        return None
+        # require_label: only allow space, colon, dot, currency chars between Label and Number
+        # Avoids matching "MRP tags and 1500..."
+        return find_mrp_in_text(text, require_label=require_label)
 
     def _find_mrp(self, soup):
          # 1. Specific classes that imply MRP/Old Price
-         mrp_classes = ["a-text-strike", "_3I9_wc", "strike-through", "strikethrough"]
-         for cls in mrp_classes:
-             elem = soup.find(class_=re.compile(cls, re.IGNORECASE))
+         for cls_pattern in MRP_CLASS_PATTERNS:
+             elem = soup.find(class_=cls_pattern)
              if elem:
                  # Extraction without label requirement
                  mrp = self._find_mrp_in_text(elem.get_text(), require_label=False)
@@ -182,8 +211,8 @@ class ScraperEngine:
 
          # 2. Text search for Label + Value matches
          # Look for "M.R.P." text node and check siblings/parent
-         for label in ["M.R.P", "MRP", "List Price"]:
-             elem = soup.find(text=re.compile(label, re.IGNORECASE))
+         for label_pattern in MRP_LABEL_PATTERNS:
+             elem = soup.find(text=label_pattern)
              if elem and elem.parent:
                   # Check parent text
                   mrp = self._find_mrp_in_text(elem.parent.get_text(), require_label=True)
@@ -0,0 +1,108 @@
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+from pymongo import DeleteMany, UpdateOne
+from app.core.database import database
+
+VIOLATIONS_COLLECTION = "violations"
+
+# Fields copied from each embedded violation
+VIOLATION_FIELDS = ("type", "severity", "description", "evidence", "confidence", "impact_score",
+                    "status", "regulation_mapping", "suggested_fix")
+
+def violation_id(product_id: Any, violation: Dict[str, Any], occurrence: int = 0) -> str:
+    """
+    "<product_id>:<type>:<hash of the normalised description>", so the same
+    finding keeps its document (detected_at, reviewer status) across
+    re-analyses wherever it lands in the list. Repeats get ":<n>".
+    """
+    description = " ".join(str(violation.get("description") or "").lower().split())
+    digest = hashlib.sha1(description.encode("utf-8")).hexdigest()[:12]
+    vid = f"{product_id}:{violation.get('type')}:{digest}"
+    return f"{vid}:{occurrence}" if occurrence else vid
+
+def violation_docs(product_id: Any, product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    One document per embedded violation, keyed by violation_id.
+    """
+    now = datetime.utcnow()
+    images = product.get("images") or []
+    seen: Counter = Counter()
+    docs = []
+    for index, violation in enumerate(product.get("violations") or []):
+        if hasattr(violation, "dict"):
+            violation = violation.dict()
+        doc = {field: violation.get(field) for field in VIOLATION_FIELDS}
+        vid = violation_id(product_id, violation)
+        doc.update({
+            "_id": violation_id(product_id, violation, seen[vid]),
+            "product_id": product_id,
+            "violation_index": index,
+            "product_name": product.get("name"),
+            "product_image": images[0] if images else None,
+            "category": product.get("category"),
+            "detected_at": product.get("created_at") or now,
+            "updated_at": now
+        })
+        seen[vid] += 1
+        docs.append(doc)
+    return docs
+
+# Set when a violation is first stored; a re-analysis must not overwrite them (status is the reviewer's)
+INSERT_ONLY_FIELDS = ("detected_at", "status")
+
+def _sync_ops(product_id: Any, product: Dict[str, Any]) -> list:
+    docs = violation_docs(product_id, product)
+    ops = []
+    for doc in docs:
+        fields = {k: v for k, v in doc.items() if k != "_id" and k not in INSERT_ONLY_FIELDS}
+        ops.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": fields, "$setOnInsert": {k: doc[k] for k in INSERT_ONLY_FIELDS}},
+            upsert=True
+        ))
+    # Drop violations the new analysis no longer reports
+    ops.append(DeleteMany({"product_id": product_id, "_id": {"$nin": [doc["_id"] for doc in docs]}}))
+    return ops
+
+async def sync_product(product_id: Any, product: Dict[str, Any]):
+    """
+    Makes the violations collection mirror product["violations"]. Call after
+    every write that sets a product's violations.
+    """
+    await sync_products([(product_id, product)])
+
+async def sync_products(products: Iterable[tuple]):
+    """
+    Bulk variant: (product_id, product) pairs, one unordered bulk write.
+    """
+    ops = []
+    for product_id, product in products:
+        ops.extend(_sync_ops(product_id, product))
+    if not ops:
+        return
+    try:
+        await database.get_collection(VIOLATIONS_COLLECTION).bulk_write(ops, ordered=False)
+    except Exception as e:
+        logging.error(f"Violations sync failed: {e}")
+
+async def backfill(batch_size: int = 500) -> int:
+    """
+    Rebuilds the collection from products (existing data / repair). Returns products processed.
+    """
+    pending, processed = [], 0
+    cursor = database.get_collection("products").find(
+        {}, {"name": 1, "images": {"$slice": 1}, "category": 1, "created_at": 1, "violations": 1}
+    )
+    async for product in cursor:
+        pending.append((product["_id"], product))
+        if len(pending) >= batch_size:
+            await sync_products(pending)
+            processed += len(pending)
+            pending = []
+    if pending:
+        await sync_products(pending)
+        processed += len(pending)
+    return processed
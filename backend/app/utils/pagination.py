@@ -0,0 +1,94 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from bson import ObjectId
+
+# How long a cached total is served before it is refreshed in the background
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+# First (uncached) count for a filter gives up after this and reports no total
+COUNT_MAX_TIME_MS = int(os.getenv("COUNT_MAX_TIME_MS", "500"))
+
+CountFn = Callable[[Optional[int]], Awaitable[int]]
+
+class InvalidCursor(ValueError):
+    """
+    Malformed/tampered token, or one issued for different filters. Routes map it to HTTP 400.
+    """
+
+def query_fingerprint(query: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(query, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def encode_cursor(last_id: ObjectId, query: Dict[str, Any]) -> str:
+    """
+    Opaque continuation token: the last _id of the page plus a fingerprint of the filters.
+    """
+    payload = json.dumps({"id": str(last_id), "q": query_fingerprint(query)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, query: Dict[str, Any]) -> ObjectId:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = ObjectId(payload["id"])
+        fingerprint = payload["q"]
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if fingerprint != query_fingerprint(query):
+        raise InvalidCursor("Cursor does not match the current filters")
+    return last_id
+
+class CountCache:
+    """
+    Totals per filter, served from memory. A stale entry is returned as-is and
+    refreshed in the background (one refresh per key at a time), so list pages
+    never wait on a count once a filter has been seen.
+    """
+
+    def __init__(self, ttl_seconds: float = COUNT_CACHE_TTL_SECONDS, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str, count: CountFn) -> Tuple[Optional[int], bool]:
+        """
+        `count(max_time_ms)` runs the real count; the first one is capped at
+        COUNT_MAX_TIME_MS, background refreshes are not.
+        Returns (total, exact_and_fresh). total is None if the first count timed out.
+        """
+        cached = self._entries.get(key)
+        if cached is not None:
+            value, at = cached
+            if time.monotonic() - at < self.ttl_seconds:
+                return value, True
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, count))
+            return value, False
+        try:
+            value = await count(COUNT_MAX_TIME_MS)
+        except Exception as e:
+            logging.warning(f"Count skipped: {e}")
+            # Keep trying in the background so the next page has a total
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, count))
+            return None, False
+        self._store(key, value)
+        return value, True
+
+    async def _refresh(self, key: str, count: CountFn):
+        try:
+            self._store(key, await count(None))
+        except Exception as e:
+            logging.error(f"Background count refresh failed: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _store(self, key: str, value: int):
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (value, time.monotonic())
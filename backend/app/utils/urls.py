@@ -0,0 +1,46 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query params that only track the click / session and never change the listing
+TRACKING_PARAMS = {
+    "ref", "ref_", "tag", "linkcode", "linkid", "camp", "creative", "creativeasin", "ascsubtag",
+    "qid", "sr", "keywords", "crid", "sprefix", "content-id", "social_share",
+    "gclid", "fbclid", "msclkid", "dclid", "igshid", "mc_cid", "mc_eid", "_encoding",
+    "otracker", "otracker1", "srno", "iid", "ssid", "fm", "ppt", "ppn", "spotlighttagid", "affid", "affextparam1", "affextparam2",
+}
+# Params that select a variant (th, psc) or seller/offer (smid, lid, marketplace, store):
+# two URLs differing in these are different offers, so they stay in the key
+OFFER_PARAMS = {"th", "psc", "smid", "lid", "marketplace", "store"}
+TRACKING_PREFIXES = ("utm_", "pf_rd_", "pd_rd_")
+
+_AMAZON_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?]|$)", re.IGNORECASE)
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalises a product URL so the same listing always maps to the same key:
+    lower-case scheme/host, no "www."/"m." prefix, default port, fragment or
+    tracking params; remaining params sorted. Amazon links collapse to
+    /dp/<ASIN>, keeping only the variant/offer params (OFFER_PARAMS).
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    params = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    if host.startswith("amazon."):
+        match = _AMAZON_ASIN.search(path)
+        if match:
+            offer = [(k, v) for k, v in params if k.lower() in OFFER_PARAMS]
+            return urlunsplit(("https", host, f"/dp/{match.group(1).upper()}", urlencode(sorted(offer)), ""))
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ""))
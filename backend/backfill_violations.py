@@ -0,0 +1,27 @@
+"""
+Rebuilds the denormalised `violations` collection from products.violations.
+Run once after upgrading, or to repair drift. Safe to re-run (upserts by product + finding,
+keeping detected_at and reviewer status).
+
+Usage (from the backend directory):
+    python backfill_violations.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.indexes import ensure_indexes
+from app.services.violation_store import backfill, VIOLATIONS_COLLECTION
+
+async def main():
+    await ensure_indexes(collections=[VIOLATIONS_COLLECTION])
+    processed = await backfill()
+    print(f"Synced violations for {processed} products")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark: legacy BeautifulSoup extraction vs the single-pass lxml extractor.
+
+Usage (from the backend directory):
+    python bench_extraction.py                      # bundled fixtures, inflated to ~1.5 MB
+    python bench_extraction.py saved_page.html ...  # your own saved pages, as-is
+    python bench_extraction.py --inflate-kb 0       # bundled fixtures at original size
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.scraper_engine import scraper_engine
+from app.services.html_extractor import html_extractor
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+# Product-card filler, similar to the recommendation carousels that make real pages 1-2 MB
+FILLER = (
+    '<div class="s-result-item" data-asin="B0{i:08d}"><div class="a-section">'
+    '<img class="s-image" src="https://m.media-amazon.com/images/I/rec{i}.jpg" alt="Related product {i}">'
+    '<h2 class="a-size-mini"><a class="a-link-normal" href="/dp/B0{i:08d}">Related product {i} with a long marketing title</a></h2>'
+    '<span class="a-color-secondary">Visit the store</span><span class="a-icon-alt">4.{d} out of 5 stars</span>'
+    '<script>P.when("A").execute(function(){{ window.rec{i} = {{"id": {i}, "score": 0.{d}}}; }});</script>'
+    '</div></div>\n'
+)
+
+def inflate(html: bytes, target_kb: int) -> bytes:
+    if target_kb <= 0 or len(html) >= target_kb * 1024:
+        return html
+    blocks, size, i = [], len(html), 0
+    while size < target_kb * 1024:
+        block = FILLER.format(i=i, d=i % 10)
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    return html.replace(b"<!-- RECOMMENDATIONS -->", "".join(blocks).encode("utf-8"), 1)
+
+def bench(fn, content: bytes, rounds: int):
+    fn(content) # Warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn(content)
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*", help="Saved HTML pages (default: bundled fixtures)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--inflate-kb", type=int, default=1500, help="Pad bundled fixtures to this size")
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    print(f"{'page':<28}{'size':>10}{'soup ms':>12}{'fast ms':>12}{'speedup':>10}  fields")
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        if not args.pages:
+            content = inflate(content, args.inflate_kb)
+
+        soup_ms, (soup_fields, _) = bench(scraper_engine._parse_page_soup, content, args.rounds)
+        fast_ms, (fast_fields, _) = bench(html_extractor.extract, content, args.rounds)
+
+        diffs = [k for k in soup_fields if soup_fields[k] != fast_fields.get(k)]
+        status = "identical" if not diffs else "differ: " + ", ".join(
+            f"{k} soup={soup_fields[k]!r} fast={fast_fields.get(k)!r}" for k in diffs
+        )
+        print(f"{os.path.basename(path):<28}{len(content) // 1024:>8}KB{soup_ms:>12.1f}{fast_ms:>12.1f}{soup_ms / fast_ms:>9.1f}x  {status}")
+
+if __name__ == "__main__":
+    main()
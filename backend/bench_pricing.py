@@ -0,0 +1,65 @@
+"""
+Benchmark: PricingEngine.analyze_price in a loop vs analyze_prices_batch.
+
+Usage (from the backend directory):
+    python bench_pricing.py                  # 1M synthetic prices, loop timed on a 20k sample
+    python bench_pricing.py --size 100000 --sample 5000
+The batch results are checked against the scalar path on the sample. Per-category
+IsolationForest models are fitted on a slice of the synthetic data first (needs scikit-learn).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.pricing import pricing_engine
+from app.services.price_models import price_models, train_models, SKLEARN_AVAILABLE
+
+CATEGORIES = ["electronics", "Electronics", "clothing", "food", "luxury", "general", "toys"]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000, help="Items scored one by one")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    prices = np.round(rng.lognormal(5, 1.5, args.size), 2)
+    categories = [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), args.size)]
+    mrps = np.where(rng.random(args.size) < 0.7, np.round(prices * rng.uniform(1.0, 2.5, args.size), 2), 0.0)
+
+    if SKLEARN_AVAILABLE:
+        train = {}
+        for p, m, c in zip(prices[:20000], mrps[:20000], categories[:20000]):
+            if c != "toys": # Left without a model: scored by the all-categories one
+                train.setdefault(c.lower(), ([], []))
+                train[c.lower()][0].append(p)
+                train[c.lower()][1].append(m)
+        price_models.install(train_models(train))
+
+    sample = min(args.sample, args.size)
+    start = time.perf_counter()
+    scalar = [pricing_engine.analyze_price(float(p), c, float(m)) for p, c, m in zip(prices[:sample], categories[:sample], mrps[:sample])]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = pricing_engine.analyze_prices_batch(prices, categories, mrps)
+    batch_s = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(scalar, batch[:sample]) if a != b)
+    flagged = sum(1 for r in batch if r)
+    per_item_loop = loop_s / sample * 1e6
+    per_item_batch = batch_s / args.size * 1e6
+    print(f"loop:  {per_item_loop:8.2f} us/item ({sample} items, ~{per_item_loop * args.size / 1e6:.0f}s projected for {args.size})")
+    print(f"batch: {per_item_batch:8.2f} us/item ({args.size} items in {batch_s:.2f}s, {flagged} flagged)")
+    print(f"speedup {per_item_loop / per_item_batch:.0f}x, mismatches on sample: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
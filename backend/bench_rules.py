@@ -0,0 +1,99 @@
+"""
+Benchmark: per-listing overhead of the local compliance rules (bulk re-scan path).
+
+Runs ComplianceEngine.evaluate_rules over synthetic listings with canned image/AI
+results, so nothing remote is called, and times it with and without converting
+the violations to pydantic (what the API boundary adds).
+
+Usage (from the backend directory):
+    python bench_rules.py                   # 20k listings
+    python bench_rules.py --listings 100000 --rounds 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+WORDS = ["premium", "leather", "wallet", "wireless", "earbuds", "cotton", "shirt", "organic", "honey", "steel", "bottle", "watch"]
+FLAGGED = ["replica", "first copy", "ivory", "expired", "Gucci", "Rolex", "Nike", "clone"]
+CATEGORIES = ["food", "electronics", "clothing", "general", "luxury"]
+
+def make_listings(n: int, seed: int = 42):
+    """
+    (product_data, img_analysis, nlp_results) triples with a realistic mix of clean and flagged listings.
+    """
+    rng = random.Random(seed)
+    listings = []
+    for i in range(n):
+        words = rng.choices(WORDS, k=rng.randint(1, 8))
+        if rng.random() < 0.3:
+            words += rng.sample(FLAGGED, rng.randint(1, 3))
+        title = " ".join(words)
+        if rng.random() < 0.1:
+            title = title.upper()
+        price = rng.randint(50, 50000)
+        mrp = rng.choice([0, price, int(price * rng.uniform(1.0, 8.0)), int(price * 0.8)])
+        product = {
+            "title": title,
+            "description": " ".join(rng.choices(WORDS + FLAGGED[:2], k=rng.randint(5, 40))),
+            "price": f"₹{price:,}",
+            "mrp": f"₹{mrp:,}" if mrp else None,
+            "category": rng.choice(CATEGORIES),
+            "image_url": f"https://example.com/{i}.jpg" if rng.random() < 0.9 else None,
+            "warranty": "1 year" if rng.random() < 0.5 else None,
+        }
+        img = None
+        if product["image_url"]:
+            img = {
+                "has_watermark": rng.random() < 0.1,
+                "inappropriate_detected": rng.random() < 0.02,
+                "cv_match": rng.choice([True, True, True, False, None]),
+                "details": "canned",
+                "known_image": {"counterfeit": True, "distance": 3, "product_name": "x"} if rng.random() < 0.05 else None,
+            }
+        nlp = {
+            "misleading_terms": ["miracle cure"] if rng.random() < 0.1 else [],
+            "prohibited_content": rng.random() < 0.02,
+            "suspicious_pricing": rng.random() < 0.05,
+            "reasoning": "canned",
+        }
+        listings.append((product, img, nlp))
+    return listings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.services.compliance_engine import compliance_engine
+
+    listings = make_listings(args.listings)
+
+    def rules_only():
+        return [compliance_engine.evaluate_rules(p, img, nlp) for p, img, nlp in listings]
+
+    def with_boundary():
+        results = rules_only()
+        for result in results:
+            result["violations"] = [v.to_schema() for v in result["violations"]]
+        return results
+
+    print(f"{'path':<28}{'us/listing':>12}{'listings/s':>14}")
+    for name, fn in (("rules (records)", rules_only), ("rules + pydantic boundary", with_boundary)):
+        fn() # Warm up
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = fn()
+            best = min(best, time.perf_counter() - start)
+        per_listing = best / len(listings) * 1e6
+        print(f"{name:<28}{per_listing:>12.1f}{len(listings) / best:>14.0f}")
+    violations = sum(len(r["violations"]) for r in results)
+    print(f"{violations / len(listings):.2f} violations per listing")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Exports products or violations to a file, streamed from a cursor in constant memory.
+
+Usage (from the backend directory):
+    python export_data.py products --format csv --out products.csv --risk-level Critical
+    python export_data.py violations --format parquet --severity critical --status Open
+Parquet needs pyarrow. Without --out the file name is generated (e.g. products-20240101-120000.ndjson).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.exporter import DATASETS, EXPORT_FORMATS, build_filters, export_filename, stream_export
+
+async def main(args):
+    query = build_filters(args.dataset, risk_level=args.risk_level, category=args.category,
+                          severity=args.severity, status=args.status)
+    chunks = stream_export(args.dataset, args.format, query)
+    out = args.out or export_filename(args.dataset, args.format)
+    start = time.perf_counter()
+    written = 0
+    with open(out, "wb") as f:
+        async for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    print(f"Wrote {written / 1e6:.1f} MB to {out} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--out", help="Output file")
+    parser.add_argument("--risk-level", help="products only")
+    parser.add_argument("--category", help="products only")
+    parser.add_argument("--severity", help="violations only: critical, high, medium or low")
+    parser.add_argument("--status", help="violations only, as stored: Open, Reviewed, Resolved or \"False Positive\"")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except ValueError as e: # ExportError (e.g. parquet without pyarrow)
+        sys.exit(str(e))
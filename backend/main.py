@@ -4,6 +4,11 @@ load_dotenv()
 from fastapi import FastAPI
 from app.routes import analysis, analytics, products, violations, ingestion
 from fastapi.middleware.cors import CORSMiddleware
+import os
+
+# Dev convenience: run job consumers inside the API process instead of a separate worker.py
+INPROCESS_WORKERS = int(os.getenv("INPROCESS_WORKERS", "0"))
+_worker_pool = None
 
 app = FastAPI(title="E-Compliance Monitor API")
 
@@ -16,6 +21,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    from app.core.lifecycle import start_services
+    await start_services()
+
+    from app.services.job_queue import job_queue, WorkerPool
+    if INPROCESS_WORKERS > 0:
+        from app.services.ingestion_jobs import JOB_HANDLERS
+        global _worker_pool
+        _worker_pool = WorkerPool(job_queue, JOB_HANDLERS, concurrency=INPROCESS_WORKERS)
+        _worker_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.core.lifecycle import stop_services
+    if _worker_pool is not None:
+        await _worker_pool.stop()
+    await stop_services()
+
 @app.get("/")
 async def root():
     return {"message": "E-Compliance Monitor API is running"}
@@ -0,0 +1,58 @@
+"""
+Inspect, create and rebuild the MongoDB indexes declared in app/core/indexes.py,
+and check that hot queries are index-backed.
+
+Usage (from the backend directory):
+    python manage_indexes.py inspect                 # declared vs existing, per collection
+    python manage_indexes.py ensure                  # create missing indexes (same as app startup)
+    python manage_indexes.py rebuild [--collection products] [--drop-extra]
+    python manage_indexes.py check                   # explain hot queries, exit 1 on any COLLSCAN
+Run `check` as the first step of a benchmark run so a missing index fails it early.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.indexes import ensure_indexes, inspect_indexes, rebuild_indexes, explain_query, hot_queries
+
+async def main(args) -> int:
+    collections = args.collection or None
+    if args.command == "inspect":
+        report = await inspect_indexes(collections=collections)
+        print(json.dumps(report, indent=2, default=str))
+        return 0
+    if args.command == "ensure":
+        report = await ensure_indexes(collections=collections)
+        print(json.dumps(report, indent=2))
+        return 1 if report["failed"] else 0
+    if args.command == "rebuild":
+        report = await rebuild_indexes(collections=collections, drop_extra=args.drop_extra)
+        print(json.dumps(report, indent=2))
+        return 1 if report["failed"] else 0
+
+    # check
+    failures = 0
+    for query in hot_queries():
+        if collections and query["collection"] not in collections:
+            continue
+        stages = await explain_query(query)
+        scan = "COLLSCAN" in stages
+        failures += scan
+        print(f"{'FAIL' if scan else 'ok  '}  {query['name']:<42} {' > '.join(stages)}")
+    if failures:
+        print(f"{failures} hot quer{'y' if failures == 1 else 'ies'} scan the whole collection. Run `python manage_indexes.py ensure`.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["inspect", "ensure", "rebuild", "check"])
+    parser.add_argument("--collection", action="append", help="Limit to this collection (repeatable)")
+    parser.add_argument("--drop-extra", action="store_true", help="rebuild: also drop undeclared indexes")
+    sys.exit(asyncio.run(main(parser.parse_args())))
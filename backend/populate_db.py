@@ -1,7 +1,7 @@
 import requests
-import time
+import json
 
-API_URL = "http://localhost:8000/api/v1/analysis/"
+API_URL = "http://localhost:8000/api/v1/analysis/batch"
 
 products = [
     {
@@ -57,17 +57,21 @@ products = [
 ]
 
 print("Seeding database...")
-for p in products:
-    try:
-        resp = requests.post(API_URL, json=p)
-        if resp.status_code == 200:
-            data = resp.json()
-            score = data.get("compliance_score")
-            print(f"Added: {p['manual_data']['title']} | Score: {score}")
-        else:
-            print(f"Failed: {p['manual_data']['title']} | {resp.text}")
-    except Exception as e:
-        print(f"Error: {e}")
-    time.sleep(0.5)
+try:
+    # One streamed request for the whole seed set; results arrive as they finish
+    with requests.post(API_URL, json={"items": products, "concurrency": 4}, stream=True) as resp:
+        if resp.status_code != 200:
+            print(f"Failed: {resp.text}")
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            title = products[item["index"]]["manual_data"]["title"]
+            if "error" in item:
+                print(f"Failed: {title} | {item['error']}")
+            else:
+                print(f"Added: {title} | Score: {item['result'].get('compliance_score')}")
+except Exception as e:
+    print(f"Error: {e}")
 
 print("Seeding complete.")
@@ -0,0 +1,26 @@
+"""
+Recomputes the per-category price statistics (Z-score baseline) from the products collection.
+Run once after upgrading so existing products are counted; afterwards they are maintained online.
+
+Usage (from the backend directory):
+    python rebuild_price_stats.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.price_stats import price_stats
+
+async def main():
+    counted = await price_stats.rebuild()
+    print(f"Rebuilt price stats from {counted} priced products")
+    for category, stats in price_stats.summary().items():
+        print(f"  {category:<24} n={stats['count']:<8} mean={stats['mean']:<12} std={stats['std']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+"""
+Recomputes the dashboard rollups from the products collection.
+Run once after upgrading (existing products have no rollup snapshot), or to repair drift.
+
+Usage (from the backend directory):
+    python rebuild_rollups.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.indexes import ensure_indexes
+from app.services.rollups import rebuild, ROLLUPS_COLLECTION
+
+async def main():
+    await ensure_indexes(collections=[ROLLUPS_COLLECTION])
+    counted = await rebuild()
+    print(f"Rebuilt dashboard rollups from {counted} products")
+
+if __name__ == "__main__":
+    asyncio.run(main())
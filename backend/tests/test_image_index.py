@@ -0,0 +1,47 @@
+import random
+from app.services.image_index import ImageHashIndex, hamming
+
+def _flip(value, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    index = ImageHashIndex(max_distance=6)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    for i, h in enumerate(hashes):
+        index.remember(h, {"url": f"https://example.com/{i}"})
+    assert index.size == len(hashes)
+
+    for _ in range(200):
+        query = _flip(rng.choice(hashes), rng.randint(0, 10), rng)
+        best = min(hamming(query, h) for h in hashes)
+        result = index.nearest(query)
+        if best <= 6:
+            assert result is not None and result[0] == best
+        else:
+            assert result is None
+
+def test_exact_hash_updates_in_place():
+    index = ImageHashIndex()
+    index.remember(0xABCDEF, {"url": "a", "has_watermark": False})
+    merged = index.remember(0xABCDEF, {"url": "a", "has_watermark": True})
+    assert index.size == 1
+    assert merged["has_watermark"] is True
+    assert index.nearest(0xABCDEF)[1]["has_watermark"] is True
+
+def test_counterfeit_match_wins_over_a_closer_clean_one():
+    index = ImageHashIndex(max_distance=6)
+    index.remember(0b0, {"url": "clean"})
+    index.remember(0b111, {"url": "seller-a", "counterfeit": True})
+    distance, record = index.nearest(0b1)
+    assert (distance, record["url"]) == (2, "seller-a")
+
+def test_only_the_flagging_listing_can_clear_the_flag():
+    index = ImageHashIndex()
+    index.remember(42, {"url": "seller-a", "counterfeit": True})
+    other = index.remember(42, {"url": "seller-b", "counterfeit": False})
+    assert (other["counterfeit"], other["counterfeit_url"]) == (True, "seller-a")
+    cleared = index.remember(42, {"url": "seller-a", "counterfeit": False})
+    assert (cleared["counterfeit"], cleared["counterfeit_url"]) == (False, None)
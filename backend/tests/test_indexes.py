@@ -0,0 +1,31 @@
+from app.core.indexes import INDEXES, hot_queries
+
+def _filter_fields(query):
+    fields = set()
+    for key, value in query.items():
+        if key == "$or":
+            for branch in value:
+                fields |= _filter_fields(branch)
+        elif not key.startswith("$"):
+            fields.add(key)
+    return fields
+
+def _probe_filter(probe):
+    if "pipeline" in probe:
+        return probe["pipeline"][0]["$match"]
+    return probe["find"]
+
+def test_every_filtered_probe_leads_with_an_indexed_field():
+    for probe in hot_queries():
+        query = _probe_filter(probe)
+        if not query or "$text" in query:
+            continue
+        leading = {spec.keys[0][0] for spec in INDEXES if spec.collection == probe["collection"]}
+        assert _filter_fields(query) & leading, probe["name"]
+
+def test_lease_branches_each_have_an_index():
+    lease = next(p for p in hot_queries() if p["name"] == "job lease, some kinds")
+    jobs_indexes = {tuple(k for k, _ in spec.keys) for spec in INDEXES if spec.collection == "jobs"}
+    for branch in lease["find"]["$or"]:
+        assert tuple(branch) in jobs_indexes
+    assert lease["find"]["kind"] == {"$in": ["ingest_url"]}
@@ -0,0 +1,163 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import JobQueue
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$lte" and not (value is not None and value <= arg):
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+class FakeCollection:
+    """
+    The handful of Motor calls JobQueue makes, over a dict of documents.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self._next_id = 0
+
+    async def insert_one(self, doc):
+        self._next_id += 1
+        doc["_id"] = self._next_id
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def find_one(self, query):
+        return next((copy.deepcopy(d) for d in self.docs.values() if _matches(d, query)), None)
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        candidates = sorted((d for d in self.docs.values() if _matches(d, query)), key=lambda d: d["run_at"])
+        if not candidates:
+            return None
+        doc = candidates[0]
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                doc.update(update["$set"])
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def delete_one(self, query):
+        for _id, doc in list(self.docs.items()):
+            if _matches(doc, query):
+                del self.docs[_id]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = copy.deepcopy(doc)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def get_collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+@pytest.fixture
+def queue(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(job_queue_module, "database", db)
+    return JobQueue()
+
+def _expire_lease(queue, job_id):
+    queue.jobs.docs[job_id]["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+
+def test_lease_ack_round_trip(queue):
+    async def scenario():
+        job_id, created = await queue.enqueue("analyze_text", {"text": "x"})
+        job = await queue.lease("w1")
+        assert await queue.lease("w2") is None # Leased, not due again
+        return job_id, created, job, await queue.ack(job)
+
+    job_id, created, job, acked = asyncio.run(scenario())
+    assert created and job["_id"] == job_id and job["attempts"] == 1
+    assert acked and queue.jobs.docs == {}
+
+def test_failure_is_retried_with_backoff(queue):
+    async def scenario():
+        await queue.enqueue("analyze_text", {}, max_attempts=3)
+        job = await queue.lease("w1")
+        await queue.fail(job, "boom")
+        return job, await queue.lease("w1")
+
+    job, again = asyncio.run(scenario())
+    stored = queue.jobs.docs[job["_id"]]
+    assert again is None # Backing off
+    assert stored["status"] == "queued" and stored["last_error"] == "boom"
+    assert stored["run_at"] > datetime.utcnow()
+
+def test_last_attempt_is_dead_lettered(queue):
+    async def scenario():
+        await queue.enqueue("analyze_text", {}, max_attempts=1)
+        job = await queue.lease("w1")
+        await queue.fail(job, "boom")
+        return job
+
+    job = asyncio.run(scenario())
+    assert queue.jobs.docs == {}
+    assert queue.dead.docs[job["_id"]]["last_error"] == "boom"
+
+def test_stale_worker_cannot_retry_a_re_leased_job(queue):
+    async def scenario():
+        job_id, _ = await queue.enqueue("analyze_text", {}, max_attempts=3)
+        stale = await queue.lease("w1")
+        _expire_lease(queue, job_id)
+        current = await queue.lease("w2")
+        await queue.fail(stale, "late failure") # w1 wakes up after its lease expired
+        return job_id, current, await queue.ack(stale)
+
+    job_id, current, acked_late = asyncio.run(scenario())
+    assert not acked_late
+    assert queue.jobs.docs[job_id]["lease_token"] == current["lease_token"]
+    assert queue.jobs.docs[job_id]["last_error"] is None
+
+def test_stale_worker_cannot_dead_letter_a_re_leased_job(queue):
+    async def scenario():
+        job_id, _ = await queue.enqueue("analyze_text", {}, max_attempts=1)
+        stale = await queue.lease("w1") # Its last attempt
+        _expire_lease(queue, job_id)
+        assert await queue.lease("w2") is None # Over budget: dead-lettered by the lease
+        assert await queue.requeue_dead(job_id)
+        current = await queue.lease("w3") # Running again after an operator requeue
+        await queue.fail(stale, "late failure")
+        return job_id, current
+
+    job_id, current = asyncio.run(scenario())
+    assert queue.dead.docs == {}
+    assert queue.jobs.docs[job_id]["status"] == "leased"
+    assert queue.jobs.docs[job_id]["lease_token"] == current["lease_token"]
+
+def test_job_leased_too_often_is_dead_lettered(queue):
+    async def scenario():
+        job_id, _ = await queue.enqueue("analyze_text", {}, max_attempts=1)
+        await queue.lease("w1")
+        _expire_lease(queue, job_id)
+        return job_id, await queue.lease("w2")
+
+    job_id, leased = asyncio.run(scenario())
+    assert leased is None
+    assert job_id in queue.dead.docs and queue.jobs.docs == {}
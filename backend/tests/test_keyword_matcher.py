@@ -0,0 +1,42 @@
+import pytest
+from app.services.keyword_matcher import KeywordMatcher
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher([
+        ("fake", "blacklist"), ("first copy", "blacklist"), ("nike", "brand"),
+        ("air max", "product"), ("max", "product"), ("100%", "claim"),
+    ])
+
+def _terms(matcher, text):
+    return [hit.term for hit in matcher.find_all(text)]
+
+def test_whole_words_only(matcher):
+    assert _terms(matcher, "Fake NIKE shoes") == ["fake", "nike"]
+    assert _terms(matcher, "fakes nikey unfake") == []
+    assert _terms(matcher, "nike_store") == []
+
+def test_boundaries_at_text_edges_and_punctuation(matcher):
+    assert _terms(matcher, "nike") == ["nike"]
+    assert _terms(matcher, "(fake)!") == ["fake"]
+    assert _terms(matcher, "first copy, nike-branded") == ["first copy", "nike"]
+
+def test_positions_refer_to_the_lowercased_text(matcher):
+    text = "Genuine FIRST COPY watch"
+    hit = matcher.find_all(text)[0]
+    assert (hit.term, hit.tag) == ("first copy", "blacklist")
+    assert text.lower()[hit.start:hit.end] == "first copy"
+
+def test_overlapping_and_suffix_terms(matcher):
+    assert _terms(matcher, "nike air max 90") == ["nike", "air max", "max"]
+    assert _terms(matcher, "maximum") == []
+
+def test_non_word_edges_do_not_need_a_boundary(matcher):
+    # "100%" ends in a non-word character, so the next character may be anything
+    assert _terms(matcher, "100%cotton") == ["100%"]
+    assert _terms(matcher, "1100% real") == []
+
+def test_empty_terms_are_ignored():
+    matcher = KeywordMatcher([("", "x"), ("  ", "y"), ("ok", "z")])
+    assert matcher.size == 1
+    assert [h.tag for h in matcher.find_all("ok")] == ["z"]
@@ -0,0 +1,23 @@
+import asyncio
+from app.core import indexes, lifecycle
+from app.services.image_index import image_index
+from app.services.price_models import price_models
+from app.services.price_stats import price_stats
+
+def test_worker_startup_loads_the_same_state_as_the_api(monkeypatch):
+    calls = []
+
+    async def record(name):
+        calls.append(name)
+
+    monkeypatch.setattr(image_index, "load", lambda: record("image_index"))
+    monkeypatch.setattr(indexes, "ensure_indexes", lambda: record("indexes"))
+    monkeypatch.setattr(price_stats, "load", lambda: record("price_stats"))
+    monkeypatch.setattr(price_models, "start", lambda **kwargs: calls.append(("price_models", kwargs)))
+
+    asyncio.run(lifecycle.start_services())
+    asyncio.run(lifecycle.start_services(retrain_models=False))
+    assert calls == [
+        "image_index", "indexes", "price_stats", ("price_models", {}),
+        "image_index", "indexes", "price_stats", ("price_models", {"retrain_seconds": 0}),
+    ]
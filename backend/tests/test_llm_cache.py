@@ -0,0 +1,44 @@
+import asyncio
+import numpy as np
+import pytest
+from app.ai.llm_cache import LLMCache
+from app.services import image_engine as image_engine_module
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "cache.sqlite3"))
+
+def test_round_trip_through_disk(cache, tmp_path):
+    cache.set("k", {"match": False})
+    reopened = LLMCache(path=str(tmp_path / "cache.sqlite3"))
+    assert reopened.get("k") == {"match": False}
+    assert reopened.stats()["disk_hits"] == 1
+
+def test_broken_disk_tier_is_a_miss(cache):
+    cache._db.close() # e.g. the file went away / is locked
+    with pytest.raises(Exception):
+        cache.get("missing")
+    assert cache.safe_get("missing") is None
+    cache.safe_set("k", {"a": 1}) # Does not raise
+    assert asyncio.run(cache.safe_aget("other")) is None
+    asyncio.run(cache.safe_aset("k", {"a": 2}))
+
+class _Response:
+    text = '{"is_match": false, "confidence": 0.9, "reason": "Different product"}'
+
+class _Model:
+    def generate_content(self, parts):
+        return _Response()
+
+    async def generate_content_async(self, parts):
+        return _Response()
+
+def test_image_match_verdict_survives_a_failing_cache(cache, monkeypatch):
+    cache._db.close()
+    monkeypatch.setattr(image_engine_module, "llm_cache", cache)
+    engine = image_engine_module.image_engine
+    monkeypatch.setattr(engine, "model", _Model())
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    expected = {"match": False, "confidence": 0.9, "reason": "Different product"}
+    assert engine.verify_product_match_ai(image, "Red shoe") == expected
+    assert asyncio.run(engine.verify_product_match_ai_async(image, "Red shoe")) == expected
@@ -0,0 +1,59 @@
+import asyncio
+import base64
+import json
+import re
+import pytest
+from bson import ObjectId
+from app.utils.pagination import CountCache, InvalidCursor, decode_cursor, encode_cursor, query_fingerprint
+
+def test_cursor_round_trip():
+    last_id = ObjectId()
+    query = {"risk_level": "High", "category": re.compile(r"^\s*toys\s*$", re.IGNORECASE)}
+    token = encode_cursor(last_id, query)
+    assert "=" not in token
+    assert decode_cursor(token, dict(reversed(list(query.items())))) == last_id
+
+def test_cursor_rejects_other_filters():
+    token = encode_cursor(ObjectId(), {"risk_level": "High"})
+    with pytest.raises(InvalidCursor, match="does not match"):
+        decode_cursor(token, {"risk_level": "Low"})
+
+@pytest.mark.parametrize("token", ["", "not-base64!", base64.urlsafe_b64encode(b'{"id": "nope", "q": "x"}').decode()])
+def test_cursor_rejects_malformed_tokens(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, {})
+
+def test_fingerprint_ignores_key_order():
+    assert query_fingerprint({"a": 1, "b": 2}) == query_fingerprint({"b": 2, "a": 1})
+    payload = json.loads(base64.urlsafe_b64decode(encode_cursor(ObjectId(), {"a": 1}) + "=="))
+    assert payload["q"] == query_fingerprint({"a": 1})
+
+def test_count_cache_serves_stale_totals_and_refreshes():
+    async def scenario():
+        cache = CountCache(ttl_seconds=0)
+        counts = iter([10, 12])
+
+        async def count(max_time_ms):
+            return next(counts)
+
+        first = await cache.get("k", count)
+        stale = await cache.get("k", count)
+        await asyncio.sleep(0) # Let the background refresh run
+        await asyncio.sleep(0)
+        refreshed = cache._entries["k"][0]
+        return first, stale, refreshed
+
+    assert asyncio.run(scenario()) == ((10, True), (10, False), 12)
+
+def test_count_cache_reports_no_total_when_the_first_count_fails():
+    async def scenario():
+        cache = CountCache()
+
+        async def count(max_time_ms):
+            raise TimeoutError("operation exceeded time limit")
+
+        result = await cache.get("k", count)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == (None, False)
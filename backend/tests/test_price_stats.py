@@ -0,0 +1,63 @@
+import math
+import random
+import pytest
+from app.services.price_stats import CategoryPriceStats, RunningStats, parse_price
+from app.services import price_stats as price_stats_module
+
+def _stats(values):
+    stats = RunningStats()
+    for v in values:
+        stats.add(v)
+    return stats
+
+@pytest.mark.parametrize("raw, expected", [
+    ("₹11,500", 11500.0),
+    ("Rs. 499.00", 499.0),
+    (499, 499.0),
+    ("MRP: ₹1,299.50 (incl. taxes)", 1299.5),
+    ("Pending", None),
+    (None, None),
+    (0, None),
+    (float("nan"), None),
+])
+def test_parse_price(raw, expected):
+    assert parse_price(raw) == expected
+
+def test_add_matches_two_pass_statistics():
+    values = [random.Random(1).lognormvariate(5, 1) for _ in range(500)]
+    stats = _stats(values)
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+    assert stats.count == 500
+    assert stats.mean == pytest.approx(mean)
+    assert stats.std == pytest.approx(std)
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+def test_merge_equals_adding_one_by_one():
+    rng = random.Random(2)
+    values = [rng.uniform(10, 5000) for _ in range(300)]
+    merged = _stats(values[:120])
+    merged.merge(_stats(values[120:]))
+    whole = _stats(values)
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.m2 == pytest.approx(whole.m2)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+
+def test_merge_into_empty_and_with_empty():
+    data = _stats([1.0, 2.0, 3.0])
+    empty = RunningStats()
+    empty.merge(data)
+    assert (empty.count, empty.mean, empty.min, empty.max) == (3, 2.0, 1.0, 3.0)
+    data.merge(RunningStats())
+    assert data.count == 3 and data.std == pytest.approx(1.0)
+
+def test_get_falls_back_to_all_categories_until_enough_samples(monkeypatch):
+    monkeypatch.setattr(price_stats_module, "PRICE_STATS_MIN_SAMPLES", 5)
+    stats = CategoryPriceStats()
+    for price in (100, 200, 300, 400, 500):
+        stats._observe("Toys", price)
+    stats._observe("Books", "₹250")
+    assert stats.get(" toys ").count == 5
+    assert stats.get("books").count == 6 # Only 1 book: the all-categories stats
+    assert stats._pending_count == 6
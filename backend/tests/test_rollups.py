@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+from app.services import rollups
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+class FakeRollupsCollection:
+    """
+    Just enough of a Motor collection for apply_many (upserting $inc) and dashboard (range find).
+    """
+
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            update = op._doc
+            doc = self.docs.setdefault(op._filter["_id"], {"_id": op._filter["_id"], **update["$setOnInsert"]})
+            for path, value in update["$inc"].items():
+                *parents, leaf = path.split(".")
+                target = doc
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = target.get(leaf, 0) + value
+
+    def find(self, query):
+        return FakeCursor([
+            d for d in self.docs.values()
+            if d["category"] == query["category"] and d["day"] >= query["day"]["$gte"]
+        ])
+
+class FakeDatabase:
+    def __init__(self):
+        self.collection = FakeRollupsCollection()
+
+    def get_collection(self, name):
+        return self.collection
+
+def _product(score, risk, category="Electronics", violations=()):
+    return {"compliance_score": score, "risk_level": risk, "category": category,
+            "violations": [{"type": t} for t in violations]}
+
+def test_apply_many_and_dashboard(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(rollups, "database", db)
+    today = datetime.utcnow()
+    first = rollups.snapshot(_product(40, "High", violations=["MRP_MISSING", "FAKE"]), today)
+    second = rollups.snapshot(_product(100, "Low", category=" electronics "), today)
+
+    async def scenario():
+        await rollups.apply_many([(first, None), (second, None)])
+        return await rollups.dashboard("Electronics"), await rollups.dashboard()
+
+    by_category, overall = asyncio.run(scenario())
+    assert by_category == overall
+    assert by_category["summary"] == {"total_analyzed": 2, "avg_compliance": 70.0, "critical_issues": 0}
+    assert {v["name"] for v in by_category["violations_by_type"]} == {"MRP_MISSING", "FAKE"}
+    assert by_category["score_trend"] == [{"date": today.strftime("%Y-%m-%d"), "score": 70.0}]
+
+def test_rescore_moves_the_contribution(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(rollups, "database", db)
+    old = rollups.snapshot(_product(20, "Critical", violations=["FAKE"]))
+    new = rollups.snapshot(_product(90, "Low"))
+
+    async def scenario():
+        await rollups.apply(old)
+        await rollups.apply(new, old)
+        return await rollups.dashboard()
+
+    stats = asyncio.run(scenario())
+    assert stats["summary"] == {"total_analyzed": 1, "avg_compliance": 90.0, "critical_issues": 0}
+    assert stats["violations_by_type"] == []
+    assert stats["risk_distribution"] == [{"name": "Low", "value": 1}]
+
+def test_zero_scores_still_produce_a_trend(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(rollups, "database", db)
+
+    async def scenario():
+        await rollups.apply(rollups.snapshot(_product(0, "Critical")))
+        return await rollups.dashboard()
+
+    stats = asyncio.run(scenario())
+    assert stats["summary"]["avg_compliance"] == 0
+    assert [t["score"] for t in stats["score_trend"]] == [0]
+
+def test_unchanged_rescore_writes_nothing(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(rollups, "database", db)
+    snap = rollups.snapshot(_product(50, "Medium"))
+    asyncio.run(rollups.apply(snap, snap))
+    assert db.collection.docs == {}
+
+def test_category_match_uses_the_normalised_snapshot_category():
+    snap = rollups.snapshot(_product(80, "Low", category="  ELECTRONICS "))
+    assert rollups.category_match("Electronics") == {"rollup.category": snap["category"]}
+    assert rollups.category_match(None) == {"rollup.category": "uncategorized"}
+    assert rollups.normalize_category("  ") == "uncategorized"
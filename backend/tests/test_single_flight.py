@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from app.core.single_flight import SingleFlightCache
+
+def test_concurrent_misses_share_one_computation():
+    async def scenario():
+        cache = SingleFlightCache(ttl_seconds=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get("k", compute) for _ in range(5)))
+        return results, calls, cache.stats
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert stats == {"hits": 0, "misses": 1, "coalesced": 4}
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        cache = SingleFlightCache(ttl_seconds=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        leader = asyncio.create_task(cache.get("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        value = await waiter
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        cached = await cache.get("k", compute)
+        return value, cached, calls
+
+    value, cached, calls = asyncio.run(scenario())
+    assert value == 42
+    assert cached == 42
+    assert len(calls) == 1
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = SingleFlightCache(ttl_seconds=60)
+        attempts = []
+
+        async def compute():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise ValueError("boom")
+            return "ok"
+
+        results = await asyncio.gather(cache.get("k", compute), cache.get("k", compute), return_exceptions=True)
+        retry = await cache.get("k", compute)
+        return results, retry, attempts
+
+    results, retry, attempts = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retry == "ok"
+    assert len(attempts) == 2
+
+def test_expired_entries_are_recomputed():
+    async def scenario():
+        cache = SingleFlightCache(ttl_seconds=0)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return len(calls)
+
+        return await cache.get("k", compute), await cache.get("k", compute)
+
+    assert asyncio.run(scenario()) == (1, 2)
@@ -0,0 +1,26 @@
+import pytest
+from app.utils.urls import canonicalize_url
+
+@pytest.mark.parametrize("a, b", [
+    ("https://www.amazon.in/Some-Shoe/dp/b0abc12345/ref=sr_1_1?keywords=shoe&qid=1",
+     "https://amazon.in/dp/B0ABC12345"),
+    ("HTTPS://M.Flipkart.com/shoe/p/itm123?pid=SHOE1&otracker=search&utm_source=x",
+     "https://flipkart.com/shoe/p/itm123/?pid=SHOE1"),
+    ("https://example.com//item/42/?b=2&a=1#reviews", "https://example.com/item/42?a=1&b=2"),
+])
+def test_same_listing_same_key(a, b):
+    assert canonicalize_url(a) == canonicalize_url(b)
+
+def test_amazon_variant_and_seller_stay_in_the_key():
+    base = "https://www.amazon.in/dp/B0ABC12345"
+    assert canonicalize_url(f"{base}?th=1&psc=1&tag=aff-21") == "https://amazon.in/dp/B0ABC12345?psc=1&th=1"
+    assert canonicalize_url(f"{base}?smid=SELLER1") != canonicalize_url(f"{base}?smid=SELLER2")
+
+def test_flipkart_listing_params_stay_in_the_key():
+    url = "https://www.flipkart.com/shoe/p/itm123?pid=SHOE1&lid=LSTSHOE1&marketplace=FLIPKART&store=osp"
+    assert canonicalize_url(url) == "https://flipkart.com/shoe/p/itm123?lid=LSTSHOE1&marketplace=FLIPKART&pid=SHOE1&store=osp"
+    other_seller = url.replace("LSTSHOE1", "LSTSHOE2")
+    assert canonicalize_url(url) != canonicalize_url(other_seller)
+
+def test_non_default_port_is_kept():
+    assert canonicalize_url("http://shop.test:8080/p/1") == "http://shop.test:8080/p/1"
@@ -0,0 +1,11 @@
+from app.core.indexes import INDEXES
+from app.routes.violations import SORT_FIELDS
+
+def test_every_sort_field_has_a_keyset_index():
+    # get_violations sorts {sort_by: -1, _id: -1}; each must be an index walk, not an in-memory sort
+    prefixes = {tuple(name for name, _ in spec.keys) for spec in INDEXES if spec.collection == "violations"}
+    for field in SORT_FIELDS:
+        assert (field, "_id") in prefixes, field
+
+def test_violations_table_columns_are_sortable():
+    assert {"product_name", "type", "severity", "status", "impact_score"} <= SORT_FIELDS
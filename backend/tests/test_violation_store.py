@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime
+from pymongo import DeleteMany, UpdateOne
+from app.services import violation_store
+
+class FakeViolationsCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            if isinstance(op, UpdateOne):
+                _id = op._filter["_id"]
+                if _id not in self.docs:
+                    self.docs[_id] = {"_id": _id, **op._doc["$setOnInsert"]}
+                self.docs[_id].update(op._doc["$set"])
+            elif isinstance(op, DeleteMany):
+                keep = set(op._filter["_id"]["$nin"])
+                self.docs = {
+                    k: d for k, d in self.docs.items()
+                    if d["product_id"] != op._filter["product_id"] or k in keep
+                }
+
+class FakeDatabase:
+    def __init__(self):
+        self.collection = FakeViolationsCollection()
+
+    def get_collection(self, name):
+        return self.collection
+
+def _violation(vtype, description):
+    return {"type": vtype, "description": description, "severity": "high", "status": "Open"}
+
+def _sync(product_id, violations, created_at):
+    product = {"name": "Shoe", "violations": violations, "created_at": created_at}
+    asyncio.run(violation_store.sync_product(product_id, product))
+
+def test_reordered_violations_keep_their_own_history(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(violation_store, "database", db)
+    first, later = datetime(2026, 1, 1), datetime(2026, 2, 1)
+    mrp = _violation("MRP_MISSING", "MRP not  declared")
+    brand = _violation("BRAND_INFRINGEMENT", "Uses Nike")
+    _sync("p1", [mrp], first)
+
+    fake = _violation("FAKE", "Replica listing")
+    _sync("p1", [fake, brand, _violation("MRP_MISSING", "mrp not declared")], later)
+
+    by_type = {d["type"]: d for d in db.collection.docs.values()}
+    assert len(db.collection.docs) == 3
+    assert by_type["MRP_MISSING"]["detected_at"] == first # Same finding, now at another index
+    assert by_type["MRP_MISSING"]["violation_index"] == 2
+    assert by_type["FAKE"]["detected_at"] == later # New finding in the old slot 0
+
+def test_reviewer_status_survives_reanalysis(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(violation_store, "database", db)
+    violation = _violation("FAKE", "Replica listing")
+    _sync("p1", [violation], datetime(2026, 1, 1))
+    (doc,) = db.collection.docs.values()
+    doc["status"] = "False Positive"
+
+    _sync("p1", [{**violation, "severity": "critical"}], datetime(2026, 1, 2))
+    (doc,) = db.collection.docs.values()
+    assert doc["status"] == "False Positive"
+    assert doc["severity"] == "critical"
+
+def test_findings_no_longer_reported_are_deleted(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(violation_store, "database", db)
+    _sync("p1", [_violation("FAKE", "a"), _violation("MRP_MISSING", "b")], datetime(2026, 1, 1))
+    _sync("p2", [_violation("FAKE", "a")], datetime(2026, 1, 1))
+    _sync("p1", [_violation("MRP_MISSING", "b")], datetime(2026, 1, 2))
+    remaining = sorted((d["product_id"], d["type"]) for d in db.collection.docs.values())
+    assert remaining == [("p1", "MRP_MISSING"), ("p2", "FAKE")]
+
+def test_identical_findings_get_distinct_ids():
+    docs = violation_store.violation_docs("p1", {"violations": [_violation("FAKE", "x"), _violation("FAKE", " X ")]})
+    assert len({d["_id"] for d in docs}) == 2
+    assert docs[1]["_id"] == docs[0]["_id"] + ":1"
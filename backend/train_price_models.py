@@ -0,0 +1,42 @@
+"""
+Trains the per-category price anomaly models (IsolationForest) from stored products
+and writes them to PRICE_MODEL_PATH, where running API processes hot-swap them in.
+
+Usage (from the backend directory):
+    python train_price_models.py                # train once
+    python train_price_models.py --every 3600   # keep retraining on a schedule
+Needs scikit-learn. Fitting runs in a child process.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.price_models import price_models
+
+async def main(every: int):
+    while True:
+        try:
+            samples = await price_models.retrain()
+            print(f"Trained {len(samples)} models: {samples}")
+        except Exception as e:
+            if not every:
+                raise
+            logging.error(f"Price model training failed: {e}")
+        if not every:
+            return
+        await asyncio.sleep(every)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--every", type=int, default=0, help="Retrain every N seconds (default: once)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main(args.every))
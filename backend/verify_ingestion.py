@@ -13,13 +13,14 @@ import app.ai.nlp_engine as nlp_module
 
 db_module.database = MagicMock()
 mock_collection = AsyncMock()
+mock_collection.find_one_and_update.return_value = {"_id": "dummy_id"} # No previous rollup snapshot
 db_module.database.get_collection = MagicMock(return_value=mock_collection)
 
 nlp_module.nlp_engine = MagicMock()
-nlp_module.nlp_engine.analyze = MagicMock(return_value={"risk_score": 88, "misleading_terms": ["magic"]})
+nlp_module.nlp_engine.analyze_async = AsyncMock(return_value={"risk_score": 88, "misleading_terms": ["magic"]})
 nlp_module.nlp_engine.compute_risk_score = MagicMock(return_value={"confidence": 0.9, "impact_score": 88})
 
-from app.routes.ingestion import analyze_and_update
+from app.services.ingestion_jobs import analyze_and_update
 
 async def test_flow():
     print("Starting verification of ingestion logic...")
@@ -29,8 +30,8 @@ async def test_flow():
     
     # Check calls
     print("Verifying DB update logic...")
-    if mock_collection.update_one.called:
-        call_args = mock_collection.update_one.call_args
+    if mock_collection.find_one_and_update.called:
+        call_args = mock_collection.find_one_and_update.call_args
         query = call_args[0][0]
         update = call_args[0][1]
         
@@ -49,7 +50,7 @@ async def test_flow():
         
         print("SUCCESS: Ingestion logic verified!")
     else:
-        print("FAILURE: database.update_one was not called.")
+        print("FAILURE: database.find_one_and_update was not called.")
 
 if __name__ == "__main__":
     asyncio.run(test_flow())
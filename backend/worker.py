@@ -0,0 +1,50 @@
+"""
+Job worker: drains the Mongo job queue (ingestion analyses etc.).
+
+Usage (from the backend directory):
+    python worker.py                    # WORKER_CONCURRENCY consumers (default 4)
+    python worker.py --concurrency 8
+    python worker.py --kinds analyze_text
+Run as many worker processes as needed; leases keep them from double-processing.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.job_queue import job_queue, WorkerPool, WORKER_CONCURRENCY, WORKER_POLL_SECONDS
+from app.services.ingestion_jobs import JOB_HANDLERS
+from app.core.lifecycle import start_services, stop_services
+
+async def main(concurrency: int, poll_seconds: float, kinds):
+    handlers = {k: v for k, v in JOB_HANDLERS.items() if not kinds or k in kinds}
+    # Same state as the API process: pHash index, indexes, price stats, price models
+    await start_services(retrain_models=False)
+
+    pool = WorkerPool(job_queue, handlers, concurrency=concurrency, poll_seconds=poll_seconds)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(pool.stop()))
+
+    logging.info(f"Worker {pool.name} started: {concurrency} consumers, kinds={sorted(handlers)}")
+    await pool.run_forever()
+    logging.info(f"Worker {pool.name} stopped: {pool.processed}")
+
+    await stop_services()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--poll-seconds", type=float, default=WORKER_POLL_SECONDS)
+    parser.add_argument("--kinds", nargs="*", help="Only process these job kinds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main(args.concurrency, args.poll_seconds, args.kinds))
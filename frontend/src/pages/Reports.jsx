@@ -34,7 +34,8 @@ const Reports = () => {
         const result = await fetchReports(params);
         if (result) {
             setData(result.data);
-            setTotal(result.total);
+            // total is left out while the first count for new filters is still running
+            setTotal(prev => result.total ?? prev);
         }
         setLoading(false);
     };